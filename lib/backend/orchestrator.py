@@ -7,6 +7,7 @@ import sys
 import os
 import json
 import argparse
+from pathlib import Path
 from typing import Dict, Any
 
 # Add the parent directory to the path so we can import shared modules
@@ -18,6 +19,7 @@ from services.librarian import LibrarianService
 from services.indexer import AssetWatcher
 from services.analyst import AssetAnalyst
 from services.injector import AssetInjector
+from services.scrubber import IntegrityScrubber
 
 
 class AssetOrchestrator:
@@ -31,12 +33,14 @@ class AssetOrchestrator:
         self.indexer = AssetWatcher()
         self.analyst = AssetAnalyst()
         self.injector = AssetInjector()
+        self.scrubber = IntegrityScrubber()
         
         # Service status tracking
         self.service_status = {
             'librarian': False,
             'indexer': False,
-            'analyst': False
+            'analyst': False,
+            'scrubber': False
         }
     
     def initialize_system(self) -> bool:
@@ -82,23 +86,28 @@ class AssetOrchestrator:
         except Exception as e:
             print(f"Error initializing default libraries: {e}")
     
-    def search_assets(self, query: str, limit: int = 100) -> Dict[str, Any]:
+    def search_assets(self, query: str, limit: int = 100, content: bool = False) -> Dict[str, Any]:
         """
         Search for assets using the librarian service.
         
         Args:
             query: Search query
             limit: Maximum results
+            content: Search the text inside documents (with snippets) instead of names and tags
             
         Returns:
             Search results with metadata
         """
         try:
-            results = self.librarian.search_assets(query, limit)
+            if content:
+                results = self.librarian.search_content(query, limit)
+            else:
+                results = self.librarian.search_assets(query, limit)
             
             return {
                 'success': True,
                 'query': query,
+                'mode': 'content' if content else 'assets',
                 'results': results,
                 'count': len(results),
                 'service': 'librarian'
@@ -114,6 +123,194 @@ class AssetOrchestrator:
                 'service': 'librarian'
             }
     
+    def find_similar(self, asset_id: int, radius: int = None) -> Dict[str, Any]:
+        """
+        Find near-duplicate images of an asset by perceptual hash.
+        
+        Args:
+            asset_id: Image asset to compare against
+            radius: Maximum hash distance in bits (default: config.image_similarity_radius)
+            
+        Returns:
+            Similar assets, nearest first
+        """
+        try:
+            results = self.librarian.find_similar_assets(asset_id, radius)
+            
+            return {
+                'success': True,
+                'asset_id': asset_id,
+                'results': results,
+                'count': len(results),
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'asset_id': asset_id,
+                'results': [],
+                'count': 0,
+                'service': 'librarian'
+            }
+    
+    def search_by_color(self, color: str, radius: float = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Find images with a dominant colour near the given hex colour.
+        
+        Args:
+            color: Hex colour such as '#3a5f8c'
+            radius: Maximum colour distance (default: config.color_search_radius)
+            limit: Maximum results
+            
+        Returns:
+            Matching assets, closest colour first
+        """
+        try:
+            results = self.librarian.search_by_color(color, radius, limit=limit)
+            
+            return {
+                'success': True,
+                'color': color,
+                'results': results,
+                'count': len(results),
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'color': color,
+                'results': [],
+                'count': 0,
+                'service': 'librarian'
+            }
+    
+    def get_archive_members(self, asset_id: int, limit: int = 1000, offset: int = 0) -> Dict[str, Any]:
+        """
+        List the files inside an archive asset without extracting it.
+        
+        Args:
+            asset_id: Archive asset ID
+            limit: Maximum members returned
+            offset: Members to skip
+            
+        Returns:
+            Members as virtual child assets, in archive order
+        """
+        try:
+            results = self.librarian.get_archive_members(asset_id, limit, offset)
+            
+            return {
+                'success': True,
+                'asset_id': asset_id,
+                'results': results,
+                'count': len(results),
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'asset_id': asset_id,
+                'results': [],
+                'count': 0,
+                'service': 'librarian'
+            }
+    
+    def extract_member(self, path: str) -> Dict[str, Any]:
+        """
+        Get a local file for an archive member's virtual path, extracting it if needed.
+        
+        Args:
+            path: Virtual member path ('archive.zip!/dir/file.dwg') or an ordinary path
+            
+        Returns:
+            The local file path to preview or insert
+        """
+        try:
+            local_path = self.librarian.resolve_path(path)
+            
+            return {
+                'success': local_path is not None,
+                'path': path,
+                'local_path': local_path,
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'path': path,
+                'local_path': None,
+                'service': 'librarian'
+            }
+    
+    def get_waveform(self, asset_id: int) -> Dict[str, Any]:
+        """
+        Get the precomputed waveform summary of an audio asset.
+        
+        Args:
+            asset_id: Audio asset ID
+            
+        Returns:
+            Waveform peaks and packed blob, or found=False if none is stored
+        """
+        try:
+            waveform = self.librarian.get_waveform(asset_id)
+            
+            return {
+                'success': True,
+                'asset_id': asset_id,
+                'found': waveform is not None,
+                'waveform': waveform,
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'asset_id': asset_id,
+                'found': False,
+                'waveform': None,
+                'service': 'librarian'
+            }
+    
+    def get_asset_metadata(self, asset_id: int, full: bool = False) -> Dict[str, Any]:
+        """
+        Get the analyzed metadata of an asset.
+        
+        Args:
+            asset_id: Asset ID
+            full: Also decode the compressed full EXIF and tag values
+            
+        Returns:
+            Metadata key-value pairs
+        """
+        try:
+            metadata = self.librarian.get_asset_metadata(asset_id, include_blobs=full)
+            
+            return {
+                'success': True,
+                'asset_id': asset_id,
+                'metadata': metadata,
+                'service': 'librarian'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'asset_id': asset_id,
+                'metadata': {},
+                'service': 'librarian'
+            }
+    
     def start_indexing(self, library_paths: list = None) -> Dict[str, Any]:
         """
         Start the indexing service.
@@ -210,6 +407,65 @@ class AssetOrchestrator:
                 'service': 'analyst'
             }
     
+    def start_scrub(self, continuous: bool = True) -> Dict[str, Any]:
+        """
+        Start the integrity scrub, which re-verifies stored content hashes.
+        
+        Args:
+            continuous: Whether to scrub continuously or finish the current pass
+            
+        Returns:
+            Status of the scrub
+        """
+        try:
+            success = self.scrubber.start_scrub(continuous=continuous)
+            self.service_status['scrubber'] = success
+            
+            return {
+                'success': success,
+                'message': 'Integrity scrub finished' if success else 'Integrity scrub failed',
+                'mode': 'continuous' if continuous else 'single',
+                'stats': self.scrubber.get_scrub_stats(),
+                'service': 'scrubber'
+            }
+            
+        except Exception as e:
+            self.service_status['scrubber'] = False
+            return {
+                'success': False,
+                'error': str(e),
+                'service': 'scrubber'
+            }
+    
+    def get_integrity_failures(self, limit: int = 100) -> Dict[str, Any]:
+        """
+        List assets whose last integrity check failed.
+        
+        Args:
+            limit: Maximum assets listed
+            
+        Returns:
+            Assets with a hash mismatch or an unreadable file
+        """
+        try:
+            results = self.db.get_integrity_failures(limit)
+            
+            return {
+                'success': True,
+                'results': results,
+                'count': len(results),
+                'service': 'scrubber'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'results': [],
+                'count': 0,
+                'service': 'scrubber'
+            }
+    
     def scan_library(self, library_path: str) -> Dict[str, Any]:
         """
         Manually scan a library for new assets.
@@ -239,6 +495,89 @@ class AssetOrchestrator:
                 'service': 'indexer'
             }
     
+    def scan_all_libraries(self) -> Dict[str, Any]:
+        """
+        Scan every active library concurrently, limited per device.
+        
+        Returns:
+            Aggregated scan results
+        """
+        try:
+            result = self.indexer.scan_all_libraries()
+            
+            return {
+                'success': True,
+                'message': f"Scanned {len(result['libraries'])} libraries successfully",
+                'assets_added': result['assets_added'],
+                'files_seen': result['files_seen'],
+                'devices': result['devices'],
+                'libraries': result['libraries'],
+                'service': 'indexer'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'service': 'indexer'
+            }
+    
+    def focus_library(self, library_path: str) -> Dict[str, Any]:
+        """
+        Mark a library as the one the user has open, so its assets are analyzed first.
+        
+        Args:
+            library_path: Path of the open library
+            
+        Returns:
+            Focus result
+        """
+        try:
+            library_path = str(Path(library_path).resolve())
+            self.db.set_focus_library(library_path)
+            
+            return {
+                'success': True,
+                'message': f"Prioritizing analysis of {library_path}",
+                'service': 'analyst'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'service': 'analyst'
+            }
+    
+    def get_thumbnails(self, asset_ids: list, size: int = None) -> Dict[str, Any]:
+        """
+        Get thumbnail paths for a batch of assets in one call.
+        
+        Args:
+            asset_ids: Asset ids to look up
+            size: Preferred thumbnail size in pixels (default: smallest configured)
+            
+        Returns:
+            Mapping of asset id to thumbnail path (None when unavailable)
+        """
+        try:
+            paths = self.analyst.thumbnails.get_paths(asset_ids, size)
+            
+            return {
+                'success': True,
+                'thumbnails': {str(asset_id): path for asset_id, path in paths.items()},
+                'count': sum(1 for path in paths.values() if path),
+                'service': 'analyst'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'thumbnails': {},
+                'service': 'analyst'
+            }
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Get comprehensive system status."""
         try:
@@ -250,7 +589,11 @@ class AssetOrchestrator:
                 'services': {
                     'librarian': True,  # Always available
                     'indexer': self.service_status['indexer'],
-                    'analyst': self.service_status['analyst']
+                    'analyst': self.service_status['analyst'],
+                    'scrubber': self.service_status['scrubber']
+                },
+                'indexer': {
+                    'event_storms': self.indexer.get_storm_metrics()
                 },
                 'config': {
                     'database_path': self.config.database_path,
@@ -305,6 +648,36 @@ def main():
     search_parser = subparsers.add_parser('search', help='Search for assets')
     search_parser.add_argument('query', help='Search query')
     search_parser.add_argument('--limit', type=int, default=100, help='Maximum results')
+    search_parser.add_argument('--content', action='store_true', help='Search the text inside documents and code')
+    
+    # Similar command
+    similar_parser = subparsers.add_parser('similar', help='Find near-duplicate images of an asset')
+    similar_parser.add_argument('asset_id', type=int, help='Image asset ID')
+    similar_parser.add_argument('--radius', type=int, help='Maximum perceptual-hash distance in bits')
+    
+    # Color command
+    color_parser = subparsers.add_parser('color', help='Find images with a dominant colour near a hex colour')
+    color_parser.add_argument('color', help='Hex colour, e.g. "#3a5f8c"')
+    color_parser.add_argument('--radius', type=float, help='Maximum colour distance (CIE76 Delta E)')
+    color_parser.add_argument('--limit', type=int, default=100, help='Maximum results')
+    
+    # Archive commands
+    members_parser = subparsers.add_parser('members', help='List the files inside an archive asset')
+    members_parser.add_argument('asset_id', type=int, help='Archive asset ID')
+    members_parser.add_argument('--limit', type=int, default=1000, help='Maximum members')
+    members_parser.add_argument('--offset', type=int, default=0, help='Members to skip')
+    
+    extract_parser = subparsers.add_parser('extract', help='Extract an archive member for preview')
+    extract_parser.add_argument('path', help='Virtual member path, e.g. "blocks.zip!/doors/door.dwg"')
+    
+    # Waveform command
+    waveform_parser = subparsers.add_parser('waveform', help='Show the precomputed waveform of an audio asset')
+    waveform_parser.add_argument('asset_id', type=int, help='Audio asset ID')
+    
+    # Metadata command
+    metadata_parser = subparsers.add_parser('metadata', help='Show the analyzed metadata of an asset')
+    metadata_parser.add_argument('asset_id', type=int, help='Asset ID')
+    metadata_parser.add_argument('--full', action='store_true', help='Include the full EXIF and tag values')
     
     # Index commands
     index_parser = subparsers.add_parser('index', help='Indexing operations')
@@ -315,7 +688,8 @@ def main():
     
     index_stop_parser = index_subparsers.add_parser('stop', help='Stop indexing')
     index_scan_parser = index_subparsers.add_parser('scan', help='Scan specific library')
-    index_scan_parser.add_argument('path', help='Library path to scan')
+    index_scan_parser.add_argument('path', nargs='?', help='Library path to scan')
+    index_scan_parser.add_argument('--all', action='store_true', help='Scan all active libraries concurrently')
     
     index_watch_parser = index_subparsers.add_parser('watch', help='Watch specific library')
     index_watch_parser.add_argument('path', help='Library path to watch')
@@ -330,6 +704,26 @@ def main():
     analysis_stop_parser = analysis_subparsers.add_parser('stop', help='Stop analysis')
     analysis_stats_parser = analysis_subparsers.add_parser('stats', help='Get analysis statistics')
     
+    # Integrity scrub commands
+    scrub_parser = subparsers.add_parser('scrub', help='Integrity scrub operations')
+    scrub_subparsers = scrub_parser.add_subparsers(dest='scrub_command')
+    
+    scrub_start_parser = scrub_subparsers.add_parser('start', help='Start re-verifying stored hashes')
+    scrub_start_parser.add_argument('--once', action='store_true', help='Finish the current pass and exit')
+    
+    scrub_stats_parser = scrub_subparsers.add_parser('stats', help='Get scrub progress and integrity counts')
+    scrub_failures_parser = scrub_subparsers.add_parser('failures', help='List assets with a hash mismatch or unreadable file')
+    scrub_failures_parser.add_argument('--limit', type=int, default=100, help='Maximum assets listed')
+    
+    # Focus command
+    focus_parser = subparsers.add_parser('focus', help='Analyze assets of the open library first')
+    focus_parser.add_argument('path', help='Library path the user has open')
+    
+    # Thumbnail command
+    thumbnails_parser = subparsers.add_parser('thumbnails', help='Get thumbnail paths for assets')
+    thumbnails_parser.add_argument('ids', nargs='+', type=int, help='Asset ids')
+    thumbnails_parser.add_argument('--size', type=int, help='Preferred thumbnail size in pixels')
+    
     # Inject command
     inject_parser = subparsers.add_parser('inject', help='Inject asset into AutoCAD')
     inject_parser.add_argument('path', help='File path to inject')
@@ -356,9 +750,33 @@ def main():
             print(json.dumps(status, indent=2))
             
         elif args.command == 'search':
-            results = orchestrator.search_assets(args.query, args.limit)
+            results = orchestrator.search_assets(args.query, args.limit, args.content)
+            print(json.dumps(results, indent=2))
+            
+        elif args.command == 'similar':
+            results = orchestrator.find_similar(args.asset_id, args.radius)
+            print(json.dumps(results, indent=2))
+            
+        elif args.command == 'color':
+            results = orchestrator.search_by_color(args.color, args.radius, args.limit)
+            print(json.dumps(results, indent=2))
+            
+        elif args.command == 'members':
+            results = orchestrator.get_archive_members(args.asset_id, args.limit, args.offset)
             print(json.dumps(results, indent=2))
             
+        elif args.command == 'extract':
+            result = orchestrator.extract_member(args.path)
+            print(json.dumps(result, indent=2))
+            
+        elif args.command == 'waveform':
+            result = orchestrator.get_waveform(args.asset_id)
+            print(json.dumps(result, indent=2))
+            
+        elif args.command == 'metadata':
+            result = orchestrator.get_asset_metadata(args.asset_id, args.full)
+            print(json.dumps(result, indent=2))
+            
         elif args.command == 'index':
             if args.index_command == 'start':
                 result = orchestrator.start_indexing(args.paths)
@@ -367,7 +785,13 @@ def main():
                 result = orchestrator.stop_indexing()
                 print(json.dumps(result, indent=2))
             elif args.index_command == 'scan':
-                result = orchestrator.scan_library(args.path)
+                if args.all:
+                    result = orchestrator.scan_all_libraries()
+                elif args.path:
+                    result = orchestrator.scan_library(args.path)
+                else:
+                    index_scan_parser.print_help()
+                    return
                 print(json.dumps(result, indent=2))
             elif args.index_command == 'watch':
                 result = orchestrator.start_indexing([args.path])
@@ -389,8 +813,30 @@ def main():
             else:
                 analysis_parser.print_help()
                 
+        elif args.command == 'scrub':
+            if args.scrub_command == 'start':
+                result = orchestrator.start_scrub(continuous=not args.once)
+                print(json.dumps(result, indent=2))
+            elif args.scrub_command == 'stats':
+                print(json.dumps(orchestrator.scrubber.get_scrub_stats(), indent=2))
+            elif args.scrub_command == 'failures':
+                result = orchestrator.get_integrity_failures(args.limit)
+                print(json.dumps(result, indent=2, default=str))
+            else:
+                scrub_parser.print_help()
+                
+        elif args.command == 'focus':
+            result = orchestrator.focus_library(args.path)
+            print(json.dumps(result, indent=2))
+            
+        elif args.command == 'thumbnails':
+            result = orchestrator.get_thumbnails(args.ids, args.size)
+            print(json.dumps(result, indent=2))
+            
         elif args.command == 'inject':
-            result = orchestrator.injector.inject(args.path)
+            # Archive members are extracted only now, when they are inserted
+            path = orchestrator.librarian.resolve_path(args.path) or args.path
+            result = orchestrator.injector.inject(path)
             print(json.dumps(result, indent=2))
         else:
             parser.print_help()
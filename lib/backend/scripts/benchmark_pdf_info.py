@@ -0,0 +1,108 @@
+"""
+Benchmark the PDF info fast path against a full PyPDF2 parse.
+
+Usage:
+    python scripts/benchmark_pdf_info.py <pdf directory> [--repeat N]
+
+For every PDF under the directory, times read_pdf_info() and PyPDF2 (page count
+plus document info, as the analyzer does), checks that both agree, and prints
+per-file and total timings.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the path so we can import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_info import PdfError, read_pdf_info
+
+
+def time_call(func, repeat: int):
+    """Run func `repeat` times; return (best seconds, last result or exception)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            result = e
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def pypdf2_info(file_path: str) -> dict:
+    """Page count and info the way the analyzer's PyPDF2 fallback gets them."""
+    import PyPDF2
+    
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        info = {'page_count': len(reader.pages)}
+        meta = reader.metadata
+        if meta:
+            for key in ('title', 'author', 'subject'):
+                if getattr(meta, key):
+                    info[key] = getattr(meta, key)
+        return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PDF info fast path against PyPDF2')
+    parser.add_argument('directory', help='Directory of PDF files (searched recursively)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per file; the best time is kept (default: 3)')
+    args = parser.parse_args()
+    
+    try:
+        import PyPDF2  # noqa: F401
+        have_pypdf2 = True
+    except ImportError:
+        print("PyPDF2 not installed; timing the fast path only.")
+        have_pypdf2 = False
+    
+    files = sorted(Path(args.directory).rglob('*.pdf'))
+    if not files:
+        print(f"No PDF files found in {args.directory}")
+        return
+    
+    total_fast = total_full = 0.0
+    fallbacks = mismatches = 0
+    print(f"{'file':40} {'MB':>8} {'fast ms':>9} {'KB read':>8} {'pypdf2 ms':>10} {'speedup':>8}")
+    
+    for path in files:
+        size_mb = path.stat().st_size / (1024 * 1024)
+        fast_time, fast = time_call(lambda: read_pdf_info(str(path)), args.repeat)
+        total_fast += fast_time
+        
+        full_time, full = (time_call(lambda: pypdf2_info(str(path)), args.repeat)
+                           if have_pypdf2 else (0.0, None))
+        total_full += full_time
+        
+        if isinstance(fast, PdfError):
+            fallbacks += 1
+            read = 'fallback'
+        elif isinstance(fast, Exception):
+            fallbacks += 1
+            read = 'error'
+        else:
+            read = f"{fast['bytes_read'] / 1024:.1f}"
+            if isinstance(full, dict) and any(fast.get(k) != v for k, v in full.items()):
+                mismatches += 1
+                read += ' !'
+        
+        speedup = f"{full_time / fast_time:.0f}x" if have_pypdf2 and fast_time else '-'
+        print(f"{path.name[:40]:40} {size_mb:8.1f} {fast_time * 1000:9.2f} {read:>8} "
+              f"{full_time * 1000:10.1f} {speedup:>8}")
+    
+    print()
+    print(f"Files: {len(files)}  fast-path fallbacks: {fallbacks}  mismatches: {mismatches}")
+    print(f"Total fast path: {total_fast * 1000:.1f} ms")
+    if have_pypdf2:
+        print(f"Total PyPDF2:    {total_full * 1000:.1f} ms  ({total_full / total_fast:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Shrink a database written by older image and audio analyzers.
+
+Usage:
+    python scripts/compact_metadata.py [--no-vacuum]
+
+Older versions stored the whole EXIF dictionary (maker notes and embedded
+previews included) and every audio tag as JSON text in asset_metadata. This
+rewrites those rows the way the analyzers now store them: whitelisted fields as
+typed metadata, the rest without binary blobs as one zlib-compressed value.
+Outdated analysis cache entries are dropped and the file is vacuumed, and the
+database size before and after is printed.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add the backend directory to the path so we can import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.database import db_manager
+from services.analyzers import registry
+from services.exif import split_audio_tags, split_exif
+
+# Metadata key -> splitter for the values older analyzers wrote as JSON text
+SPLITTERS = {'exif': split_exif, 'tags': split_audio_tags}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact EXIF and audio tag metadata in the database')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip rebuilding the database file')
+    parser.add_argument('--batch', type=int, default=500, help='Rows rewritten per transaction (default: 500)')
+    args = parser.parse_args()
+    
+    size_before = db_manager.get_database_size()
+    cursor = 0
+    compacted = dropped = unreadable = 0
+    
+    while True:
+        rows = db_manager.get_uncompacted_metadata(list(SPLITTERS), cursor, args.batch)
+        if not rows:
+            break
+        
+        updates = []
+        for row in rows:
+            cursor = row['id']
+            try:
+                value = json.loads(row['value'])
+            except ValueError:
+                unreadable += 1
+                continue
+            if not isinstance(value, dict):
+                unreadable += 1
+                continue
+            typed, remainder = SPLITTERS[row['key']](value)
+            updates.append((row['id'], row['asset_id'], row['analyzer'], typed, remainder))
+            if remainder:
+                compacted += 1
+            else:
+                dropped += 1
+        
+        if updates and not db_manager.compact_metadata(updates):
+            sys.exit(1)
+    
+    pruned = db_manager.prune_analysis_cache({analyzer.name: analyzer.version for analyzer in registry.all()})
+    print(f"Rows compacted: {compacted}  removed (nothing left after filtering): {dropped}  "
+          f"left as text (not JSON): {unreadable}")
+    print(f"Outdated analysis cache entries removed: {pruned}")
+    
+    if not args.no_vacuum:
+        db_manager.vacuum()
+    size_after = db_manager.get_database_size()
+    print(f"Database size: {size_before / (1024 * 1024):.1f} MB -> {size_after / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,10 @@ import sys
 import os
 import time
 import json
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, Executor, as_completed
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from itertools import repeat
 from pathlib import Path
 
 # Add the parent directory to the path so we can import shared modules
@@ -16,29 +18,64 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared.database import db_manager
 from shared.config import config
+from services.analyzers import (Analyzer, registry, CONTENT_ANALYZERS, MAGIC_SNIFF_BYTES,
+                                CPU_BOUND, IO_BOUND, HEAVY)
+from services.archives import index_rows as member_index_rows
+from services.file_reader import READ_BLOCK_SIZE, Consumer, HashConsumer, SniffConsumer, read_once
+from services.governor import governor
+from services.metrics import AnalysisMetrics, run_timed
+from services.palette import index_rows as palette_index_rows
+from services.similarity import index_row
+from services.supervisor import SupervisedProcessPool
+from services.thumbnails import ThumbnailCache
 
 
 class AssetAnalyst:
     """Service class for analyzing and processing indexed assets."""
     
-    def __init__(self, analysis_interval: int = 60):
+    def __init__(self, analysis_interval: int = 60, batch_size: int = 200,
+                 cpu_workers: Optional[int] = None, io_workers: int = 8,
+                 write_batch_size: int = 100, min_batch_size: int = 10,
+                 poll_interval: float = 0.5, heavy_workers: int = 1):
         """
         Initialize the asset analyst.
         
         Args:
-            analysis_interval: Seconds between analysis runs (default: 60)
+            analysis_interval: Maximum seconds to stay idle without re-checking (default: 60)
+            batch_size: Maximum pending assets fetched per analysis cycle (default: 200)
+            min_batch_size: Minimum pending assets fetched per analysis cycle (default: 10)
+            poll_interval: Seconds between PRAGMA data_version checks while idle (default: 0.5)
+            cpu_workers: Processes for CPU-bound analyzers (default: CPU count)
+            io_workers: Threads for I/O-bound analyzers (default: 8)
+            heavy_workers: Processes for heavy analyzers such as video decoding (default: 1)
+            write_batch_size: Results written to the database per transaction (default: 100)
         """
         self.db = db_manager
         self.config = config
         self.analysis_interval = analysis_interval
+        self.batch_size = batch_size
+        self.min_batch_size = min(min_batch_size, batch_size)
+        self.poll_interval = poll_interval
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.io_workers = io_workers
+        self.heavy_workers = heavy_workers
+        self.write_batch_size = write_batch_size
         self.is_running = False
-        self.supported_analysis_types = {
-            'image': self._analyze_image,
-            'document': self._analyze_document,
-            'video': self._analyze_video,
-            'audio': self._analyze_audio,
-            'code': self._analyze_code
-        }
+        self.registry = registry
+        self.thumbnails = ThumbnailCache(self.db)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Content index ingest counters for this run
+        self.content_ingest = {'documents': 0, 'chars': 0, 'bytes_read': 0,
+                               'extract_seconds': 0.0, 'write_seconds': 0.0}
+        self._prune_needed = True
+        self._executors: Dict[str, Executor] = {}
+        # Performance metrics accumulate across runs; the running analyst saves them periodically
+        self.metrics = AnalysisMetrics()
+        persisted = self.db.get_metrics_state('analyst')
+        if persisted:
+            self.metrics.load_state(persisted)
+        self._metrics_saved_at = time.monotonic()
     
     def start_analysis(self, continuous: bool = True) -> bool:
         """
@@ -52,13 +89,21 @@ class AssetAnalyst:
         """
         try:
             self.is_running = True
+            # Before any pool starts, so workers inherit the low priority
+            governor.lower_priority()
+            self.requeue_outdated_analyses()
             
             if continuous:
-                print(f"Asset analyst started. Running every {self.analysis_interval} seconds.")
+                print("Asset analyst started. Draining backlog, then waiting for new work.")
                 self._run_continuous_analysis()
+                self._shutdown_executors()
             else:
                 print("Running one-time asset analysis...")
-                self._run_single_analysis()
+                # Until the backlog is drained, or a cycle fails to store anything
+                while self._run_single_analysis():
+                    pass
+                self._shutdown_executors()
+            self._save_metrics()
             
             return True
             
@@ -70,295 +115,535 @@ class AssetAnalyst:
     def stop_analysis(self):
         """Stop the analysis process."""
         self.is_running = False
+        # Wake the idle wait so the loop notices the stop
+        self.db.notify_pending_work()
+        self._shutdown_executors()
+        self._save_metrics()
         print("Asset analyst stopped.")
     
+    def _get_executor(self, resource_class: str) -> Executor:
+        """Get (lazily creating) the worker pool for a resource class."""
+        executor = self._executors.get(resource_class)
+        if executor is None:
+            # Process pools are supervised: a hung or crashed decoder only loses its own task
+            memory_limit = self.config.analysis_memory_limit_mb * 1024 * 1024 or None
+            if resource_class == CPU_BOUND:
+                executor = SupervisedProcessPool(self.cpu_workers, self.config.analysis_task_timeout,
+                                                 memory_limit)
+            elif resource_class == HEAVY:
+                executor = SupervisedProcessPool(self.heavy_workers, self.config.analysis_task_timeout,
+                                                 memory_limit)
+            else:
+                executor = ThreadPoolExecutor(max_workers=self.io_workers,
+                                              thread_name_prefix='analyst-io')
+            self._executors[resource_class] = executor
+        return executor
+    
+    def _pool_size(self, resource_class: str) -> int:
+        """Get the number of workers of a resource class's pool."""
+        if resource_class == CPU_BOUND:
+            return self.cpu_workers
+        if resource_class == HEAVY:
+            return self.heavy_workers
+        return self.io_workers
+    
+    def _save_metrics(self):
+        """Persist the performance metrics so other processes (analyze stats) can read them."""
+        self.db.save_metrics_state('analyst', self.metrics.to_state())
+        self.db.save_metrics_state('analyst_governor', governor.get_stats())
+        self._metrics_saved_at = time.monotonic()
+    
+    def _shutdown_executors(self):
+        """Shut down all worker pools."""
+        executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+    
     def _run_continuous_analysis(self):
-        """Run continuous analysis loop."""
+        """
+        Run continuous analysis loop.
+        
+        The backlog is drained cycle after cycle without sleeping. Once it is
+        empty the loop blocks until the indexer signals new work in this
+        process, or another process commits to the database (detected by
+        polling PRAGMA data_version), or analysis_interval passes.
+        """
         try:
             while self.is_running:
-                self._run_single_analysis()
+                # Snapshot the signals before looking for work so a commit
+                # landing after the empty fetch still wakes the wait below
+                self.db.clear_pending_work()
+                data_version = self.db.get_data_version()
                 
-                if self.is_running:
-                    time.sleep(self.analysis_interval)
+                processed = self._run_single_analysis()
+                
+                if processed == 0 and self.is_running:
+                    self._wait_for_work(data_version)
                     
         except KeyboardInterrupt:
             print("\nAnalysis interrupted by user.")
         except Exception as e:
             print(f"Error in continuous analysis: {e}")
     
-    def _run_single_analysis(self):
-        """Run a single analysis cycle."""
+    def _wait_for_work(self, data_version: Optional[int]):
+        """Block until new work may be available or the analyst is stopped."""
+        deadline = time.monotonic() + self.analysis_interval
+        
+        while self.is_running and time.monotonic() < deadline:
+            if self.db.wait_for_pending_work(self.poll_interval):
+                return
+            if self.db.get_data_version() != data_version:
+                return
+    
+    def _get_adaptive_batch_size(self) -> int:
+        """
+        Size the next batch from the backlog depth.
+        
+        A shallow backlog yields small batches so fresh saves are picked up
+        within seconds; a deep backlog grows batches up to batch_size to
+        amortize per-cycle overhead.
+        """
+        backlog = self.db.count_pending_assets()
+        self.metrics.record_queue_depth(backlog)
+        return max(self.min_batch_size, min(self.batch_size, backlog // 2))
+    
+    def _run_single_analysis(self) -> int:
+        """
+        Run a single analysis cycle.
+        
+        Returns:
+            Number of assets whose results were stored; 0 when nothing was
+            pending or every write failed, so callers do not re-run the same
+            batch in a loop
+        """
         try:
+            cycle_started = time.perf_counter()
             # Get pending assets
-            pending_assets = self.db.get_pending_assets(limit=10)
+            pending_assets = self.db.get_pending_assets(limit=self._get_adaptive_batch_size())
             
             if not pending_assets:
-                return
+                return 0
             
             print(f"Analyzing {len(pending_assets)} pending assets...")
             
-            for asset in pending_assets:
+            results: List[Dict] = []
+            tasks, cached_analyses = self._plan_analyses(pending_assets, results)
+            outstanding_hashes = {asset['id']: asset.get('file_hash') for asset in pending_assets}
+            cache_entries: List[Tuple[str, str, int, Dict]] = []
+            written = 0
+            
+            # Per-asset result assembled as its analyzers complete
+            outstanding: Dict[int, Dict] = {}
+            for asset, analyzer, stat in tasks:
+                entry = outstanding.setdefault(asset['id'], {
+                    'asset_id': asset['id'], 'status': 'analyzed',
+                    'analyses': cached_analyses.get(asset['id'], []), 'remaining': 0
+                })
+                entry['remaining'] += 1
+            
+            # Longest jobs first keeps the pools busy until the end of the batch
+            tasks.sort(key=lambda task: task[1].estimate_cost(task[2].st_size), reverse=True)
+            futures = {}
+            # Identical files in one batch share a single run of each cacheable analyzer
+            followers: Dict[Tuple[str, str], List[Tuple[Dict, os.stat_result]]] = {}
+            for asset, analyzer, stat in tasks:
+                if analyzer.cacheable and asset.get('file_hash'):
+                    key = (asset['file_hash'], analyzer.name)
+                    if key in followers:
+                        followers[key].append((asset, stat))
+                        self.cache_misses -= 1
+                        self.cache_hits += 1
+                        continue
+                    followers[key] = []
+                # Paced so analysis backs off while the workstation is busy
+                governor.throttle(ops=1)
+                executor = self._get_executor(analyzer.resource_class)
+                args = (asset['path'], asset.get('file_hash')) if analyzer.pass_file_hash else (asset['path'],)
+                # Timed inside the worker, so queueing is not counted as analyzer latency
+                futures[executor.submit(run_timed, analyzer.func, *args)] = (asset, analyzer, stat)
+            
+            # Single writer: results are collected here and written in batches
+            for future in as_completed(futures):
+                asset, analyzer, stat = futures[future]
+                extension = Path(asset['path']).suffix.lower()
                 try:
-                    self._analyze_asset(asset)
+                    (metadata, seconds), error = future.result(), None
+                    self.metrics.record_analysis(analyzer.name, extension, analyzer.resource_class,
+                                                 seconds, stat.st_size)
+                    if analyzer.cacheable and metadata and asset.get('file_hash'):
+                        cache_entries.append((asset['file_hash'], analyzer.name, analyzer.version, metadata))
                 except Exception as e:
-                    print(f"Error analyzing asset {asset['id']}: {e}")
-                    # Mark asset as error to avoid reprocessing
-                    self.db.update_asset_status(asset['id'], 'error')
-            
-            print(f"Analysis cycle completed.")
-            
+                    metadata, error = None, e
+                    self.metrics.record_error(analyzer.name, extension)
+                
+                copies = followers.get((asset.get('file_hash'), analyzer.name), [])
+                for asset, stat in [(asset, stat)] + copies:
+                    entry = outstanding[asset['id']]
+                    if error is None:
+                        entry['analyses'].append({
+                            'analyzer': analyzer.name,
+                            'version': analyzer.version,
+                            'file_mtime_ns': stat.st_mtime_ns,
+                            'file_size': stat.st_size,
+                            'metadata': metadata
+                        })
+                    else:
+                        print(f"Analysis failed for {asset['name']} ({analyzer.name}): {error}")
+                        # Retried with backoff, quarantined as 'poison' after repeated failures
+                        entry['status'] = 'failed'
+                        entry['error'] = f"{analyzer.name}: {type(error).__name__}: {error}"[:2000]
+                    
+                    entry['remaining'] -= 1
+                    if entry['remaining'] == 0:
+                        del entry['remaining']
+                        results.append(outstanding.pop(asset['id']))
+                
+                if len(results) >= self.write_batch_size:
+                    if self._write_results(results, outstanding_hashes, cache_entries):
+                        written += len(results)
+                    results, cache_entries = [], []
+            
+            if (results or cache_entries) and self._write_results(results, outstanding_hashes, cache_entries):
+                written += len(results)
+            
+            self.thumbnails.enforce_budget()
+            self.db.evict_analysis_cache(self.config.analysis_cache_max_entries)
+            if self._prune_needed:
+                # Text, image hashes, palettes, waveforms and archive members indexed
+                # under hashes no asset has any more
+                self.db.prune_content_index()
+                self.db.prune_image_hashes()
+                self.db.prune_image_colors()
+                self.db.prune_waveforms()
+                self.db.prune_archive_members()
+                self._prune_needed = False
+            
+            self.metrics.record_cycle(time.perf_counter() - cycle_started, {
+                resource_class: self._pool_size(resource_class) for resource_class in self._executors
+            })
+            if time.monotonic() - self._metrics_saved_at >= self.config.analysis_metrics_persist_interval:
+                self._save_metrics()
+            
+            if written < len(pending_assets):
+                print(f"Analysis cycle stored results for {written} of {len(pending_assets)} assets.")
+            else:
+                print(f"Analysis cycle completed.")
+            return written
+        
         except Exception as e:
             print(f"Error in single analysis cycle: {e}")
+            return 0
     
-    def _analyze_asset(self, asset: Dict):
-        """Analyze a single asset."""
-        asset_id = asset['id']
-        file_path = asset['path']
-        category = asset.get('category', 'Uncategorized')
-        
-        print(f"Analyzing: {asset['name']} (ID: {asset_id})")
+    def _write_results(self, results: List[Dict], file_hashes: Dict[int, Optional[str]],
+                       cache_entries: List[Tuple[str, str, int, Dict]]) -> bool:
+        """
+        Write a batch of results and store any thumbnails, text, image hashes, palettes, waveforms and archive members they produced.
         
-        # Validate file exists
-        if not Path(file_path).exists():
-            print(f"File not found: {file_path}")
-            self.db.update_asset_status(asset_id, 'error')
-            return
+        Returns:
+            True if the results were committed
+        """
+        started = time.perf_counter()
+        documents = []
+        image_hashes = []
+        palettes: Dict[str, List[Tuple]] = {}
+        waveforms = []
+        archives: Dict[str, List[Tuple]] = {}
+        for result in results:
+            for analysis in result['analyses']:
+                metadata = analysis.get('metadata')
+                if analysis['analyzer'] == 'thumbnail' and metadata and metadata.get('files'):
+                    # File list goes to the cache index, not to asset metadata
+                    self.thumbnails.record(file_hashes[result['asset_id']], metadata.pop('files'))
+                elif analysis['analyzer'] in CONTENT_ANALYZERS and metadata and 'content' in metadata:
+                    # Extracted text goes to the content index, keyed by file hash
+                    content = metadata.pop('content')
+                    if file_hashes.get(result['asset_id']):
+                        documents.append((file_hashes[result['asset_id']], content))
+                elif analysis['analyzer'] == 'perceptual_hash' and metadata and metadata.get('dhash'):
+                    if file_hashes.get(result['asset_id']):
+                        image_hashes.append(index_row(file_hashes[result['asset_id']], metadata['dhash']))
+                elif analysis['analyzer'] == 'palette' and metadata and metadata.get('palette'):
+                    file_hash = file_hashes.get(result['asset_id'])
+                    if file_hash:
+                        palettes[file_hash] = palette_index_rows(file_hash, metadata['palette'])
+                elif analysis['analyzer'] == 'waveform' and metadata and 'waveform' in metadata:
+                    # Peak blob goes to the waveform table, not to asset metadata
+                    blob = metadata.pop('waveform')
+                    if file_hashes.get(result['asset_id']):
+                        waveforms.append((file_hashes[result['asset_id']], blob))
+                elif analysis['analyzer'] == 'archive' and metadata and 'members' in metadata:
+                    # Member listing goes to the archive member index
+                    members = metadata.pop('members')
+                    file_hash = file_hashes.get(result['asset_id'])
+                    if file_hash:
+                        archives[file_hash] = member_index_rows(file_hash, members)
         
-        # Get appropriate analysis function based on category
-        analysis_func = self.supported_analysis_types.get(category.lower())
+        if documents:
+            content_started = time.perf_counter()
+            if self.db.save_content_documents(documents):
+                self.content_ingest['write_seconds'] += time.perf_counter() - content_started
+                for _, content in documents:
+                    self.content_ingest['documents'] += 1
+                    self.content_ingest['chars'] += content['chars']
+                    self.content_ingest['bytes_read'] += content['bytes_read']
+                    self.content_ingest['extract_seconds'] += content['seconds']
         
-        if analysis_func:
-            try:
-                metadata = analysis_func(file_path)
-                if metadata:
-                    # Store metadata
-                    for key, value in metadata.items():
-                        self.db.add_asset_metadata(asset_id, key, str(value))
-                
-                # Mark as analyzed
-                self.db.update_asset_status(asset_id, 'analyzed')
-                print(f"Analysis complete for: {asset['name']}")
-                
-            except Exception as e:
-                print(f"Analysis failed for {asset['name']}: {e}")
-                self.db.update_asset_status(asset_id, 'error')
-        else:
-            # No specific analysis available, mark as analyzed
-            self.db.update_asset_status(asset_id, 'analyzed')
-            print(f"No analysis available for category: {category}")
+        if image_hashes:
+            self.db.save_image_hashes(image_hashes)
+        if palettes:
+            self.db.save_image_colors(list(palettes), [row for rows in palettes.values() for row in rows])
+        if waveforms:
+            self.db.save_waveforms(waveforms)
+        if archives:
+            self.db.save_archive_members(list(archives), [row for rows in archives.values() for row in rows])
+        saved = self.db.save_analysis_results(results, cache_entries)
+        self.metrics.record_stage('db_write', time.perf_counter() - started)
+        return saved
     
-    def _analyze_image(self, file_path: str) -> Optional[Dict]:
-        """Analyze image files."""
-        try:
-            metadata = {}
+    def _plan_analyses(self, assets: List[Dict], results: List[Dict]) -> Tuple[
+            List[Tuple[Dict, Analyzer, os.stat_result]], Dict[int, List[Dict]]]:
+        """
+        Decide which analyzers to run for each asset.
+        
+        An analyzer is skipped when it already ran at its current version on
+        the file as it is now (same mtime and size). New and changed files go
+        through a single read pass (see _read_pass) that re-computes their
+        hash and runs any analyzers able to work from that pass. An analyzer
+        whose result is cached for the file's content hash is satisfied from
+        the cache instead of running. Assets that need no worker (missing
+        file, nothing to run, everything cached or served by the read pass)
+        get their result appended to `results` directly.
+        
+        Returns:
+            List of (asset, analyzer, stat) tasks to submit, and the analyses
+            already done (read pass, cache) of assets that still have tasks,
+            keyed by asset id
+        """
+        completed = self.db.get_asset_analyses([asset['id'] for asset in assets])
+        planned = []
+        
+        for asset in assets:
+            asset_id = asset['id']
+            file_path = asset['path']
             
-            # Try to extract EXIF data if available
+            # Validate file exists
             try:
-                from PIL import Image
-                from PIL.ExifTags import TAGS
-                
-                with Image.open(file_path) as img:
-                    metadata['width'] = img.width
-                    metadata['height'] = img.height
-                    metadata['format'] = img.format
-                    metadata['mode'] = img.mode
-                    
-                    # Extract EXIF data
-                    if hasattr(img, '_getexif') and img._getexif():
-                        exif = {}
-                        for tag_id, value in img._getexif().items():
-                            tag = TAGS.get(tag_id, tag_id)
-                            exif[tag] = value
-                        metadata['exif'] = json.dumps(exif)
-                        
-                        # Extract common EXIF fields
-                        if 'DateTime' in exif:
-                            metadata['date_taken'] = exif['DateTime']
-                        if 'Make' in exif and 'Model' in exif:
-                            metadata['camera'] = f"{exif['Make']} {exif['Model']}"
-                        
-            except ImportError:
-                metadata['analysis_note'] = 'PIL not available for detailed image analysis'
-            except Exception as e:
-                metadata['analysis_error'] = f'EXIF extraction failed: {e}'
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Error analyzing image {file_path}: {e}")
-            return None
+                stat = os.stat(file_path)
+            except OSError:
+                print(f"File not found: {file_path}")
+                results.append({'asset_id': asset_id, 'status': 'error', 'analyses': []})
+                continue
+            
+            analyzers = self.registry.for_extension(Path(file_path).suffix)
+            # Without a known extension the analyzers come from magic bytes, read in the pass
+            sniff = not analyzers
+            to_run = [analyzer for analyzer in analyzers
+                      if not self._is_current(analyzer, completed.get(asset_id, {}), stat)]
+            
+            if not to_run and not sniff:
+                # No analysis needed, mark as analyzed
+                results.append({'asset_id': asset_id, 'status': 'analyzed', 'analyses': []})
+                continue
+            
+            planned.append((asset, stat, to_run, sniff))
+        
+        passes = self._read_pass(planned)
+        
+        remaining = []
+        served_analyses: Dict[int, List[Dict]] = {}
+        for asset, stat, to_run, sniff in planned:
+            served, matched = passes.get(asset['id'], ([], None))
+            if sniff:
+                to_run = [analyzer for analyzer in matched or []
+                          if not self._is_current(analyzer, completed.get(asset['id'], {}), stat)]
+            done = {analysis['analyzer'] for analysis in served}
+            to_run = [analyzer for analyzer in to_run if analyzer.name not in done]
+            
+            if not to_run:
+                results.append({'asset_id': asset['id'], 'status': 'analyzed', 'analyses': served})
+                continue
+            served_analyses[asset['id']] = served
+            remaining.append((asset, stat, to_run))
+        
+        keys = [(asset['file_hash'], analyzer.name, analyzer.version)
+                for asset, stat, to_run in remaining if asset.get('file_hash')
+                for analyzer in to_run if analyzer.cacheable]
+        cached = self.db.get_cached_analyses(keys) if keys else {}
+        if cached:
+            self.db.touch_cached_analyses(list(cached), time.time())
+        
+        tasks = []
+        cached_analyses: Dict[int, List[Dict]] = {}
+        for asset, stat, to_run in remaining:
+            hits = list(served_analyses[asset['id']])
+            queued = len(tasks)
+            for analyzer in to_run:
+                key = (asset.get('file_hash'), analyzer.name, analyzer.version)
+                if analyzer.cacheable and key in cached:
+                    self.cache_hits += 1
+                    hits.append({
+                        'analyzer': analyzer.name,
+                        'version': analyzer.version,
+                        'file_mtime_ns': stat.st_mtime_ns,
+                        'file_size': stat.st_size,
+                        'metadata': cached[key]
+                    })
+                else:
+                    if analyzer.cacheable:
+                        self.cache_misses += 1
+                    tasks.append((asset, analyzer, stat))
+            
+            if len(tasks) == queued:
+                results.append({'asset_id': asset['id'], 'status': 'analyzed', 'analyses': hits})
+            elif hits:
+                cached_analyses[asset['id']] = hits
+        
+        return tasks, cached_analyses
     
-    def _analyze_document(self, file_path: str) -> Optional[Dict]:
-        """Analyze document files."""
-        try:
-            metadata = {}
-            
-            # Basic document analysis
-            path = Path(file_path)
-            metadata['extension'] = path.suffix.lower()
-            
-            # Try to extract text content for text-based documents
-            if path.suffix.lower() == '.txt':
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        metadata['line_count'] = len(content.splitlines())
-                        metadata['char_count'] = len(content)
-                        metadata['word_count'] = len(content.split())
-                except Exception as e:
-                    metadata['text_analysis_error'] = str(e)
-            
-            elif path.suffix.lower() == '.pdf':
-                try:
-                    import PyPDF2
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        metadata['page_count'] = len(pdf_reader.pages)
-                        
-                        # Try to extract basic metadata
-                        if pdf_reader.metadata:
-                            meta = pdf_reader.metadata
-                            if meta.title:
-                                metadata['title'] = meta.title
-                            if meta.author:
-                                metadata['author'] = meta.author
-                            if meta.subject:
-                                metadata['subject'] = meta.subject
-                            
-                except ImportError:
-                    metadata['analysis_note'] = 'PyPDF2 not available for PDF analysis'
-                except Exception as e:
-                    metadata['pdf_analysis_error'] = str(e)
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Error analyzing document {file_path}: {e}")
-            return None
+    @staticmethod
+    def _is_current(analyzer: Analyzer, previous: Dict[str, Tuple], stat: os.stat_result) -> bool:
+        """Check whether an analyzer already ran at its current version on the file as it is now."""
+        return previous.get(analyzer.name) == (analyzer.version, stat.st_mtime_ns, stat.st_size)
     
-    def _analyze_video(self, file_path: str) -> Optional[Dict]:
-        """Analyze video files."""
-        try:
-            metadata = {}
-            
-            # Basic video analysis
-            try:
-                import cv2
-                
-                cap = cv2.VideoCapture(file_path)
-                if cap.isOpened():
-                    metadata['width'] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    metadata['height'] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    metadata['fps'] = cap.get(cv2.CAP_PROP_FPS)
-                    metadata['frame_count'] = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    metadata['duration_seconds'] = metadata['frame_count'] / metadata['fps'] if metadata['fps'] > 0 else 0
-                    
-                    cap.release()
-                    
-            except ImportError:
-                metadata['analysis_note'] = 'OpenCV not available for video analysis'
-            except Exception as e:
-                metadata['video_analysis_error'] = str(e)
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Error analyzing video {file_path}: {e}")
-            return None
+    def _read_pass(self, planned: List[Tuple[Dict, os.stat_result, List[Analyzer], bool]]
+                   ) -> Dict[int, Tuple[List[Dict], Optional[List[Analyzer]]]]:
+        """
+        Read new and changed files once, in the I/O pool, for everything that needs their bytes.
+        
+        Each pass feeds the content hasher (files changed since their hash
+        was computed), the magic-byte sniffer (files without a known
+        extension) and, while the whole file is being read anyway, the
+        read-pass consumers of the analyzers due to run, whose results stand
+        in for running those analyzers. Every read is paced by the background
+        governor. A save that only touches the mtime keeps its hash, so its
+        analyses are then served from the cache.
+        
+        Returns:
+            (analyses served by the pass, analyzers matched by magic bytes or
+            None when not sniffed), keyed by asset id
+        """
+        jobs = []
+        for asset, stat, to_run, sniff in planned:
+            stale = (not asset.get('file_hash') or asset.get('hash_mtime_ns') != stat.st_mtime_ns
+                     or asset.get('file_size') != stat.st_size)
+            if not stale and not sniff:
+                continue
+            
+            consumers: List[Consumer] = []
+            streamed = []
+            if stale:
+                consumers.append(HashConsumer('sha256'))
+                for analyzer in to_run:
+                    if analyzer.consumer:
+                        consumer = analyzer.consumer(asset['path'])
+                        consumer.name = analyzer.name
+                        consumers.append(consumer)
+                        streamed.append(analyzer)
+            if sniff:
+                consumers.append(SniffConsumer(MAGIC_SNIFF_BYTES))
+            jobs.append((asset, stat, stale, sniff, streamed, consumers))
+        
+        if not jobs:
+            return {}
+        if any(stale for _, _, stale, _, _, _ in jobs):
+            self._prune_needed = True
+        
+        executor = self._get_executor(IO_BOUND)
+        outcomes = executor.map(run_timed, repeat(read_once),
+                                [job[0]['path'] for job in jobs], [job[5] for job in jobs],
+                                repeat(READ_BLOCK_SIZE), repeat(governor.throttle))
+        
+        passes = {}
+        updates = []
+        for (asset, stat, stale, sniff, streamed, _), (outcome, seconds) in zip(jobs, outcomes):
+            if 'error' in outcome:
+                print(f"Error reading {asset['path']}: {outcome['error']}")
+            results = outcome['results']
+            extension = Path(asset['path']).suffix.lower()
+            
+            # Waiting on the governor is not read time
+            seconds -= outcome['throttled_seconds']
+            served = []
+            for analyzer in streamed:
+                metadata = results.get(analyzer.name)
+                if metadata is None:
+                    # Not enough in the pass (e.g. a JPEG frame header past the probed head)
+                    continue
+                consumer_seconds = outcome['seconds'][analyzer.name]
+                seconds -= consumer_seconds
+                self.metrics.record_analysis(analyzer.name, extension, IO_BOUND, consumer_seconds, stat.st_size)
+                served.append({
+                    'analyzer': analyzer.name,
+                    'version': analyzer.version,
+                    'file_mtime_ns': stat.st_mtime_ns,
+                    'file_size': stat.st_size,
+                    'metadata': metadata
+                })
+            self.metrics.record_stage('read_pass', seconds, outcome['bytes_read'], IO_BOUND)
+            self.metrics.record_read_pass(outcome['bytes_read'], stat.st_size, len(served))
+            
+            if stale:
+                asset['file_hash'] = results.get('sha256')
+                updates.append((asset['id'], asset['file_hash'], stat.st_size, stat.st_mtime_ns))
+            matched = self.registry.match_header(results.get('sniff') or b'') if sniff else None
+            passes[asset['id']] = (served, matched)
+        
+        if updates:
+            self.db.update_asset_hashes(updates)
+        return passes
     
-    def _analyze_audio(self, file_path: str) -> Optional[Dict]:
-        """Analyze audio files."""
+    def requeue_outdated_analyses(self) -> int:
+        """
+        Set analyzed assets back to pending when a registered analyzer is newer
+        than the version that ran on them, or has never run on them.
+        
+        Only the outdated analyzers run when these assets are picked up again.
+        
+        Returns:
+            Number of assets re-queued
+        """
         try:
-            metadata = {}
-            
-            # Basic audio analysis
-            try:
-                import mutagen
-                
-                audio = mutagen.File(file_path)
-                if audio:
-                    metadata['duration_seconds'] = getattr(audio.info, 'length', None)
-                    metadata['bitrate'] = getattr(audio.info, 'bitrate', None)
-                    metadata['sample_rate'] = getattr(audio.info, 'sample_rate', None)
-                    
-                    # Extract tags if available
-                    if audio.tags:
-                        tags = {}
-                        for key, value in audio.tags.items():
-                            if hasattr(value, 'text'):
-                                tags[key] = value.text[0] if value.text else None
-                            else:
-                                tags[key] = str(value)
-                        metadata['tags'] = json.dumps(tags)
-                        
-                        # Extract common fields
-                        if 'title' in tags:
-                            metadata['title'] = tags['title']
-                        if 'artist' in tags:
-                            metadata['artist'] = tags['artist']
-                        if 'album' in tags:
-                            metadata['album'] = tags['album']
-                        
-            except ImportError:
-                metadata['analysis_note'] = 'Mutagen not available for audio analysis'
-            except Exception as e:
-                metadata['audio_analysis_error'] = str(e)
-            
-            return metadata
-            
+            versions = self.db.get_analyzer_versions()
+            outdated = []
+            
+            for asset in self.db.get_analyzed_assets():
+                stored = versions.get(asset['id'], {})
+                if any(stored.get(analyzer.name) != analyzer.version
+                       for analyzer in self.registry.for_extension(Path(asset['path']).suffix)):
+                    outdated.append(asset['id'])
+            
+            if outdated:
+                self.db.mark_assets_pending_by_id(outdated)
+                print(f"Re-queued {len(outdated)} assets with outdated analyzers.")
+            return len(outdated)
+        
         except Exception as e:
-            print(f"Error analyzing audio {file_path}: {e}")
-            return None
+            print(f"Error re-queuing outdated analyses: {e}")
+            return 0
     
-    def _analyze_code(self, file_path: str) -> Optional[Dict]:
-        """Analyze code files."""
-        try:
-            metadata = {}
-            
-            path = Path(file_path)
-            metadata['language'] = self._get_programming_language(path.suffix.lower())
-            
-            # Basic code metrics
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    
-                    metadata['line_count'] = len(lines)
-                    metadata['char_count'] = sum(len(line) for line in lines)
-                    metadata['empty_line_count'] = sum(1 for line in lines if line.strip() == '')
-                    metadata['comment_line_count'] = sum(1 for line in lines if line.strip().startswith(('#', '//', '/*', '*', '--')))
-                    
-            except Exception as e:
-                metadata['code_analysis_error'] = str(e)
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Error analyzing code {file_path}: {e}")
-            return None
+    def _get_cache_stats(self) -> Dict:
+        """Get analysis cache counters for this run and the stored totals."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': round(self.cache_hits / lookups, 3) if lookups else None,
+            'max_entries': self.config.analysis_cache_max_entries,
+            **self.db.get_analysis_cache_stats()
+        }
     
-    def _get_programming_language(self, extension: str) -> str:
-        """Get programming language from file extension."""
-        language_map = {
-            '.py': 'Python',
-            '.js': 'JavaScript',
-            '.html': 'HTML',
-            '.css': 'CSS',
-            '.json': 'JSON',
-            '.xml': 'XML',
-            '.yaml': 'YAML',
-            '.yml': 'YAML',
-            '.java': 'Java',
-            '.cpp': 'C++',
-            '.c': 'C',
-            '.cs': 'C#',
-            '.php': 'PHP',
-            '.rb': 'Ruby',
-            '.go': 'Go',
-            '.rs': 'Rust',
-            '.ts': 'TypeScript'
+    def _get_content_ingest_stats(self) -> Dict:
+        """Get this run's content index ingest throughput (the index size is in the database stats)."""
+        ingest = self.content_ingest
+        extract_seconds, write_seconds = ingest['extract_seconds'], ingest['write_seconds']
+        return {
+            **{key: round(value, 3) for key, value in ingest.items()},
+            'max_bytes_per_file': self.config.content_index_max_bytes,
+            # Extraction runs in parallel workers, so this is the rate of a single worker
+            'extract_mb_per_second': round(ingest['bytes_read'] / extract_seconds / (1024 * 1024), 2)
+            if extract_seconds else None,
+            'write_chars_per_second': round(ingest['chars'] / write_seconds) if write_seconds else None
         }
-        return language_map.get(extension, 'Unknown')
     
     def get_analysis_stats(self) -> Dict:
         """Get analysis statistics."""
@@ -387,7 +672,36 @@ class AssetAnalyst:
                 stats['analysis'] = {
                     'status_breakdown': status_counts,
                     'analyzed_assets': analyzed_count,
-                    'analysis_interval': self.analysis_interval
+                    'analysis_interval': self.analysis_interval,
+                    'pending_backlog': status_counts.get('pending', 0),
+                    'batch_size': self.batch_size,
+                    'min_batch_size': self.min_batch_size,
+                    'poll_interval': self.poll_interval,
+                    'cpu_workers': self.cpu_workers,
+                    'io_workers': self.io_workers,
+                    'heavy_workers': self.heavy_workers,
+                    'thumbnail_cache': self.thumbnails.get_stats(),
+                    'poisoned_assets': status_counts.get('poison', 0),
+                    'worker_pools': {
+                        resource_class: executor.get_stats()
+                        for resource_class, executor in self._executors.items()
+                        if isinstance(executor, SupervisedProcessPool)
+                    },
+                    'analysis_cache': self._get_cache_stats(),
+                    'content_ingest': self._get_content_ingest_stats(),
+                    'performance': self.metrics.snapshot(),
+                    # The running analyst's pacing, live or as last saved
+                    'governor': governor.get_stats() if self.is_running
+                    else self.db.get_metrics_state('analyst_governor'),
+                    'analyzers': {
+                        analyzer.name: {
+                            'version': analyzer.version,
+                            'resource_class': analyzer.resource_class,
+                            'extensions': sorted(analyzer.extensions)
+                        }
+                        for analyzer in self.registry.all()
+                    },
+                    'write_batch_size': self.write_batch_size
                 }
             
             return stats
@@ -404,18 +718,31 @@ def main():
     parser = argparse.ArgumentParser(description='Asset Analyst - Analyze and process indexed assets')
     parser.add_argument('--once', action='store_true', help='Run analysis once and exit')
     parser.add_argument('--continuous', action='store_true', help='Run continuous analysis')
-    parser.add_argument('--interval', type=int, default=60, help='Analysis interval in seconds (default: 60)')
+    parser.add_argument('--interval', type=int, default=60, help='Maximum idle seconds between backlog checks (default: 60)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Pending assets per cycle (default: 200)')
+    parser.add_argument('--cpu-workers', type=int, help='Processes for CPU-bound analyzers (default: CPU count)')
+    parser.add_argument('--io-workers', type=int, default=8, help='Threads for I/O-bound analyzers (default: 8)')
     parser.add_argument('--stats', action='store_true', help='Show analysis statistics')
+    parser.add_argument('--poisoned', action='store_true', help='List assets quarantined after repeated failures')
+    parser.add_argument('--retry-poisoned', action='store_true', help='Give quarantined assets another round of attempts')
     
     args = parser.parse_args()
     
     try:
-        analyst = AssetAnalyst(analysis_interval=args.interval)
+        analyst = AssetAnalyst(analysis_interval=args.interval, batch_size=args.batch_size,
+                               cpu_workers=args.cpu_workers, io_workers=args.io_workers)
         
         if args.stats:
             stats = analyst.get_analysis_stats()
             print(json.dumps(stats, indent=2))
             
+        elif args.poisoned:
+            print(json.dumps(analyst.db.get_poisoned_assets(), indent=2, default=str))
+            
+        elif args.retry_poisoned:
+            released = analyst.db.release_poisoned_assets()
+            print(f"Released {released} quarantined assets for analysis.")
+            
         elif args.once:
             analyst.start_analysis(continuous=False)
             
@@ -423,7 +750,7 @@ def main():
             analyst.start_analysis(continuous=True)
             
         else:
-            print("Please specify --once, --continuous, or --stats")
+            print("Please specify --once, --continuous, --stats, --poisoned or --retry-poisoned")
             
     except Exception as e:
         print(f"Error: {e}")
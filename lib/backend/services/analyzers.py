@@ -0,0 +1,502 @@
+"""
+Content analyzers for the asset analyst service.
+Analyzers are plain functions of a file path so they can run in worker processes.
+"""
+
+from typing import Dict, List, Optional, Callable, Iterable, Tuple
+from pathlib import Path
+
+from shared.config import config
+from services.archives import list_archive
+from services.cad import analyze_cad
+from services.content import extract_pdf_content, extract_text_content
+from services.exif import split_audio_tags, split_exif, typed_exif
+from services.file_reader import Consumer
+from services.palette import extract_palette
+from services.pdf_info import PdfError, read_pdf_info
+from services.probes import ImageProbeConsumer, probe_image, probe_mp4
+from services.similarity import compute_perceptual_hash
+from services.text_stats import TextStatsConsumer, analyze_text_stream
+from services.thumbnails import generate_thumbnails
+from services.waveform import compute_waveform
+
+
+# Resource classes used to route analyzers to the right worker pool
+CPU_BOUND = 'cpu'
+IO_BOUND = 'io'
+HEAVY = 'heavy'  # Memory-hungry or crash-prone decoders, run in a small dedicated pool
+
+# Bytes read from a file to sniff its type by magic number
+MAGIC_SNIFF_BYTES = 32
+
+# Line prefixes counted as comments by the code analyzer
+COMMENT_PREFIXES = ('#', '//', '/*', '*', '--')
+
+# Analyzers whose 'content' output feeds the full-text content index
+CONTENT_ANALYZERS = ('text_content', 'pdf_content')
+
+
+def _probed_image_metadata(probed: Optional[Dict]) -> Optional[Dict]:
+    """Image metadata from a header probe, or None if the probe found no dimensions or mode."""
+    # Without a mode (TIFF, unusual colour types) PIL fills in the same keys instead
+    if not probed or not probed.get('width') or not probed.get('mode'):
+        return None
+    
+    metadata = {'width': probed['width'], 'height': probed['height'], 'format': probed['format'],
+                'mode': probed['mode']}
+    # The probe reads only whitelisted tags, so there is no remainder
+    metadata.update(typed_exif(probed.get('exif', {})))
+    return metadata
+
+
+def analyze_image(file_path: str) -> Optional[Dict]:
+    """Analyze image files (header probe first, PIL as fallback)."""
+    try:
+        # Header-only probe covers the common formats without decoding
+        metadata = _probed_image_metadata(probe_image(file_path))
+        if metadata:
+            return metadata
+        metadata = {}
+        
+        # Try to extract EXIF data if available
+        try:
+            from PIL import Image
+            from PIL.ExifTags import TAGS
+            
+            with Image.open(file_path) as img:
+                metadata['width'] = img.width
+                metadata['height'] = img.height
+                metadata['format'] = img.format
+                metadata['mode'] = img.mode
+                
+                # Whitelisted EXIF fields typed; the rest, without maker notes and
+                # previews, stored compressed under 'exif'
+                if hasattr(img, '_getexif') and img._getexif():
+                    exif = {TAGS.get(tag_id, tag_id): value for tag_id, value in img._getexif().items()}
+                    typed, remainder = split_exif(exif)
+                    metadata.update(typed)
+                    if remainder:
+                        metadata['exif'] = remainder
+        
+        except ImportError:
+            metadata['analysis_note'] = 'PIL not available for detailed image analysis'
+        except Exception as e:
+            metadata['analysis_error'] = f'EXIF extraction failed: {e}'
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing image {file_path}: {e}")
+        return None
+
+
+def analyze_text(file_path: str) -> Optional[Dict]:
+    """Analyze plain text documents."""
+    try:
+        metadata = {'extension': Path(file_path).suffix.lower()}
+        
+        try:
+            # Streamed in bounded memory; stops at the configured byte cap
+            metadata.update(analyze_text_stream(file_path, config.text_analysis_max_bytes))
+        except Exception as e:
+            metadata['text_analysis_error'] = str(e)
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing document {file_path}: {e}")
+        return None
+
+
+def analyze_pdf(file_path: str) -> Optional[Dict]:
+    """Analyze PDF documents (cross-reference fast path first, PyPDF2 as fallback)."""
+    try:
+        metadata = {'extension': Path(file_path).suffix.lower()}
+        
+        # Page count and info straight from the xref, without loading the page tree
+        try:
+            info = read_pdf_info(file_path)
+            del info['bytes_read']
+            metadata.update(info)
+            return metadata
+        except PdfError:
+            pass
+        
+        try:
+            import PyPDF2
+            with open(file_path, 'rb') as f:
+                pdf_reader = PyPDF2.PdfReader(f)
+                metadata['page_count'] = len(pdf_reader.pages)
+                
+                # Try to extract basic metadata
+                if pdf_reader.metadata:
+                    meta = pdf_reader.metadata
+                    if meta.title:
+                        metadata['title'] = meta.title
+                    if meta.author:
+                        metadata['author'] = meta.author
+                    if meta.subject:
+                        metadata['subject'] = meta.subject
+        
+        except ImportError:
+            metadata['analysis_note'] = 'PyPDF2 not available for PDF analysis'
+        except Exception as e:
+            metadata['pdf_analysis_error'] = str(e)
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing document {file_path}: {e}")
+        return None
+
+
+def analyze_video(file_path: str) -> Optional[Dict]:
+    """Analyze video files (MP4/MOV atom probe first, OpenCV as fallback)."""
+    try:
+        # MP4/MOV dimensions and timing come straight from the moov atom
+        if Path(file_path).suffix.lower() in ('.mp4', '.mov', '.m4v'):
+            probed = probe_mp4(file_path)
+            if probed and probed.get('width'):
+                return probed
+        
+        metadata = {}
+        
+        # Basic video analysis
+        try:
+            import cv2
+            
+            cap = cv2.VideoCapture(file_path)
+            if cap.isOpened():
+                metadata['width'] = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                metadata['height'] = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                metadata['fps'] = cap.get(cv2.CAP_PROP_FPS)
+                metadata['frame_count'] = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                metadata['duration_seconds'] = metadata['frame_count'] / metadata['fps'] if metadata['fps'] > 0 else 0
+                
+                cap.release()
+        
+        except ImportError:
+            metadata['analysis_note'] = 'OpenCV not available for video analysis'
+        except Exception as e:
+            metadata['video_analysis_error'] = str(e)
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing video {file_path}: {e}")
+        return None
+
+
+def analyze_audio(file_path: str) -> Optional[Dict]:
+    """Analyze audio files."""
+    try:
+        metadata = {}
+        
+        # Basic audio analysis
+        try:
+            import mutagen
+            
+            # Easy tags: common names across formats, pictures left out
+            audio = mutagen.File(file_path, easy=True)
+            if audio:
+                metadata['duration_seconds'] = getattr(audio.info, 'length', None)
+                metadata['bitrate'] = getattr(audio.info, 'bitrate', None)
+                metadata['sample_rate'] = getattr(audio.info, 'sample_rate', None)
+                
+                # Whitelisted tags typed; the rest stored compressed under 'tags'
+                if audio.tags:
+                    typed, remainder = split_audio_tags(dict(audio.tags.items()))
+                    metadata.update(typed)
+                    if remainder:
+                        metadata['tags'] = remainder
+        
+        except ImportError:
+            metadata['analysis_note'] = 'Mutagen not available for audio analysis'
+        except Exception as e:
+            metadata['audio_analysis_error'] = str(e)
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing audio {file_path}: {e}")
+        return None
+
+
+def analyze_code(file_path: str) -> Optional[Dict]:
+    """Analyze code files."""
+    try:
+        metadata = {}
+        
+        path = Path(file_path)
+        metadata['language'] = get_programming_language(path.suffix.lower())
+        
+        # Basic code metrics, streamed in bounded memory
+        try:
+            metadata.update(analyze_text_stream(file_path, config.text_analysis_max_bytes,
+                                                COMMENT_PREFIXES))
+        
+        except Exception as e:
+            metadata['code_analysis_error'] = str(e)
+        
+        return metadata
+    
+    except Exception as e:
+        print(f"Error analyzing code {file_path}: {e}")
+        return None
+
+
+class ImageAnalysisConsumer(ImageProbeConsumer):
+    """The image analyzer's header probe, run inside a read pass; None leaves it to analyze_image."""
+    
+    name = 'image'
+    
+    def __init__(self, file_path: str):
+        super().__init__()
+    
+    def finish(self, file_size: int) -> Optional[Dict]:
+        return _probed_image_metadata(super().finish(file_size))
+
+
+class TextAnalysisConsumer(TextStatsConsumer):
+    """analyze_text() as a consumer of a read pass."""
+    
+    name = 'text'
+    
+    def __init__(self, file_path: str):
+        super().__init__(config.text_analysis_max_bytes)
+        self.extension = Path(file_path).suffix.lower()
+    
+    def finish(self, file_size: int) -> Dict:
+        metadata = {'extension': self.extension}
+        try:
+            metadata.update(super().finish(file_size))
+        except Exception as e:
+            metadata['text_analysis_error'] = str(e)
+        return metadata
+
+
+class CodeAnalysisConsumer(TextStatsConsumer):
+    """analyze_code() as a consumer of a read pass."""
+    
+    name = 'code'
+    
+    def __init__(self, file_path: str):
+        super().__init__(config.text_analysis_max_bytes, COMMENT_PREFIXES)
+        self.language = get_programming_language(Path(file_path).suffix.lower())
+    
+    def finish(self, file_size: int) -> Dict:
+        metadata = {'language': self.language}
+        try:
+            metadata.update(super().finish(file_size))
+        except Exception as e:
+            metadata['code_analysis_error'] = str(e)
+        return metadata
+
+
+def get_programming_language(extension: str) -> str:
+    """Get programming language from file extension."""
+    language_map = {
+        '.py': 'Python',
+        '.js': 'JavaScript',
+        '.html': 'HTML',
+        '.css': 'CSS',
+        '.json': 'JSON',
+        '.xml': 'XML',
+        '.yaml': 'YAML',
+        '.yml': 'YAML',
+        '.java': 'Java',
+        '.cpp': 'C++',
+        '.c': 'C',
+        '.cs': 'C#',
+        '.php': 'PHP',
+        '.rb': 'Ruby',
+        '.go': 'Go',
+        '.rs': 'Rust',
+        '.ts': 'TypeScript'
+    }
+    return language_map.get(extension, 'Unknown')
+
+
+class Analyzer:
+    """A content analyzer and the metadata the scheduler needs to run it."""
+    
+    def __init__(self, name: str, func: Callable[[str], Optional[Dict]],
+                 extensions: Iterable[str] = (), magic: Iterable[Tuple[int, bytes]] = (),
+                 resource_class: str = CPU_BOUND, version: int = 1,
+                 base_cost: float = 1.0, cost_per_mb: float = 0.0,
+                 pass_file_hash: bool = False, cacheable: bool = True,
+                 consumer: Optional[Callable[[str], Consumer]] = None):
+        """
+        Args:
+            name: Unique analyzer name, stored with each result
+            func: Module-level function taking a file path and returning metadata
+            extensions: Lower-case file extensions (with dot) handled by the analyzer
+            magic: (offset, signature) pairs identifying the format by content
+            resource_class: CPU_BOUND, IO_BOUND or HEAVY
+            version: Bump when the output changes so stored results are re-run
+            base_cost: Estimated milliseconds per file
+            cost_per_mb: Estimated additional milliseconds per MB of input
+            pass_file_hash: Call func(file_path, file_hash) instead of func(file_path)
+            cacheable: Output depends only on file content, so it can be reused
+                for identical files through the analysis cache
+            consumer: Factory, given the file path, of a read-pass consumer whose
+                result is the analyzer's metadata (None: run func after all). When
+                the analyst reads a file anyway, the analyzer runs inside that pass
+        """
+        self.name = name
+        self.func = func
+        self.extensions = frozenset(extensions)
+        self.magic = tuple(magic)
+        self.resource_class = resource_class
+        self.version = version
+        self.base_cost = base_cost
+        self.cost_per_mb = cost_per_mb
+        self.pass_file_hash = pass_file_hash
+        self.cacheable = cacheable
+        self.consumer = consumer
+    
+    def estimate_cost(self, file_size: int) -> float:
+        """Estimate the milliseconds needed to analyze a file of the given size."""
+        return self.base_cost + self.cost_per_mb * (file_size or 0) / (1024 * 1024)
+    
+    def matches_magic(self, header: bytes) -> bool:
+        """Check whether a file header carries one of this analyzer's signatures."""
+        return any(header[offset:offset + len(signature)] == signature
+                   for offset, signature in self.magic)
+
+
+class AnalyzerRegistry:
+    """Registry of analyzers keyed by file extension, with magic-byte fallback."""
+    
+    def __init__(self):
+        self._analyzers: Dict[str, Analyzer] = {}
+        self._by_extension: Dict[str, List[Analyzer]] = {}
+    
+    def register(self, analyzer: Analyzer) -> Analyzer:
+        """Register an analyzer, replacing any analyzer with the same name."""
+        self.unregister(analyzer.name)
+        self._analyzers[analyzer.name] = analyzer
+        for extension in analyzer.extensions:
+            self._by_extension.setdefault(extension, []).append(analyzer)
+        return analyzer
+    
+    def unregister(self, name: str):
+        """Remove an analyzer by name."""
+        analyzer = self._analyzers.pop(name, None)
+        if analyzer:
+            for extension in analyzer.extensions:
+                self._by_extension[extension].remove(analyzer)
+    
+    def get(self, name: str) -> Optional[Analyzer]:
+        """Get an analyzer by name."""
+        return self._analyzers.get(name)
+    
+    def all(self) -> List[Analyzer]:
+        """Get all registered analyzers."""
+        return list(self._analyzers.values())
+    
+    def for_extension(self, extension: str) -> List[Analyzer]:
+        """Get the analyzers registered for a file extension."""
+        return list(self._by_extension.get(extension.lower(), []))
+    
+    def match_header(self, header: bytes) -> List[Analyzer]:
+        """Get the analyzers whose magic bytes match a file header."""
+        return [analyzer for analyzer in self._analyzers.values() if analyzer.matches_magic(header)]
+    
+    def sniff(self, file_path: str) -> List[Analyzer]:
+        """Get the analyzers whose magic bytes match the start of a file."""
+        try:
+            with open(file_path, 'rb') as f:
+                header = f.read(MAGIC_SNIFF_BYTES)
+        except OSError:
+            return []
+        return self.match_header(header)
+    
+    def for_file(self, file_path: str) -> List[Analyzer]:
+        """Get the analyzers for a file, by extension first and magic bytes otherwise."""
+        return self.for_extension(Path(file_path).suffix) or self.sniff(file_path)
+
+
+# Global analyzer registry
+registry = AnalyzerRegistry()
+
+registry.register(Analyzer(
+    'image', analyze_image,
+    extensions={'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'},
+    magic=[(0, b'\x89PNG\r\n\x1a\n'), (0, b'\xff\xd8\xff'), (0, b'GIF8'), (0, b'BM'),
+           (0, b'II*\x00'), (0, b'MM\x00*'), (8, b'WEBP')],
+    resource_class=CPU_BOUND, version=4, base_cost=2.0, consumer=ImageAnalysisConsumer
+))
+registry.register(Analyzer(
+    'pdf', analyze_pdf,
+    extensions={'.pdf'},
+    magic=[(0, b'%PDF-')],
+    resource_class=CPU_BOUND, version=2, base_cost=5.0, cost_per_mb=0.5
+))
+registry.register(Analyzer(
+    'text', analyze_text,
+    extensions={'.txt'},
+    resource_class=IO_BOUND, version=2, base_cost=1.0, cost_per_mb=10.0, consumer=TextAnalysisConsumer
+))
+registry.register(Analyzer(
+    'video', analyze_video,
+    extensions={'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'},
+    magic=[(4, b'ftyp'), (0, b'\x1a\x45\xdf\xa3'), (8, b'AVI ')],
+    resource_class=HEAVY, version=2, base_cost=200.0
+))
+registry.register(Analyzer(
+    'audio', analyze_audio,
+    extensions={'.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma'},
+    magic=[(0, b'ID3'), (0, b'fLaC'), (0, b'OggS'), (8, b'WAVE')],
+    resource_class=IO_BOUND, version=2, base_cost=10.0
+))
+registry.register(Analyzer(
+    'code', analyze_code,
+    extensions={'.py', '.js', '.html', '.css', '.json', '.xml', '.yaml', '.yml'},
+    resource_class=IO_BOUND, version=2, base_cost=1.0, cost_per_mb=10.0, consumer=CodeAnalysisConsumer
+))
+registry.register(Analyzer(
+    'cad', analyze_cad,
+    extensions={'.dwg', '.dxf'},
+    magic=[(0, b'AC10')],
+    resource_class=IO_BOUND, base_cost=5.0, cost_per_mb=5.0
+))
+registry.register(Analyzer(
+    'archive', list_archive,
+    extensions={'.zip', '.tar', '.gz', '.7z'},
+    resource_class=IO_BOUND, base_cost=2.0, cost_per_mb=0.05, cacheable=False
+))
+registry.register(Analyzer(
+    'text_content', extract_text_content,
+    extensions={'.txt', '.py', '.js', '.html', '.css', '.json', '.xml', '.yaml', '.yml'},
+    resource_class=IO_BOUND, base_cost=1.0, cost_per_mb=15.0, cacheable=False
+))
+registry.register(Analyzer(
+    'pdf_content', extract_pdf_content,
+    extensions={'.pdf'},
+    magic=[(0, b'%PDF-')],
+    resource_class=CPU_BOUND, base_cost=100.0, cost_per_mb=50.0, cacheable=False
+))
+registry.register(Analyzer(
+    'perceptual_hash', compute_perceptual_hash,
+    extensions={'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'},
+    resource_class=CPU_BOUND, base_cost=10.0, cost_per_mb=5.0
+))
+registry.register(Analyzer(
+    'palette', extract_palette,
+    extensions={'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'},
+    resource_class=CPU_BOUND, base_cost=15.0, cost_per_mb=5.0
+))
+registry.register(Analyzer(
+    'waveform', compute_waveform,
+    extensions={'.wav'},
+    magic=[(8, b'WAVE')],
+    resource_class=CPU_BOUND, base_cost=5.0, cost_per_mb=4.0, cacheable=False
+))
+registry.register(Analyzer(
+    'thumbnail', generate_thumbnails,
+    extensions={'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp',
+                '.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.dwg'},
+    resource_class=CPU_BOUND, base_cost=30.0, cost_per_mb=20.0, pass_file_hash=True,
+    cacheable=False
+))
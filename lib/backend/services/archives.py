@@ -0,0 +1,296 @@
+"""
+Archive member listing and lazy member extraction.
+Members are listed from the zip central directory, tar headers, the gzip header and
+trailer, or the 7z header; no member data is decompressed until a member is extracted.
+"""
+
+import gzip
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import zipfile
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from shared.config import config
+
+
+# Separates the archive path from the member path in a member's virtual path
+MEMBER_SEPARATOR = '!/'
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.gz', '.7z')
+
+# Longest file name read from a gzip header
+MAX_GZIP_NAME = 1024
+
+# Result ids of members are -(archive id * MEMBER_ID_STRIDE + member index + 1): negative,
+# so they never collide with asset ids, and unique per archive and member
+MEMBER_ID_STRIDE = 1 << 24
+
+# (path, size, compressed size, CRC-32, modified at) of one member
+Member = Tuple[str, Optional[int], Optional[int], Optional[int], Optional[str]]
+
+
+class ArchiveError(Exception):
+    """The file is not an archive this module can read."""
+
+
+def _timestamp(value: float) -> Optional[str]:
+    try:
+        return datetime.fromtimestamp(value).isoformat(timespec='seconds') if value else None
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _is_tar_gz(file_path: str) -> bool:
+    return file_path.lower().endswith(('.tar.gz', '.tgz'))
+
+
+def _zip_members(file_path: str) -> Iterator[Member]:
+    # ZipFile reads the end record and central directory; local headers and data are untouched
+    try:
+        archive = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(str(e))
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            year, month, day, hour, minute, second = info.date_time
+            yield (info.filename, info.file_size, info.compress_size, info.CRC,
+                   f'{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}')
+
+
+def _tar_members(file_path: str) -> Iterator[Member]:
+    # Header by header: an uncompressed tar seeks over member data, a compressed one
+    # is decompressed as a stream and the data discarded
+    try:
+        archive = tarfile.open(file_path, 'r:*')
+    except tarfile.TarError as e:
+        raise ArchiveError(str(e))
+    with archive:
+        for info in archive:
+            if info.isfile():
+                yield info.name, info.size, None, None, _timestamp(info.mtime)
+            # Without this the archive keeps every header it has read
+            archive.members = []
+
+
+def _gzip_member(file_path: str) -> Iterator[Member]:
+    """The single file of a plain .gz: name and mtime from the header, CRC and size from the trailer."""
+    with open(file_path, 'rb') as f:
+        header = f.read(10)
+        if len(header) < 10 or header[:2] != b'\x1f\x8b':
+            raise ArchiveError('not a gzip file')
+        flags = header[3]
+        mtime = struct.unpack('<I', header[4:8])[0]
+        if flags & 0x04:
+            extra_length = struct.unpack('<H', f.read(2))[0]
+            f.seek(extra_length, os.SEEK_CUR)
+        name = None
+        if flags & 0x08:
+            raw = f.read(MAX_GZIP_NAME).split(b'\x00', 1)[0]
+            name = os.path.basename(raw.decode('latin-1').replace('\\', '/'))
+        
+        size = os.fstat(f.fileno()).st_size
+        if size < 18:
+            raise ArchiveError('truncated gzip file')
+        f.seek(-8, os.SEEK_END)
+        crc, isize = struct.unpack('<II', f.read(8))
+    
+    # The trailer holds the size modulo 2**32 (of the last member, if several were concatenated)
+    yield name or Path(file_path).stem, isize, size, crc, _timestamp(mtime)
+
+
+def _7z_members(file_path: str) -> Iterator[Member]:
+    import py7zr
+    
+    try:
+        archive = py7zr.SevenZipFile(file_path, 'r')
+    except py7zr.exceptions.Bad7zFile as e:
+        raise ArchiveError(str(e))
+    with archive:
+        for info in archive.list():
+            if info.is_directory:
+                continue
+            modified = info.creationtime.isoformat(timespec='seconds') if info.creationtime else None
+            yield info.filename, info.uncompressed, info.compressed, info.crc32, modified
+
+
+def iter_members(file_path: str) -> Iterator[Member]:
+    """
+    Yield the files in an archive, directories left out.
+    
+    Raises:
+        ArchiveError: If the file is not a readable archive
+        ImportError: If a 7z file is listed without py7zr installed
+    """
+    extension = Path(file_path).suffix.lower()
+    if extension == '.zip':
+        return _zip_members(file_path)
+    if extension == '.tar' or _is_tar_gz(file_path):
+        return _tar_members(file_path)
+    if extension == '.gz':
+        return _gzip_member(file_path)
+    if extension == '.7z':
+        return _7z_members(file_path)
+    raise ArchiveError(f'unsupported archive type: {extension}')
+
+
+def list_archive(file_path: str) -> Optional[Dict]:
+    """
+    Analyze an archive into its member listing.
+    
+    The members travel under the 'members' key, which the analyst stores in the
+    archive member index instead of asset metadata.
+    """
+    try:
+        limit = config.archive_max_members
+        members = []
+        partial = False
+        try:
+            for member in iter_members(file_path):
+                if len(members) >= limit:
+                    partial = True
+                    break
+                members.append(member)
+        except ImportError:
+            return {'analysis_note': 'py7zr not available for 7z archive listing'}
+        except (ArchiveError, EOFError, tarfile.TarError, zipfile.BadZipFile) as e:
+            return {'archive_error': str(e)}
+        
+        metadata = {
+            'member_count': len(members),
+            'members_size': sum(member[1] or 0 for member in members),
+            'members': members
+        }
+        if partial:
+            metadata['members_partial'] = True
+        return metadata
+    
+    except Exception as e:
+        print(f"Error listing archive {file_path}: {e}")
+        return None
+
+
+def index_rows(file_hash: str, members: List[Member]) -> List[Tuple]:
+    """Build (file_hash, member_index, path, name, size, compressed_size, crc32, modified_at) index rows."""
+    return [
+        (file_hash, index, path, path.rstrip('/').rsplit('/', 1)[-1], size, compressed_size, crc, modified)
+        for index, (path, size, compressed_size, crc, modified) in enumerate(members)
+    ]
+
+
+def member_id(archive_id: int, member_index: int) -> int:
+    """Get the result id of an archive member (see MEMBER_ID_STRIDE)."""
+    return -(archive_id * MEMBER_ID_STRIDE + member_index + 1)
+
+
+def member_path(archive_path: str, member: str) -> str:
+    """Get the virtual path of an archive member."""
+    return f'{archive_path}{MEMBER_SEPARATOR}{member}'
+
+
+def split_member_path(path: str) -> Optional[Tuple[str, str]]:
+    """Split a virtual member path into (archive path, member), or None for an ordinary path."""
+    start = 0
+    while True:
+        index = path.find(MEMBER_SEPARATOR, start)
+        if index == -1:
+            return None
+        archive_path = path[:index]
+        if archive_path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(archive_path):
+            return archive_path, path[index + len(MEMBER_SEPARATOR):]
+        start = index + 1
+
+
+def _safe_parts(member: str) -> Tuple[str, ...]:
+    """Path components of a member that stay inside the extraction directory."""
+    parts = tuple(part for part in member.replace('\\', '/').split('/')
+                  if part not in ('', '.', '..') and not part.endswith(':'))
+    if not parts:
+        raise ArchiveError(f'invalid member path: {member!r}')
+    return parts
+
+
+def _open_member(archive_path: str, member: str, stack):
+    """Open a member of an archive for reading, registering what must be closed on `stack`."""
+    extension = Path(archive_path).suffix.lower()
+    if extension == '.zip':
+        archive = stack.enter_context(zipfile.ZipFile(archive_path))
+        try:
+            return stack.enter_context(archive.open(member))
+        except KeyError:
+            raise ArchiveError(f'member not found: {member}')
+    
+    if extension == '.tar' or _is_tar_gz(archive_path):
+        archive = stack.enter_context(tarfile.open(archive_path, 'r:*'))
+        for info in archive:
+            if info.name == member and info.isfile():
+                return stack.enter_context(archive.extractfile(info))
+            archive.members = []
+        raise ArchiveError(f'member not found: {member}')
+    
+    if extension == '.gz':
+        return stack.enter_context(gzip.open(archive_path, 'rb'))
+    
+    raise ArchiveError(f'unsupported archive type: {extension}')
+
+
+def extract_member(archive_path: str, member: str, destination: str,
+                   expected_size: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    Extract one archive member below a directory.
+    
+    Zip and 7z members are read directly; a compressed tar is decompressed up
+    to the member, since tar has no index.
+    
+    Args:
+        archive_path: The archive file
+        member: Member path as listed
+        destination: Directory to extract into; the member keeps its relative path
+        expected_size: Size of the member; a file of this size already at the
+            target is taken as extracted before and returned as is
+    
+    Returns:
+        Path of the extracted file, and whether it was extracted now (False
+        when an earlier extraction was reused)
+    
+    Raises:
+        ArchiveError: If the member cannot be found or read
+        ImportError: If a 7z member is extracted without py7zr installed
+    """
+    target = os.path.join(destination, *_safe_parts(member))
+    if expected_size is not None and os.path.isfile(target) and os.path.getsize(target) == expected_size:
+        # The modification time records the last use, for evict_directory
+        os.utime(target)
+        return target, False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    
+    if Path(archive_path).suffix.lower() == '.7z':
+        import py7zr
+        
+        with tempfile.TemporaryDirectory(dir=destination) as scratch:
+            with py7zr.SevenZipFile(archive_path, 'r') as archive:
+                archive.extract(path=scratch, targets=[member])
+            extracted = os.path.join(scratch, *_safe_parts(member))
+            if not os.path.isfile(extracted):
+                raise ArchiveError(f'member not found: {member}')
+            os.replace(extracted, target)
+        return target, True
+    
+    # Written under a temporary name so a failed extraction never looks complete
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+    try:
+        with ExitStack() as stack, os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(_open_member(archive_path, member, stack), out, 1024 * 1024)
+        os.replace(partial, target)
+    except BaseException:
+        if os.path.exists(partial):
+            os.unlink(partial)
+        raise
+    return target, True
@@ -0,0 +1,346 @@
+"""
+CAD analysis for DWG and DXF drawings.
+DWG files are identified from their fixed header and their embedded preview is read by
+seeking straight to it; DXF files are streamed group code by group code, so memory stays
+constant no matter how large the drawing is.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# DWG/DXF version strings ($ACADVER) and the AutoCAD release that introduced them
+ACAD_RELEASES = {
+    'AC1.2': 'R1.2',
+    'AC1.40': 'R1.4',
+    'AC1.50': 'R2.0',
+    'AC2.10': 'R2.10',
+    'AC1001': 'R2.22',
+    'AC1002': 'R2.5',
+    'AC1003': 'R2.6',
+    'AC1004': 'R9',
+    'AC1006': 'R10',
+    'AC1009': 'R11/R12',
+    'AC1012': 'R13',
+    'AC1014': 'R14',
+    'AC1015': 'AutoCAD 2000',
+    'AC1018': 'AutoCAD 2004',
+    'AC1021': 'AutoCAD 2007',
+    'AC1024': 'AutoCAD 2010',
+    'AC1027': 'AutoCAD 2013',
+    'AC1032': 'AutoCAD 2018'
+}
+
+# $INSUNITS values
+INSUNITS = {
+    0: 'Unitless', 1: 'Inches', 2: 'Feet', 3: 'Miles', 4: 'Millimeters',
+    5: 'Centimeters', 6: 'Meters', 7: 'Kilometers', 8: 'Microinches', 9: 'Mils',
+    10: 'Yards', 11: 'Angstroms', 12: 'Nanometers', 13: 'Microns', 14: 'Decimeters',
+    15: 'Decameters', 16: 'Hectometers', 17: 'Gigameters', 18: 'Astronomical units',
+    19: 'Light years', 20: 'Parsecs'
+}
+
+# Header bytes read from a DWG file
+DWG_HEADER_BYTES = 0x80
+
+# Sentinel at the start of binary DXF files
+BINARY_DXF_SENTINEL = b'AutoCAD Binary DXF\r\n\x1a\x00'
+
+# Names kept per table; larger drawings only report the total count
+MAX_NAMES = 500
+
+# Layers every drawing has, left out of search keywords
+DEFAULT_LAYERS = {'0', 'Defpoints'}
+
+# Longest DXF line read; anything longer is truncated rather than buffered
+MAX_LINE_LENGTH = 4096
+
+# Sentinel opening the DWG preview (thumbnail image) section
+DWG_PREVIEW_SENTINEL = bytes.fromhex('1F256D07D43628289D57CA3F9D44102B')
+
+# Offset of the preview section address in R13+ headers
+DWG_PREVIEW_ADDRESS_OFFSET = 0x0D
+
+# Preview entry codes
+DWG_PREVIEW_BMP = 2
+DWG_PREVIEW_WMF = 3
+DWG_PREVIEW_PNG = 6
+
+# Largest embedded preview accepted; real previews are a few KB
+MAX_PREVIEW_BYTES = 4 * 1024 * 1024
+
+
+def read_dwg_header(file_path: str) -> Optional[Dict]:
+    """
+    Read the version information from the fixed DWG file header.
+    
+    Only the first few bytes are read; everything past the header is compressed
+    (R2004+) or bit-packed, so tables and extents are not available from DWG.
+    
+    Returns:
+        Dict with 'cad_version', 'cad_release', 'maintenance_version' and, for
+        R13+, 'codepage'; None if the file is not a DWG
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(DWG_HEADER_BYTES)
+    
+    if len(header) < 6 or not header.startswith(b'AC'):
+        return None
+    version = header[:6].rstrip(b'\x00 ').decode('ascii', errors='replace')
+    
+    info = {
+        'cad_version': version,
+        'cad_release': ACAD_RELEASES.get(version, 'Unknown')
+    }
+    if version >= 'AC1012' and len(header) >= 0x15:
+        info['maintenance_version'] = header[0x0B]
+        info['codepage'] = int.from_bytes(header[0x13:0x15], 'little')
+    return info
+
+
+def _bmp_file_header(dib: bytes) -> bytes:
+    """Build the BITMAPFILEHEADER a bare DIB needs to be a .bmp file."""
+    header_size = int.from_bytes(dib[0:4], 'little')
+    bit_count = int.from_bytes(dib[14:16], 'little')
+    compression = int.from_bytes(dib[16:20], 'little')
+    colors_used = int.from_bytes(dib[32:36], 'little') if header_size >= 36 else 0
+    if not colors_used and bit_count <= 8:
+        colors_used = 1 << bit_count
+    
+    pixel_offset = 14 + header_size + colors_used * 4
+    # BI_BITFIELDS masks follow a plain BITMAPINFOHEADER
+    if compression == 3 and header_size == 40:
+        pixel_offset += 12
+    
+    return (b'BM' + (14 + len(dib)).to_bytes(4, 'little') + b'\x00' * 4
+            + pixel_offset.to_bytes(4, 'little'))
+
+
+def extract_dwg_preview(file_path: str) -> Optional[Tuple[str, bytes]]:
+    """
+    Extract the preview image embedded in a DWG file without rendering it.
+    
+    The R13+ header holds the address of the preview section, whose directory
+    lists the embedded images. Only the header, that directory and the chosen
+    image are read, typically a few KB in total. PNG (R2013+) is preferred over
+    BMP; WMF-only previews are ignored.
+    
+    Returns:
+        ('png', data) or ('bmp', data) with the BMP file header added, or None
+        if the file has no usable preview
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(DWG_PREVIEW_ADDRESS_OFFSET + 4)
+        if (len(header) < DWG_PREVIEW_ADDRESS_OFFSET + 4 or not header.startswith(b'AC')
+                or header[:6].decode('ascii', errors='replace') < 'AC1012'):
+            return None
+        
+        address = int.from_bytes(header[DWG_PREVIEW_ADDRESS_OFFSET:], 'little')
+        if address == 0:
+            return None
+        f.seek(address)
+        directory = f.read(len(DWG_PREVIEW_SENTINEL) + 5)
+        if len(directory) < len(DWG_PREVIEW_SENTINEL) + 5 or not directory.startswith(DWG_PREVIEW_SENTINEL):
+            return None
+        
+        entry_count = directory[-1]
+        entries = f.read(entry_count * 9)
+        images = {}
+        for i in range(0, len(entries) - 8, 9):
+            code = entries[i]
+            start = int.from_bytes(entries[i + 1:i + 5], 'little')
+            size = int.from_bytes(entries[i + 5:i + 9], 'little')
+            if code in (DWG_PREVIEW_BMP, DWG_PREVIEW_PNG) and 0 < size <= MAX_PREVIEW_BYTES:
+                images[code] = (start, size)
+        
+        for code, kind in ((DWG_PREVIEW_PNG, 'png'), (DWG_PREVIEW_BMP, 'bmp')):
+            if code not in images:
+                continue
+            start, size = images[code]
+            f.seek(start)
+            data = f.read(size)
+            if len(data) < size:
+                continue
+            if kind == 'png' and data.startswith(b'\x89PNG\r\n\x1a\n'):
+                return kind, data
+            if kind == 'bmp' and len(data) >= 40:
+                return kind, _bmp_file_header(data) + data
+    
+    return None
+
+
+def iter_dxf_groups(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Stream an ASCII DXF file as (group code, value) pairs.
+    
+    Lines are read one at a time, so memory use does not depend on file size.
+    
+    Raises:
+        ValueError: If a group code line is not an integer
+    """
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            code_line = f.readline(MAX_LINE_LENGTH)
+            if not code_line:
+                return
+            value = f.readline(MAX_LINE_LENGTH)
+            # Drop the rest of an over-long value line
+            rest = value
+            while len(rest) == MAX_LINE_LENGTH and not rest.endswith('\n'):
+                rest = f.readline(MAX_LINE_LENGTH)
+            
+            code_line = code_line.strip()
+            if not code_line:
+                continue
+            yield int(code_line), value.strip()
+
+
+class DxfSummary:
+    """Collects header variables, layers and blocks from a stream of DXF groups."""
+    
+    # Header variables kept, with the group codes that carry their values
+    HEADER_VARIABLES = {
+        '$ACADVER': (1,),
+        '$INSUNITS': (70,),
+        '$MEASUREMENT': (70,),
+        '$EXTMIN': (10, 20, 30),
+        '$EXTMAX': (10, 20, 30)
+    }
+    
+    def __init__(self, max_names: int = MAX_NAMES):
+        self.max_names = max_names
+        self.header: Dict[str, Dict[int, str]] = {}
+        self.layers: List[str] = []
+        self.blocks: List[str] = []
+        self.layer_count = 0
+        self.block_count = 0
+        self._section: Optional[str] = None
+        self._variable: Optional[str] = None
+        self._entity: Optional[str] = None
+        self._expect_section_name = False
+    
+    def feed(self, code: int, value: str) -> bool:
+        """
+        Consume one group.
+        
+        Returns:
+            False once everything of interest has been read (the ENTITIES
+            section has started), True to keep going
+        """
+        if code == 0:
+            self._variable = None
+            self._entity = value
+            if value == 'SECTION':
+                self._expect_section_name = True
+            elif value == 'ENDSEC':
+                self._section = None
+            return True
+        
+        if self._expect_section_name and code == 2:
+            self._expect_section_name = False
+            self._section = value
+            # Layers and blocks are defined before the geometry
+            return value not in ('ENTITIES', 'OBJECTS')
+        
+        if self._section == 'HEADER':
+            if code == 9:
+                self._variable = value if value in self.HEADER_VARIABLES else None
+            elif self._variable and code in self.HEADER_VARIABLES[self._variable]:
+                self.header.setdefault(self._variable, {})[code] = value
+        
+        elif self._section == 'TABLES' and self._entity == 'LAYER' and code == 2:
+            self.layer_count += 1
+            if len(self.layers) < self.max_names:
+                self.layers.append(value)
+            self._entity = None
+        
+        elif self._section == 'BLOCKS' and self._entity == 'BLOCK' and code == 2:
+            # Anonymous blocks (*Model_Space, *U12, dimensions) are not user content
+            if not value.startswith('*'):
+                self.block_count += 1
+                if len(self.blocks) < self.max_names:
+                    self.blocks.append(value)
+            self._entity = None
+        
+        return True
+    
+    def _point(self, variable: str) -> Optional[Tuple[float, ...]]:
+        values = self.header.get(variable)
+        if not values:
+            return None
+        try:
+            return tuple(float(values[code]) for code in (10, 20, 30) if code in values)
+        except ValueError:
+            return None
+    
+    def to_metadata(self) -> Dict:
+        """Get the collected values as analyzer metadata."""
+        metadata: Dict = {'cad_format': 'DXF'}
+        
+        version = self.header.get('$ACADVER', {}).get(1)
+        if version:
+            metadata['cad_version'] = version
+            metadata['cad_release'] = ACAD_RELEASES.get(version, 'Unknown')
+        
+        units = self.header.get('$INSUNITS', {}).get(70)
+        if units is not None and units.lstrip('-').isdigit():
+            metadata['units'] = INSUNITS.get(int(units), 'Unknown')
+        measurement = self.header.get('$MEASUREMENT', {}).get(70)
+        if measurement in ('0', '1'):
+            metadata['measurement'] = 'Metric' if measurement == '1' else 'Imperial'
+        
+        extmin, extmax = self._point('$EXTMIN'), self._point('$EXTMAX')
+        # An empty drawing has inverted (+/-1e20) extents
+        if extmin and extmax and len(extmin) >= 2 and len(extmax) >= 2 and extmax[0] >= extmin[0]:
+            metadata['extents_min'] = ','.join(f'{v:g}' for v in extmin)
+            metadata['extents_max'] = ','.join(f'{v:g}' for v in extmax)
+            metadata['extents_width'] = f'{extmax[0] - extmin[0]:g}'
+            metadata['extents_height'] = f'{extmax[1] - extmin[1]:g}'
+        
+        metadata['layer_count'] = self.layer_count
+        metadata['block_count'] = self.block_count
+        if self.layers:
+            metadata['layers'] = ', '.join(self.layers)
+        if self.blocks:
+            metadata['blocks'] = ', '.join(self.blocks)
+        
+        keywords = self.blocks + [layer for layer in self.layers if layer not in DEFAULT_LAYERS]
+        if keywords:
+            metadata['search_keywords'] = ' '.join(keywords).lower()
+        return metadata
+
+
+def analyze_dxf(file_path: str) -> Dict:
+    """
+    Summarize an ASCII DXF file by streaming its group codes.
+    
+    Reading stops when the ENTITIES section starts, since the header, layer
+    table and block definitions all come before it.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(len(BINARY_DXF_SENTINEL)) == BINARY_DXF_SENTINEL:
+            return {'cad_format': 'DXF (binary)',
+                    'analysis_note': 'Binary DXF tables are not indexed'}
+    
+    summary = DxfSummary()
+    for code, value in iter_dxf_groups(file_path):
+        if not summary.feed(code, value):
+            break
+    return summary.to_metadata()
+
+
+def analyze_cad(file_path: str) -> Optional[Dict]:
+    """Analyze DWG and DXF drawings."""
+    try:
+        extension = Path(file_path).suffix.lower()
+        if extension == '.dxf':
+            return analyze_dxf(file_path)
+        
+        header = read_dwg_header(file_path)
+        if header is None:
+            return {'analysis_note': 'Not a recognized DWG file'}
+        return {'cad_format': 'DWG', **header}
+    
+    except Exception as e:
+        print(f"Error analyzing CAD file {file_path}: {e}")
+        return None
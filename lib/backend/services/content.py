@@ -0,0 +1,129 @@
+"""
+Text extraction for the full-text content index.
+Documents are streamed, capped per file and cut into chunks that become one index row each.
+"""
+
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from shared.config import config
+from services.text_stats import read_text_chunks
+
+
+# Characters per indexed chunk; chunks end at a line or word break where possible
+CONTENT_CHUNK_CHARS = 2000
+
+# Chunks kept per document (the content index's row-id stride per document)
+MAX_CHUNKS_PER_DOCUMENT = 65536
+
+
+def _break_point(text: str, start: int, limit: int) -> int:
+    """Index at which to cut text[start:limit]: the last newline or space in its second half."""
+    low = start + (limit - start) // 2
+    for separator in ('\n', ' '):
+        cut = text.rfind(separator, low, limit)
+        if cut != -1:
+            return cut + 1
+    return limit
+
+
+def iter_chunks(pieces: Iterable[str], chunk_chars: int = CONTENT_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Re-cut a stream of text pieces into chunks of at most chunk_chars characters.
+    
+    Cuts fall on line or word breaks where possible, so no word is split
+    between two chunks. Whitespace-only chunks are dropped.
+    """
+    carry = ''
+    for piece in pieces:
+        text = carry + piece
+        start = 0
+        while len(text) - start > chunk_chars:
+            end = _break_point(text, start, start + chunk_chars)
+            chunk = text[start:end].strip()
+            if chunk:
+                yield chunk
+            start = end
+        carry = text[start:]
+    
+    carry = carry.strip()
+    if carry:
+        yield carry
+
+
+def _collect(pieces: Iterable[str], max_chars: int, info: Dict) -> Dict:
+    """
+    Chunk text pieces up to max_chars characters and build the analyzer result.
+    
+    The chunks themselves travel under the 'content' key, which the analyst
+    hands to the content index instead of storing it as asset metadata.
+    """
+    chunks: List[str] = []
+    char_count = 0
+    for chunk in iter_chunks(pieces):
+        if char_count + len(chunk) > max_chars or len(chunks) >= MAX_CHUNKS_PER_DOCUMENT:
+            info['partial'] = True
+            break
+        chunks.append(chunk)
+        char_count += len(chunk)
+    
+    metadata = {'content_chunk_count': len(chunks), 'content_chars': char_count}
+    if info.get('partial'):
+        metadata['content_partial'] = True
+    metadata['content'] = {
+        'chunks': chunks,
+        'chars': char_count,
+        'bytes_read': info.get('bytes_read', 0),
+        'partial': bool(info.get('partial')),
+        'seconds': time.perf_counter() - info['started']
+    }
+    return metadata
+
+
+def extract_text_content(file_path: str) -> Optional[Dict]:
+    """Extract the text of a plain text or source file for the content index."""
+    try:
+        max_bytes = config.content_index_max_bytes
+        info: Dict = {'started': time.perf_counter()}
+        try:
+            return _collect(read_text_chunks(file_path, max_bytes, info), max_bytes, info)
+        except ValueError as e:
+            # Binary data under a text extension
+            return {'content_note': str(e)}
+    
+    except Exception as e:
+        print(f"Error extracting text from {file_path}: {e}")
+        return None
+
+
+def _iter_pdf_pages(file_path: str, info: Dict) -> Iterator[str]:
+    """Yield the extracted text of each page of a PDF in turn."""
+    import PyPDF2
+    
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        if reader.is_encrypted:
+            raise ValueError('PDF is encrypted')
+        # The parser seeks all over the file; count it as read once
+        info['bytes_read'] = os.fstat(f.fileno()).st_size
+        for page in reader.pages:
+            text = page.extract_text() or ''
+            # Keep pages apart so the last word of one does not run into the next
+            yield text + '\n'
+
+
+def extract_pdf_content(file_path: str) -> Optional[Dict]:
+    """Extract the text of a PDF page by page for the content index."""
+    try:
+        info: Dict = {'started': time.perf_counter()}
+        try:
+            return _collect(_iter_pdf_pages(file_path, info), config.content_index_max_bytes, info)
+        except ImportError:
+            return {'analysis_note': 'PyPDF2 not available for PDF text extraction'}
+        except Exception as e:
+            return {'content_error': str(e)}
+    
+    except Exception as e:
+        print(f"Error extracting text from {file_path}: {e}")
+        return None
@@ -0,0 +1,80 @@
+"""
+Least-recently-used eviction for on-disk caches.
+The thumbnail cache tracks its files in the database; the archive member cache is
+tracked by the filesystem alone, with each file's modification time as its last use.
+"""
+
+import os
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+# Evicting stops once the cache is below this share of its budget
+EVICTION_TARGET_RATIO = 0.9
+
+
+def remove_files(victims: Iterable[Tuple[str, int, Any]], total: int, target: float,
+                 keep: Optional[str] = None) -> Tuple[List[Any], int]:
+    """
+    Delete files in the given order until the cache size drops to the target.
+    
+    Args:
+        victims: (path, bytes, key) of cached files, least recently used first
+        total: Current size of the cache in bytes
+        target: Size to shrink the cache to
+        keep: A file that must stay
+    
+    Returns:
+        Keys of the files gone (including any already missing) and the new total
+    """
+    removed = []
+    for path, size, key in victims:
+        if total <= target:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        removed.append(key)
+        total -= size or 0
+    return removed, total
+
+
+def evict_directory(directory: str, max_bytes: int, keep: Optional[str] = None) -> int:
+    """
+    Evict the least recently modified files below a directory until it fits its budget.
+    
+    Directories left empty are removed as well.
+    
+    Returns:
+        Number of files removed
+    """
+    files = []
+    total = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+    
+    files.sort()
+    removed, _ = remove_files(((path, size, path) for _, path, size in files), total,
+                              max_bytes * EVICTION_TARGET_RATIO, keep)
+    for path in removed:
+        parent = os.path.dirname(path)
+        while parent != directory and parent.startswith(directory):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+    return len(removed)
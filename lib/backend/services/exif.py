@@ -0,0 +1,204 @@
+"""
+Filtering of EXIF and audio tags for storage.
+A whitelist of useful fields becomes typed asset metadata; the rest, minus binary blobs
+(maker notes, embedded previews, cover art), stays together as one nested value that the
+database stores zlib-compressed and decodes only when asked for it.
+"""
+
+import numbers
+from typing import Any, Dict, Optional, Tuple
+
+
+# Binary values up to this length are kept (as text or hex); longer ones are blobs and dropped
+MAX_BINARY_VALUE = 64
+
+# Text values longer than this are dropped from the remainder
+MAX_TEXT_VALUE = 2048
+
+# EXIF tags never stored: maker-specific blobs, embedded previews and profiles, and
+# offsets of sub-IFDs within the file
+DROPPED_EXIF_TAGS = {
+    'MakerNote', 'PrintImageMatching', 'JPEGThumbnail', 'ThumbnailImage',
+    'InterColorProfile', 'XMLPacket', 'ImageResources', 'IPTCNAA',
+    'ExifOffset', 'ExifInteroperabilityOffset'
+}
+
+# GPS sub-IFD tags (GPSInfo keys are tag numbers from PIL, names from the header probe)
+GPS_TAGS = {
+    1: 'GPSLatitudeRef',
+    2: 'GPSLatitude',
+    3: 'GPSLongitudeRef',
+    4: 'GPSLongitude',
+    5: 'GPSAltitudeRef',
+    6: 'GPSAltitude'
+}
+
+# EXIF tag -> (metadata key, type); date_taken, camera and gps_* are derived separately
+EXIF_FIELDS = {
+    'Orientation': ('orientation', int),
+    'Software': ('software', str),
+    'LensModel': ('lens', str),
+    'ExposureTime': ('exposure_time', float),
+    'FNumber': ('f_number', float),
+    'ISOSpeedRatings': ('iso', int),
+    'FocalLength': ('focal_length', float),
+    'FocalLengthIn35mmFilm': ('focal_length_35mm', int),
+    'Flash': ('flash', int),
+    'Artist': ('artist', str),
+    'Copyright': ('copyright', str),
+    'ImageDescription': ('description', str)
+}
+
+# Tags folded into typed fields, and so left out of the remainder
+DERIVED_EXIF_TAGS = {'DateTimeOriginal', 'DateTime', 'Make', 'Model', 'GPSInfo'}
+
+# Audio tag (mutagen "easy" names) -> (metadata key, type)
+AUDIO_FIELDS = {
+    'title': ('title', str),
+    'artist': ('artist', str),
+    'album': ('album', str),
+    'albumartist': ('album_artist', str),
+    'genre': ('genre', str),
+    'date': ('date', str),
+    'tracknumber': ('track_number', int),
+    'discnumber': ('disc_number', int),
+    'composer': ('composer', str)
+}
+
+# ID3 frame ids of the same fields, as stored by older versions of the audio analyzer
+ID3_FRAMES = {
+    'TIT2': 'title', 'TPE1': 'artist', 'TALB': 'album', 'TPE2': 'albumartist', 'TCON': 'genre',
+    'TDRC': 'date', 'TRCK': 'tracknumber', 'TPOS': 'discnumber', 'TCOM': 'composer'
+}
+
+# Audio tags holding pictures
+PICTURE_TAGS = ('APIC', 'PIC', 'covr', 'METADATA_BLOCK_PICTURE', 'WM/Picture')
+
+
+def _plain(value: Any) -> Any:
+    """Convert a tag value to plain JSON types, or None for a value not worth storing."""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) > MAX_BINARY_VALUE:
+            return None
+        text = bytes(value).rstrip(b'\x00')
+        return text.decode('ascii') if text.isascii() and text.decode('ascii').isprintable() else text.hex()
+    if isinstance(value, str):
+        value = value.rstrip('\x00').strip()
+        return value if len(value) <= MAX_TEXT_VALUE else None
+    if isinstance(value, bool) or isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Rational):
+        # PIL's IFDRational
+        return float(value) if value.denominator else None
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        items = [_plain(item) for item in value]
+        return [item for item in items if item is not None] or None
+    if isinstance(value, dict):
+        items = {str(key): _plain(item) for key, item in value.items()}
+        return {key: item for key, item in items.items() if item is not None} or None
+    return _plain(str(value))
+
+
+def _first(value: Any) -> Any:
+    """First element of a list or tuple value (ISO and tag lists), the value itself otherwise."""
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+def _convert(value: Any, kind: type) -> Any:
+    value = _plain(_first(value))
+    if value is None:
+        return None
+    if kind is int and isinstance(value, str):
+        # Track and disc numbers come as '3/12'
+        value = value.split('/', 1)[0]
+    try:
+        converted = kind(value)
+    except (TypeError, ValueError):
+        return None
+    return converted if converted != '' else None
+
+
+def _gps_coordinate(gps: Dict, value_tag: str, ref_tag: str, negative_ref: str) -> Optional[float]:
+    """Decimal degrees from a (degrees, minutes, seconds) GPS value and its N/S or E/W reference."""
+    parts = _plain(gps.get(value_tag))
+    if not isinstance(parts, list) or len(parts) != 3:
+        return None
+    degrees = parts[0] + parts[1] / 60 + parts[2] / 3600
+    if _plain(gps.get(ref_tag)) == negative_ref:
+        degrees = -degrees
+    return round(degrees, 7)
+
+
+def typed_exif(exif: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the whitelisted EXIF fields as typed metadata."""
+    metadata = {}
+    date_taken = _convert(exif.get('DateTimeOriginal') or exif.get('DateTime'), str)
+    if date_taken:
+        metadata['date_taken'] = date_taken
+    camera = ' '.join(part for part in (_convert(exif.get('Make'), str), _convert(exif.get('Model'), str)) if part)
+    if camera:
+        metadata['camera'] = camera
+    
+    for tag, (key, kind) in EXIF_FIELDS.items():
+        if tag in exif:
+            value = _convert(exif[tag], kind)
+            if value is not None:
+                metadata[key] = value
+    
+    gps = exif.get('GPSInfo')
+    if isinstance(gps, dict):
+        # Tag numbers come back as strings from JSON stored by older versions
+        gps = {GPS_TAGS.get(int(tag) if str(tag).isdigit() else tag, tag): value for tag, value in gps.items()}
+        latitude = _gps_coordinate(gps, 'GPSLatitude', 'GPSLatitudeRef', 'S')
+        longitude = _gps_coordinate(gps, 'GPSLongitude', 'GPSLongitudeRef', 'W')
+        if latitude is not None and longitude is not None:
+            metadata['gps_latitude'] = latitude
+            metadata['gps_longitude'] = longitude
+        altitude = _convert(gps.get('GPSAltitude'), float)
+        if altitude is not None:
+            # Reference 1 is below sea level
+            metadata['gps_altitude'] = -altitude if _plain(gps.get('GPSAltitudeRef')) in (1, '01') else altitude
+    return metadata
+
+
+def split_exif(exif: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Split an EXIF dictionary (tag name -> value) for storage.
+    
+    Returns:
+        (typed whitelisted fields, remainder as plain JSON types or None);
+        binary blobs are in neither
+    """
+    remainder = {
+        str(tag): value for tag, value in exif.items()
+        if tag not in EXIF_FIELDS and tag not in DERIVED_EXIF_TAGS and tag not in DROPPED_EXIF_TAGS
+    }
+    return typed_exif(exif), _plain(remainder)
+
+
+def split_audio_tags(tags: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Split audio tags (mutagen "easy" names or ID3 frame ids -> value) for storage.
+    
+    Returns:
+        (typed whitelisted fields, remainder as plain JSON types or None);
+        cover art is in neither
+    """
+    metadata = {}
+    remainder = {}
+    for tag, value in tags.items():
+        name = ID3_FRAMES.get(tag, tag)
+        if name in AUDIO_FIELDS:
+            key, kind = AUDIO_FIELDS[name]
+            converted = _convert(value, kind)
+            if converted is not None:
+                metadata.setdefault(key, converted)
+        elif not str(tag).startswith(PICTURE_TAGS):
+            remainder[str(tag)] = value
+    return metadata, _plain(remainder)
@@ -0,0 +1,157 @@
+"""
+Single-pass file reading for the asset analyst.
+A file is read once in large blocks and every block is handed to each registered consumer
+(hashers, the magic-byte sniffer, text statistics, header probes), so work that needs the
+file's bytes shares one pass over them instead of opening and reading the file again.
+"""
+
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Bytes read per block; one buffer is reused for the whole file
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class Consumer:
+    """
+    One consumer of a read pass.
+    
+    feed() gets the file's blocks in order, at most `limit` bytes in total
+    (None: the whole file). Blocks are views of a reused buffer, so anything
+    kept past the call must be copied. A consumer that needs nothing more
+    sets `done`.
+    """
+    
+    name = 'consumer'
+    limit: Optional[int] = None
+    
+    def __init__(self):
+        self.done = False
+    
+    def feed(self, block: memoryview):
+        """Take the next block of the file."""
+        raise NotImplementedError
+    
+    def finish(self, file_size: int) -> Any:
+        """Get the result once the pass is over; file_size is the whole file's size."""
+        return None
+
+
+class HashConsumer(Consumer):
+    """Digest of the whole file."""
+    
+    def __init__(self, algorithm: str = 'sha256'):
+        super().__init__()
+        self.name = algorithm
+        self._digest = hashlib.new(algorithm)
+    
+    def feed(self, block: memoryview):
+        self._digest.update(block)
+    
+    def finish(self, file_size: int) -> str:
+        return self._digest.hexdigest()
+
+
+class SniffConsumer(Consumer):
+    """The first `limit` bytes of the file, for magic-number matching."""
+    
+    name = 'sniff'
+    
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self._header = bytearray()
+    
+    def feed(self, block: memoryview):
+        self._header += block
+    
+    def finish(self, file_size: int) -> bytes:
+        return bytes(self._header)
+
+
+def read_once(file_path: str, consumers: List[Consumer],
+              block_size: int = READ_BLOCK_SIZE,
+              throttle: Optional[Callable[[int, int], float]] = None) -> Dict[str, Any]:
+    """
+    Read a file once and fan its blocks out to the consumers.
+    
+    Reading stops as soon as no consumer wants more, so a pass of consumers
+    that only need a header reads just that header.
+    
+    Args:
+        file_path: File to read
+        consumers: Consumers fed every block
+        block_size: Largest single read
+        throttle: Called as throttle(nbytes, ops) before each read; returns
+            the seconds it waited (see BackgroundGovernor.throttle)
+    
+    Returns:
+        Dictionary with 'results' and 'errors' by consumer name, 'seconds'
+        spent in each consumer, 'bytes_read', 'file_size' and
+        'throttled_seconds' spent waiting on the throttle; when the file
+        cannot be read, 'error' is set and 'results' is empty
+    """
+    consumed = {id(consumer): 0 for consumer in consumers}
+    seconds = {consumer.name: 0.0 for consumer in consumers}
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    bytes_read = 0
+    throttled = 0.0
+    
+    try:
+        # Unbuffered: readinto fills our own buffer directly, with no second copy
+        with open(file_path, 'rb', buffering=0) as f:
+            file_size = os.fstat(f.fileno()).st_size
+            buffer = memoryview(bytearray(block_size))
+            active = list(consumers)
+            
+            while active:
+                # Read no more than the hungriest consumer still wants
+                if all(consumer.limit is not None for consumer in active):
+                    want = min(block_size, max(consumer.limit - consumed[id(consumer)] for consumer in active))
+                else:
+                    want = block_size
+                if throttle:
+                    throttled += throttle(min(want, max(file_size - bytes_read, 0)), 1)
+                count = f.readinto(buffer[:want])
+                if not count:
+                    break
+                bytes_read += count
+                
+                for consumer in list(active):
+                    taken = count
+                    if consumer.limit is not None:
+                        taken = min(count, consumer.limit - consumed[id(consumer)])
+                    started = time.perf_counter()
+                    try:
+                        consumer.feed(buffer[:taken])
+                    except Exception as e:
+                        errors[consumer.name] = str(e)
+                        active.remove(consumer)
+                        continue
+                    finally:
+                        seconds[consumer.name] += time.perf_counter() - started
+                    
+                    consumed[id(consumer)] += taken
+                    if consumer.done or (consumer.limit is not None and consumed[id(consumer)] >= consumer.limit):
+                        active.remove(consumer)
+    
+    except OSError as e:
+        return {'error': str(e), 'results': {}, 'errors': {}, 'seconds': {},
+                'bytes_read': bytes_read, 'file_size': None, 'throttled_seconds': throttled}
+    
+    for consumer in consumers:
+        if consumer.name in errors:
+            continue
+        started = time.perf_counter()
+        try:
+            results[consumer.name] = consumer.finish(file_size)
+        except Exception as e:
+            errors[consumer.name] = str(e)
+        seconds[consumer.name] += time.perf_counter() - started
+    
+    return {'results': results, 'errors': errors, 'seconds': seconds,
+            'bytes_read': bytes_read, 'file_size': file_size, 'throttled_seconds': throttled}
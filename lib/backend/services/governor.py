@@ -0,0 +1,225 @@
+"""
+Background-work governor shared by the scanner, the hasher and the analyst.
+Token buckets cap the bytes and operations per second background work may use, the
+process runs at low CPU and I/O priority, and both rates are cut while the machine is
+loaded or interactive queries are slow, so foreground applications keep the disk.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from shared.config import config
+from shared.database import db_manager
+
+
+# Seconds between checks of system load and interactive latency
+CHECK_INTERVAL = 2.0
+
+# Slowest background work is allowed to go, as a fraction of the configured rates
+MIN_SPEED = 1 / 16
+
+# Slow interactive queries are recorded under this metrics name and count as current for this long
+INTERACTIVE_METRICS = 'interactive'
+LATENCY_WINDOW = 30.0
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` units per second with bursts of up to one second's worth.
+    
+    Requests larger than the bucket are granted and leave it in debt, which
+    later requests wait out, so a single large file never blocks forever.
+    A rate of 0 is unlimited.
+    """
+    
+    def __init__(self, rate: float):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def set_rate(self, rate: float):
+        """Change the rate; tokens gathered so far are kept."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+    
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units and get the seconds to wait before using them."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class BackgroundGovernor:
+    """
+    Paces background work within one process.
+    
+    Callers report work before doing it with throttle(), which sleeps as long
+    as the token buckets require. The rates are scaled by a speed that halves
+    every check while the load average per CPU or the latency of recent
+    interactive queries is over its threshold, and doubles back up to full
+    speed once both are under.
+    """
+    
+    def __init__(self, bytes_per_second: float, ops_per_second: float,
+                 load_threshold: Optional[float] = None,
+                 latency_threshold_ms: Optional[float] = None):
+        """
+        Args:
+            bytes_per_second: Background read rate at full speed (0 for unlimited)
+            ops_per_second: Background operations (directory listings, analyzer
+                runs, file reads) per second at full speed (0 for unlimited)
+            load_threshold: 1-minute load average per CPU above which work slows (None: ignored)
+            latency_threshold_ms: Interactive query latency above which work slows (None: ignored)
+        """
+        self.bytes_per_second = bytes_per_second
+        self.ops_per_second = ops_per_second
+        self.load_threshold = load_threshold
+        self.latency_threshold_ms = latency_threshold_ms
+        self._bytes = TokenBucket(bytes_per_second)
+        self._ops = TokenBucket(ops_per_second)
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._lowered_threads = set()
+        self.speed = 1.0
+        self.load: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.stats = {'bytes': 0, 'ops': 0, 'throttled_seconds': 0.0, 'slowdowns': 0}
+    
+    def throttle(self, nbytes: int = 0, ops: int = 0) -> float:
+        """
+        Wait until `nbytes` bytes and `ops` operations of background work may proceed.
+        
+        Returns:
+            Seconds slept
+        """
+        self._check_conditions()
+        wait = max(self._bytes.reserve(nbytes) if nbytes else 0.0,
+                   self._ops.reserve(ops) if ops else 0.0)
+        with self._lock:
+            self.stats['bytes'] += nbytes
+            self.stats['ops'] += ops
+            self.stats['throttled_seconds'] += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def _check_conditions(self):
+        """Re-read system load and interactive latency and adjust the speed, at most every CHECK_INTERVAL."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < CHECK_INTERVAL:
+                return
+            self._checked_at = now
+        
+        load = self._get_load()
+        latency_ms = self._get_interactive_latency()
+        busy = ((self.load_threshold is not None and load is not None and load > self.load_threshold)
+                or (self.latency_threshold_ms is not None and latency_ms is not None
+                    and latency_ms > self.latency_threshold_ms))
+        
+        with self._lock:
+            self.load = load
+            self.latency_ms = latency_ms
+            speed = max(MIN_SPEED, self.speed / 2) if busy else min(1.0, self.speed * 2)
+            if speed < self.speed:
+                self.stats['slowdowns'] += 1
+            self.speed = speed
+        self._bytes.set_rate(self.bytes_per_second * speed)
+        self._ops.set_rate(self.ops_per_second * speed)
+    
+    @staticmethod
+    def _get_load() -> Optional[float]:
+        """Get the 1-minute load average per CPU, or None where there is none (Windows)."""
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None
+    
+    @staticmethod
+    def _get_interactive_latency() -> Optional[float]:
+        """Get the latency of the last slow interactive query, if it was recent."""
+        state = db_manager.get_metrics_state(INTERACTIVE_METRICS)
+        if not state or time.time() - state['updated_at'] > LATENCY_WINDOW:
+            return None
+        return state.get('latency_ms')
+    
+    def lower_priority(self):
+        """
+        Run background work from the calling thread at low CPU and I/O priority.
+        
+        On Linux both priorities belong to a thread and are inherited by the
+        threads and processes it starts, so entry points call this before
+        starting their worker pools and watcher threads. Calling it again from
+        the same thread does nothing.
+        """
+        thread_id = threading.get_native_id()
+        with self._lock:
+            if thread_id in self._lowered_threads:
+                return
+            self._lowered_threads.add(thread_id)
+        
+        try:
+            # PRIO_PROCESS with who=0 is the calling thread on Linux
+            current = os.getpriority(os.PRIO_PROCESS, 0)
+            os.setpriority(os.PRIO_PROCESS, 0, max(current, config.background_nice))
+        except (AttributeError, OSError):
+            # No nice on this platform
+            pass
+        
+        if sys.platform.startswith('linux') and config.background_io_priority is not None:
+            try:
+                # Best-effort class at the given level (7 is the lowest)
+                subprocess.run(['ionice', '-c', '2', '-n', str(config.background_io_priority),
+                                '-p', str(thread_id)],
+                               check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError:
+                # util-linux not installed
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the configured limits, current speed and the work paced so far."""
+        with self._lock:
+            return {
+                'bytes_per_second': self.bytes_per_second,
+                'ops_per_second': self.ops_per_second,
+                'speed': self.speed,
+                'load_per_cpu': round(self.load, 2) if self.load is not None else None,
+                'load_threshold': self.load_threshold,
+                'interactive_latency_ms': self.latency_ms,
+                'latency_threshold_ms': self.latency_threshold_ms,
+                'priority_lowered': bool(self._lowered_threads),
+                **{key: round(value, 3) if isinstance(value, float) else value
+                   for key, value in self.stats.items()}
+            }
+
+
+def record_interactive_latency(seconds: float):
+    """
+    Report the latency of an interactive query.
+    
+    Only queries over the latency threshold are written, so background
+    processes see them (within LATENCY_WINDOW) and slow down; fast queries
+    cost nothing.
+    """
+    latency_ms = seconds * 1000
+    threshold = config.background_latency_threshold_ms
+    if threshold is not None and latency_ms > threshold:
+        db_manager.save_metrics_state(INTERACTIVE_METRICS, {'latency_ms': round(latency_ms, 1)})
+
+
+# Global governor instance; budgets apply per process
+governor = BackgroundGovernor(config.background_bytes_per_second, config.background_ops_per_second,
+                              config.background_load_threshold, config.background_latency_threshold_ms)
@@ -7,8 +7,10 @@ import sys
 import os
 import time
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Callable, Any
 from datetime import datetime
 
 # Add the parent directory to the path so we can import shared modules
@@ -32,6 +34,7 @@ except ImportError:
 
 from shared.database import db_manager
 from shared.config import config
+from services.governor import governor
 
 
 class AssetWatcher(FileSystemEventHandler):
@@ -55,8 +58,17 @@ class AssetWatcher(FileSystemEventHandler):
         '.dwg', '.dxf'
     }
     
-    def __init__(self):
-        """Initialize the asset watcher."""
+    def __init__(self, storm_threshold: int = 200, storm_window: float = 2.0,
+                 storm_quiet_period: float = 5.0, storm_subtree_depth: int = 1):
+        """
+        Initialize the asset watcher.
+        
+        Args:
+            storm_threshold: Events within storm_window that put a subtree into storm mode
+            storm_window: Seconds over which the event rate of a subtree is measured
+            storm_quiet_period: Seconds without events before a stormy subtree is rescanned
+            storm_subtree_depth: Folder levels below the library root that make up a subtree
+        """
         super().__init__()
         self.db = db_manager
         self.config = config
@@ -65,6 +77,26 @@ class AssetWatcher(FileSystemEventHandler):
         self.is_running = False
         self.library_root_map: Dict[str, str] = {}  # Maps file paths to their library root
         
+        # Event-storm detection
+        self.storm_threshold = storm_threshold
+        self.storm_window = storm_window
+        self.storm_quiet_period = storm_quiet_period
+        self.storm_subtree_depth = storm_subtree_depth
+        self._storm_lock = threading.Lock()
+        self._event_rates: Dict[str, List[float]] = {}  # subtree -> [window_start, event_count]
+        self._storms: Dict[str, Dict[str, Any]] = {}  # subtree -> storm state
+        self._storm_stop = threading.Event()
+        self._storm_thread: Optional[threading.Thread] = None
+        self.storm_metrics = {
+            'storms_detected': 0,
+            'events_dropped': 0,
+            'rescans_completed': 0,
+            'rescan_assets_added': 0,
+            'rescan_assets_updated': 0,
+            'rescan_assets_removed': 0,
+            'last_storm': None
+        }
+        
     def start_watching(self, libraries: Optional[List[str]] = None) -> bool:
         """
         Start watching configured libraries for file changes.
@@ -93,6 +125,9 @@ class AssetWatcher(FileSystemEventHandler):
                     if self.config.is_valid_path(lib_path):
                         self.db.add_library(lib_path, Path(lib_path).name)
             
+            # Before the observer and storm threads start, so they inherit the low priority
+            governor.lower_priority()
+            
             # Start observer
             self.observer = Observer()
             
@@ -106,7 +141,16 @@ class AssetWatcher(FileSystemEventHandler):
             if self.watched_paths:
                 self.observer.start()
                 self.is_running = True
+                
+                self._storm_stop.clear()
+                self._storm_thread = threading.Thread(target=self._storm_monitor_loop, daemon=True)
+                self._storm_thread.start()
                 print(f"Asset watcher started. Watching {len(self.watched_paths)} paths.")
+                
+                # Catch up on changes made while the watcher was down. The
+                # observer is already running, so nothing slips in between.
+                for library_path in self.watched_paths:
+                    self.reconcile_library(library_path)
                 return True
             else:
                 print("No valid paths to watch.")
@@ -122,6 +166,10 @@ class AssetWatcher(FileSystemEventHandler):
             if self.observer and self.is_running:
                 self.observer.stop()
                 self.observer.join()
+                self._storm_stop.set()
+                if self._storm_thread:
+                    self._storm_thread.join()
+                    self._storm_thread = None
                 self.is_running = False
                 self.watched_paths.clear()
                 print("Asset watcher stopped.")
@@ -181,11 +229,6 @@ class AssetWatcher(FileSystemEventHandler):
             if not self._is_supported_file(file_path):
                 return
             
-            # Get file info
-            file_info = self._get_file_info(file_path)
-            if not file_info:
-                return
-            
             # Find the library root for this file
             library_root = None
             for watched_path in self.watched_paths:
@@ -197,6 +240,15 @@ class AssetWatcher(FileSystemEventHandler):
                 print(f"Could not determine library root for: {file_path}")
                 return
             
+            # Subtrees in an event storm are rescanned in bulk once they go quiet
+            if not self._admit_event(file_path, library_root):
+                return
+            
+            # Get file info
+            file_info = self._get_file_info(file_path)
+            if not file_info:
+                return
+            
             # Get smart folder metadata
             category, tags = self._get_folder_metadata(file_path, library_root)
             
@@ -229,6 +281,164 @@ class AssetWatcher(FileSystemEventHandler):
         except Exception as e:
             print(f"Error processing file event: {e}")
     
+    def _get_subtree(self, file_path: str, library_root: str) -> str:
+        """Get the subtree (library root plus storm_subtree_depth folders) of a file."""
+        rel_dir = os.path.dirname(os.path.relpath(file_path, library_root))
+        parts = [p for p in rel_dir.split(os.sep) if p and p != '.']
+        return os.path.join(library_root, *parts[:self.storm_subtree_depth])
+    
+    def _admit_event(self, file_path: str, library_root: str) -> bool:
+        """
+        Rate-check an event against its subtree.
+        
+        Returns:
+            True if the event should be processed individually, False if it was
+            dropped because its subtree is in an event storm
+        """
+        subtree = self._get_subtree(file_path, library_root)
+        now = time.monotonic()
+        
+        with self._storm_lock:
+            storm = self._storms.get(subtree)
+            if storm:
+                storm['last_event'] = now
+                storm['events_dropped'] += 1
+                self.storm_metrics['events_dropped'] += 1
+                return False
+            
+            rate = self._event_rates.get(subtree)
+            if rate is None or now - rate[0] > self.storm_window:
+                self._event_rates[subtree] = [now, 1]
+                return True
+            
+            rate[1] += 1
+            if rate[1] < self.storm_threshold:
+                return True
+            
+            # Rate threshold crossed: switch the subtree into bulk-rescan mode
+            del self._event_rates[subtree]
+            self._storms[subtree] = {
+                'library_root': library_root,
+                'started': now,
+                'started_wall': time.time() - self.storm_window,
+                'last_event': now,
+                'events_dropped': 1
+            }
+            self.storm_metrics['storms_detected'] += 1
+            self.storm_metrics['events_dropped'] += 1
+            self.storm_metrics['last_storm'] = {
+                'subtree': subtree,
+                'detected_at': datetime.now().isoformat(),
+                'events_in_window': rate[1]
+            }
+            print(f"Event storm detected in {subtree} ({rate[1]} events in "
+                  f"{self.storm_window}s). Switching to bulk rescan.")
+            return False
+    
+    def _storm_monitor_loop(self):
+        """Rescan stormy subtrees once they have been quiet for storm_quiet_period."""
+        while not self._storm_stop.wait(1.0):
+            now = time.monotonic()
+            with self._storm_lock:
+                quiet = [(subtree, storm) for subtree, storm in self._storms.items()
+                         if now - storm['last_event'] >= self.storm_quiet_period]
+            
+            for subtree, storm in quiet:
+                print(f"Event storm in {subtree} subsided after dropping "
+                      f"{storm['events_dropped']} events. Rescanning subtree...")
+                rescan_started = time.monotonic()
+                rescan_started_wall = time.time()
+                self.rescan_subtree(subtree, storm['library_root'], since=storm['started_wall'])
+                
+                # Events dropped while the rescan ran may describe changes it
+                # walked past; stay in storm mode and rescan again once quiet,
+                # from when this rescan began
+                with self._storm_lock:
+                    if storm['last_event'] >= rescan_started:
+                        storm['started_wall'] = rescan_started_wall
+                        print(f"Events arrived in {subtree} during the rescan; it will be rescanned again.")
+                    else:
+                        self._storms.pop(subtree, None)
+    
+    def rescan_subtree(self, subtree: str, library_root: str, since: float = 0.0) -> Dict[str, int]:
+        """
+        Incrementally rescan a subtree in one batch.
+        
+        New files are added, files gone from disk are removed and files
+        modified at or after `since` are set back to pending.
+        
+        Args:
+            subtree: Directory to rescan
+            library_root: Root of the library containing the subtree
+            since: Epoch seconds; files with a newer mtime are re-queued for analysis
+            
+        Returns:
+            Counts of assets added, updated and removed
+        """
+        result = {'assets_added': 0, 'assets_updated': 0, 'assets_removed': 0}
+        
+        try:
+            known_files = set(self.db.get_asset_paths_in_directory(subtree, recursive=True))
+            current_files = set()
+            modified_files = []
+            directory_states = []
+            
+            if os.path.isdir(subtree):
+                for dir_path, mtime_ns, entries in self._walk_directories(subtree):
+                    directory_states.append((dir_path, mtime_ns, len(entries)))
+                    
+                    for entry in entries:
+                        if not self._is_regular_file(entry) or not self._is_supported_file(entry.path):
+                            continue
+                        
+                        current_files.add(entry.path)
+                        if entry.path not in known_files:
+                            if self._add_new_asset(entry.path, library_root):
+                                result['assets_added'] += 1
+                        else:
+                            try:
+                                if entry.stat(follow_symlinks=False).st_mtime >= since:
+                                    modified_files.append(entry.path)
+                            except OSError:
+                                continue
+            
+            if modified_files:
+                result['assets_updated'] = self.db.mark_assets_pending(modified_files)
+            removed = list(known_files - current_files)
+            if removed:
+                result['assets_removed'] = self.db.delete_assets_by_paths(removed)
+            if directory_states:
+                self.db.upsert_directory_states(library_root, directory_states)
+            
+            with self._storm_lock:
+                self.storm_metrics['rescans_completed'] += 1
+                self.storm_metrics['rescan_assets_added'] += result['assets_added']
+                self.storm_metrics['rescan_assets_updated'] += result['assets_updated']
+                self.storm_metrics['rescan_assets_removed'] += result['assets_removed']
+            
+            print(f"Subtree rescan of {subtree} complete: {result['assets_added']} added, "
+                  f"{result['assets_updated']} updated, {result['assets_removed']} removed.")
+            return result
+            
+        except Exception as e:
+            print(f"Error rescanning subtree {subtree}: {e}")
+            return result
+    
+    def get_storm_metrics(self) -> Dict[str, Any]:
+        """Get event-storm detection metrics and currently active storms."""
+        with self._storm_lock:
+            metrics = dict(self.storm_metrics)
+            metrics['active_storms'] = {
+                subtree: {'events_dropped': storm['events_dropped']}
+                for subtree, storm in self._storms.items()
+            }
+            metrics['threshold'] = {
+                'events': self.storm_threshold,
+                'window_seconds': self.storm_window,
+                'quiet_period_seconds': self.storm_quiet_period
+            }
+        return metrics
+    
     def _is_supported_file(self, file_path: str) -> bool:
         """Check if file has supported extension."""
         try:
@@ -280,12 +490,15 @@ class AssetWatcher(FileSystemEventHandler):
         except Exception:
             return 'Uncategorized'
     
-    def scan_library(self, library_path: str) -> int:
+    def scan_library(self, library_path: str,
+                     progress_callback: Optional[Callable[[str, int, int], None]] = None) -> int:
         """
         Perform a full scan of a library directory.
         
         Args:
             library_path: Path to the library directory
+            progress_callback: Optional callable invoked as
+                (library_path, files_seen, assets_added) after each supported file
             
         Returns:
             Number of assets added
@@ -295,35 +508,29 @@ class AssetWatcher(FileSystemEventHandler):
                 print(f"Invalid library path: {library_path}")
                 return 0
             
-            path = Path(library_path)
+            governor.lower_priority()
             added_count = 0
+            seen_count = 0
+            directory_states = []
             
             print(f"Scanning library: {library_path}")
             
-            # Walk through directory recursively
-            for file_path in path.rglob('*'):
-                if file_path.is_file() and self._is_supported_file(str(file_path)):
-                    # Check if asset already exists
-                    existing_asset = self.db.get_asset_by_path(str(file_path))
+            # Walk through directory recursively, recording directory state as we go
+            for dir_path, mtime_ns, entries in self._walk_directories(library_path):
+                directory_states.append((dir_path, mtime_ns, len(entries)))
+                
+                for entry in entries:
+                    if not self._is_regular_file(entry) or not self._is_supported_file(entry.path):
+                        continue
                     
-                    if not existing_asset:
-                        # Get smart folder metadata
-                        category, tags = self._get_folder_metadata(str(file_path), library_path)
-                        
-                        # Get file info
-                        file_info = self._get_file_info(str(file_path))
-                        if file_info:
-                            # Add new asset with smart folder metadata
-                            asset_id = self.db.add_asset(
-                                file_path=str(file_path),
-                                name=file_info['name'],
-                                category=category,
-                                tags=tags,
-                                file_size=file_info['size']
-                            )
-                            if asset_id:
-                                added_count += 1
-                                print(f"Added asset: {file_info['name']} (Category: {category}, Tags: {tags})")
+                    seen_count += 1
+                    if self._add_new_asset(entry.path, library_path):
+                        added_count += 1
+                    
+                    if progress_callback:
+                        progress_callback(library_path, seen_count, added_count)
+            
+            self.db.upsert_directory_states(library_path, directory_states)
             
             print(f"Library scan completed. Added {added_count} new assets.")
             return added_count
@@ -332,6 +539,241 @@ class AssetWatcher(FileSystemEventHandler):
             print(f"Error scanning library {library_path}: {e}")
             return 0
     
+    def _add_new_asset(self, file_path: str, library_path: str) -> bool:
+        """Add a file as a new asset unless it is already indexed."""
+        # Check if asset already exists
+        if self.db.get_asset_by_path(file_path):
+            return False
+        
+        # Get smart folder metadata
+        category, tags = self._get_folder_metadata(file_path, library_path)
+        
+        # Get file info
+        file_info = self._get_file_info(file_path)
+        if not file_info:
+            return False
+        
+        # Add new asset with smart folder metadata
+        asset_id = self.db.add_asset(
+            file_path=file_path,
+            name=file_info['name'],
+            category=category,
+            tags=tags,
+            file_size=file_info['size']
+        )
+        if asset_id:
+            print(f"Added asset: {file_info['name']} (Category: {category}, Tags: {tags})")
+            return True
+        return False
+    
+    def _is_regular_file(self, entry: os.DirEntry) -> bool:
+        """Check whether a directory entry is a regular file (uses d_type, no stat)."""
+        try:
+            return entry.is_file(follow_symlinks=False)
+        except OSError:
+            return False
+    
+    def _list_directory(self, dir_path: str) -> Optional[tuple[int, list]]:
+        """
+        List a directory once.
+        
+        Returns:
+            Tuple of (mtime_ns, entries) or None if the directory is unreadable
+        """
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+            return mtime_ns, entries
+        except OSError:
+            return None
+    
+    def _walk_directories(self, root: str):
+        """
+        Walk a directory tree, yielding (dir_path, mtime_ns, entries) per directory.
+        
+        Costs one stat and one listing per directory; files are never stat'ed.
+        Each listing is paced by the background governor.
+        """
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            governor.throttle(ops=1)
+            listing = self._list_directory(dir_path)
+            if listing is None:
+                continue
+            
+            mtime_ns, entries = listing
+            yield dir_path, mtime_ns, entries
+            
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                except OSError:
+                    continue
+    
+    def reconcile_library(self, library_path: str) -> Dict[str, int]:
+        """
+        Catch up on changes made to a library while the watcher was down.
+        
+        Uses the persisted directory index: adding, removing or renaming a file
+        bumps its parent directory's mtime, so only directories whose mtime or
+        entry count changed have their files compared with the database.
+        
+        Args:
+            library_path: Path to the library directory
+            
+        Returns:
+            Counts of directories visited/changed and assets added/removed
+        """
+        result = {'directories': 0, 'changed_directories': 0, 'assets_added': 0, 'assets_removed': 0}
+        
+        try:
+            if not self.config.is_valid_path(library_path):
+                return result
+            
+            stored_states = self.db.get_directory_states(library_path)
+            if not stored_states:
+                # Never indexed with directory state; fall back to a full scan
+                result['assets_added'] = self.scan_library(library_path)
+                return result
+            
+            changed_states = []
+            visited = set()
+            removed_paths = []
+            
+            for dir_path, mtime_ns, entries in self._walk_directories(library_path):
+                visited.add(dir_path)
+                result['directories'] += 1
+                
+                if stored_states.get(dir_path) == (mtime_ns, len(entries)):
+                    continue
+                
+                result['changed_directories'] += 1
+                changed_states.append((dir_path, mtime_ns, len(entries)))
+                
+                current_files = {
+                    entry.path for entry in entries
+                    if self._is_regular_file(entry) and self._is_supported_file(entry.path)
+                }
+                known_files = set(self.db.get_asset_paths_in_directory(dir_path))
+                
+                for file_path in current_files - known_files:
+                    if self._add_new_asset(file_path, library_path):
+                        result['assets_added'] += 1
+                removed_paths.extend(known_files - current_files)
+            
+            # Directories that disappeared take their assets with them
+            vanished = [path for path in stored_states if path not in visited]
+            for dir_path in vanished:
+                removed_paths.extend(self.db.get_asset_paths_in_directory(dir_path))
+            
+            if removed_paths:
+                result['assets_removed'] = self.db.delete_assets_by_paths(removed_paths)
+            if vanished:
+                self.db.delete_directory_states(vanished)
+            if changed_states:
+                self.db.upsert_directory_states(library_path, changed_states)
+            
+            print(f"Reconciled {library_path}: {result['changed_directories']}/{result['directories']} "
+                  f"directories changed, {result['assets_added']} added, {result['assets_removed']} removed.")
+            return result
+            
+        except Exception as e:
+            print(f"Error reconciling library {library_path}: {e}")
+            return result
+    
+    def _get_device_id(self, library_path: str) -> Optional[int]:
+        """Get the underlying device id (st_dev) of a library path."""
+        try:
+            return os.stat(library_path).st_dev
+        except OSError:
+            return None
+    
+    def scan_all_libraries(self, workers_per_device: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Scan every active library concurrently.
+        
+        Libraries are grouped by the device they live on. Each device gets its
+        own concurrency limit, so libraries on separate disks are scanned in
+        parallel while libraries sharing one disk do not thrash it.
+        
+        Args:
+            workers_per_device: Maximum concurrent scans per device
+                (default: config.scan_workers_per_device)
+            
+        Returns:
+            Dictionary with per-library results and aggregated totals
+        """
+        if workers_per_device is None:
+            workers_per_device = self.config.scan_workers_per_device
+        workers_per_device = max(1, workers_per_device)
+        
+        libraries = [lib['path'] for lib in self.db.get_libraries(active_only=True)]
+        libraries = [lib for lib in libraries if self.config.is_valid_path(lib)]
+        
+        if not libraries:
+            print("No active libraries to scan.")
+            return {'libraries': {}, 'files_seen': 0, 'assets_added': 0, 'devices': 0}
+        
+        # One semaphore per device caps concurrent scans on that device
+        device_limits: Dict[Optional[int], threading.Semaphore] = {}
+        library_devices: Dict[str, Optional[int]] = {}
+        for library_path in libraries:
+            device_id = self._get_device_id(library_path)
+            library_devices[library_path] = device_id
+            if device_id not in device_limits:
+                device_limits[device_id] = threading.Semaphore(workers_per_device)
+        
+        # Aggregated progress shared by all scan threads
+        progress_lock = threading.Lock()
+        progress = {lib: {'files_seen': 0, 'assets_added': 0} for lib in libraries}
+        last_report = [0]
+        
+        def report_progress(library_path: str, files_seen: int, assets_added: int):
+            with progress_lock:
+                progress[library_path] = {'files_seen': files_seen, 'assets_added': assets_added}
+                total_seen = sum(p['files_seen'] for p in progress.values())
+                if total_seen - last_report[0] >= 500:
+                    last_report[0] = total_seen
+                    total_added = sum(p['assets_added'] for p in progress.values())
+                    print(f"Scan progress: {total_seen} files seen, {total_added} assets added "
+                          f"across {len(libraries)} libraries")
+        
+        def scan_on_device(library_path: str) -> int:
+            with device_limits[library_devices[library_path]]:
+                return self.scan_library(library_path, progress_callback=report_progress)
+        
+        governor.lower_priority()
+        max_workers = len(device_limits) * workers_per_device
+        print(f"Scanning {len(libraries)} libraries on {len(device_limits)} devices "
+              f"({workers_per_device} per device)...")
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(libraries))) as executor:
+            futures = {executor.submit(scan_on_device, lib): lib for lib in libraries}
+            for future in as_completed(futures):
+                library_path = futures[future]
+                try:
+                    added = future.result()
+                    results[library_path] = {'success': True, 'assets_added': added}
+                except Exception as e:
+                    results[library_path] = {'success': False, 'error': str(e), 'assets_added': 0}
+                results[library_path]['files_seen'] = progress[library_path]['files_seen']
+                results[library_path]['device'] = library_devices[library_path]
+        
+        total_seen = sum(r['files_seen'] for r in results.values())
+        total_added = sum(r['assets_added'] for r in results.values())
+        print(f"All libraries scanned. {total_seen} files seen, {total_added} new assets.")
+        
+        return {
+            'libraries': results,
+            'files_seen': total_seen,
+            'assets_added': total_added,
+            'devices': len(device_limits)
+        }
+    
     def get_watched_paths(self) -> List[str]:
         """Get list of currently watched paths."""
         return list(self.watched_paths)
@@ -343,6 +785,7 @@ def main():
     
     parser = argparse.ArgumentParser(description='Asset Watcher - Monitor and index files')
     parser.add_argument('--scan', help='Scan a specific library path')
+    parser.add_argument('--scan-all', action='store_true', help='Scan all active libraries concurrently')
     parser.add_argument('--watch', action='store_true', help='Start watching for changes')
     parser.add_argument('--stop-after', type=int, help='Stop after specified seconds (for testing)')
     
@@ -356,6 +799,10 @@ def main():
             count = watcher.scan_library(args.scan)
             print(f"Scan complete. Added {count} assets.")
             
+        elif args.scan_all:
+            result = watcher.scan_all_libraries()
+            print(f"Scan complete. Added {result['assets_added']} assets.")
+            
         elif args.watch:
             # Start watching
             if watcher.start_watching():
@@ -375,7 +822,7 @@ def main():
                 print("Failed to start asset watcher.")
                 sys.exit(1)
         else:
-            print("Please specify --scan or --watch")
+            print("Please specify --scan, --scan-all or --watch")
             
     except Exception as e:
         print(f"Error: {e}")
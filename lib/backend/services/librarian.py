@@ -5,13 +5,21 @@ Provides high-level asset search and retrieval functionality.
 
 import sys
 import os
-from typing import List, Dict, Optional
+import time
+import base64
+from typing import Any, List, Dict, Optional
 
 # Add the parent directory to the path so we can import shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared.database import db_manager
 from shared.config import config
+from services.archives import extract_member, member_id, member_path, split_member_path
+from services.disk_cache import evict_directory
+from services.governor import record_interactive_latency
+from services.palette import find_by_color
+from services.similarity import find_similar
+from services.waveform import decode_waveform
 
 
 class LibrarianService:
@@ -37,8 +45,13 @@ class LibrarianService:
                 return []
             
             # Use the database manager's search functionality
+            started = time.perf_counter()
             results = self.db.search_assets(query.strip(), limit)
             
+            # What the user is looking for right now is analyzed first
+            self.db.boost_pending_assets([asset['id'] for asset in results],
+                                         config.analysis_priority_search_boost)
+            
             # Format results for output
             formatted_results = []
             for asset in results:
@@ -53,12 +66,246 @@ class LibrarianService:
                 }
                 formatted_results.append(formatted_asset)
             
+            # Files inside archives fill the rest, under their virtual paths
+            if len(formatted_results) < limit:
+                for member in self.db.search_archive_members(query.strip(), limit - len(formatted_results)):
+                    formatted_results.append(self._format_member(member, member['archive_path'], {
+                        'id': member['archive_id'],
+                        'category': member['category'],
+                        'tags': member['tags'],
+                        'created_at': member['created_at']
+                    }))
+            
+            # A slow search tells background work to back off
+            record_interactive_latency(time.perf_counter() - started)
             return formatted_results
             
         except Exception as e:
             print(f"Error in LibrarianService.search_assets: {e}")
             return []
     
+    def search_content(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Search the text inside documents and code (the content index).
+        
+        Args:
+            query: Words that must all appear; a trailing * matches a prefix
+            limit: Maximum number of results to return
+            
+        Returns:
+            List of asset dictionaries, best match first, each with a 'snippet'
+            of the matching text and the 'chunk' it came from
+        """
+        try:
+            if not query or not query.strip():
+                return []
+            
+            started = time.perf_counter()
+            results = self.db.search_content(query.strip(), limit)
+            record_interactive_latency(time.perf_counter() - started)
+            
+            return [
+                {
+                    'id': asset['id'],
+                    'name': asset['name'],
+                    'path': asset['path'],
+                    'category': asset['category'],
+                    'tags': asset.get('tags', []),
+                    'file_size': asset.get('file_size'),
+                    'created_at': asset.get('created_at'),
+                    'snippet': asset['snippet'],
+                    'chunk': asset['chunk'],
+                    'score': round(-asset['rank'], 3)
+                }
+                for asset in results
+            ]
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.search_content: {e}")
+            return []
+    
+    def find_similar_assets(self, asset_id: int, radius: Optional[int] = None) -> List[Dict]:
+        """
+        Find near-duplicates of an image: resized, re-saved or lightly edited copies.
+        
+        Args:
+            asset_id: The image asset to compare against
+            radius: Maximum perceptual-hash distance in bits (default: config.image_similarity_radius)
+            
+        Returns:
+            List of asset dictionaries with a 'distance', nearest first
+        """
+        try:
+            if radius is None:
+                radius = config.image_similarity_radius
+            
+            return [
+                {
+                    'id': asset['id'],
+                    'name': asset['name'],
+                    'path': asset['path'],
+                    'category': asset['category'],
+                    'tags': asset.get('tags', []),
+                    'file_size': asset.get('file_size'),
+                    'created_at': asset.get('created_at'),
+                    'distance': asset['distance']
+                }
+                for asset in find_similar(self.db, asset_id, radius)
+            ]
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.find_similar_assets: {e}")
+            return []
+    
+    def search_by_color(self, color: str, radius: Optional[float] = None,
+                        min_weight: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """
+        Find images with a dominant colour near the given one.
+        
+        Args:
+            color: Hex colour such as '#3a5f8c'
+            radius: Maximum CIE76 Delta E (default: config.color_search_radius)
+            min_weight: Least share of the image the colour must cover (default: config.color_search_min_weight)
+            limit: Maximum number of results to return
+            
+        Returns:
+            List of asset dictionaries with the matching 'color', its 'weight'
+            and its 'distance', closest first
+        """
+        try:
+            if radius is None:
+                radius = config.color_search_radius
+            if min_weight is None:
+                min_weight = config.color_search_min_weight
+            
+            return [
+                {
+                    'id': asset['id'],
+                    'name': asset['name'],
+                    'path': asset['path'],
+                    'category': asset['category'],
+                    'tags': asset.get('tags', []),
+                    'file_size': asset.get('file_size'),
+                    'created_at': asset.get('created_at'),
+                    'color': asset['color'],
+                    'weight': asset['weight'],
+                    'distance': asset['distance']
+                }
+                for asset in find_by_color(self.db, color, radius, min_weight, limit)
+            ]
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.search_by_color: {e}")
+            return []
+    
+    @staticmethod
+    def _format_member(member: Dict, archive_path: str, archive: Dict) -> Dict:
+        """Format an archive member as a virtual child asset of its archive."""
+        return {
+            'id': member_id(archive['id'], member['member_index']),
+            'name': member['name'],
+            'path': member_path(archive_path, member['member']),
+            'category': archive.get('category'),
+            'tags': archive.get('tags', []),
+            'file_size': member['size'],
+            'created_at': archive.get('created_at'),
+            'archive_id': archive['id'],
+            'archive_path': archive_path,
+            'member': member['member'],
+            'compressed_size': member['compressed_size'],
+            'crc32': f"{member['crc32']:08x}" if member['crc32'] is not None else None,
+            'modified_at': member['modified_at']
+        }
+    
+    def get_archive_members(self, asset_id: int, limit: int = 1000, offset: int = 0) -> List[Dict]:
+        """
+        List the files inside an archive asset, as indexed from its directory.
+        
+        Args:
+            asset_id: The archive asset
+            limit: Maximum number of members to return
+            offset: Members to skip, for paging through large archives
+            
+        Returns:
+            List of virtual child asset dictionaries in archive order
+        """
+        try:
+            return [
+                self._format_member(member, member['archive_path'], {
+                    'id': asset_id,
+                    'category': member['category'],
+                    'tags': member['tags'],
+                    'created_at': member['created_at']
+                })
+                for member in self.db.get_archive_members(asset_id, limit, offset)
+            ]
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.get_archive_members: {e}")
+            return []
+    
+    def resolve_path(self, path: str) -> Optional[str]:
+        """
+        Get a file on disk for an asset path, extracting an archive member on first use.
+        
+        Ordinary paths are returned unchanged. A member's virtual path
+        ('archive.zip!/dir/file.dwg') is extracted once into the member cache,
+        keyed by the archive's content hash, and the cached file is reused
+        until the archive changes or the cache evicts it (least recently
+        used first, beyond config.archive_extract_max_bytes).
+        
+        Returns:
+            Local file path, or None if the member is not indexed or cannot be extracted
+        """
+        try:
+            parts = split_member_path(path)
+            if parts is None:
+                return path
+            
+            archive_path, member = parts
+            indexed = self.db.get_archive_member(archive_path, member)
+            if not indexed or not indexed['file_hash']:
+                return None
+            
+            destination = os.path.join(config.archive_extract_directory, indexed['file_hash'])
+            extracted, is_new = extract_member(archive_path, member, destination, indexed['size'])
+            if is_new:
+                # Only a new extraction can push the cache over its budget
+                removed = evict_directory(config.archive_extract_directory, config.archive_extract_max_bytes,
+                                          keep=extracted)
+                if removed:
+                    print(f"Archive member cache over budget; removed {removed} extracted members.")
+            return extracted
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.resolve_path: {e}")
+            return None
+    
+    def get_waveform(self, asset_id: int) -> Optional[Dict]:
+        """
+        Get the precomputed waveform of an audio asset.
+        
+        Args:
+            asset_id: The audio asset
+            
+        Returns:
+            Dictionary with 'channels', 'points', 'sample_rate', 'frames',
+            'duration_seconds', 'peaks' as [min, max, ...] pairs scaled to +/-127,
+            and 'data', the packed blob in base64; None if none is stored
+        """
+        try:
+            blob = self.db.get_waveform(asset_id)
+            if blob is None:
+                return None
+            
+            waveform = decode_waveform(blob)
+            waveform['data'] = base64.b64encode(blob).decode('ascii')
+            return waveform
+            
+        except Exception as e:
+            print(f"Error in LibrarianService.get_waveform: {e}")
+            return None
+    
     def get_asset_by_id(self, asset_id: int) -> Optional[Dict]:
         """
         Get a specific asset by its ID.
@@ -104,18 +351,19 @@ class LibrarianService:
             print(f"Error in LibrarianService.get_assets_by_category: {e}")
             return []
     
-    def get_asset_metadata(self, asset_id: int) -> Dict[str, str]:
+    def get_asset_metadata(self, asset_id: int, include_blobs: bool = False) -> Dict[str, Any]:
         """
         Get metadata for a specific asset.
         
         Args:
             asset_id: The ID of the asset
+            include_blobs: Also decode the compressed full EXIF and tag values
             
         Returns:
             Dictionary of metadata key-value pairs
         """
         try:
-            return self.db.get_asset_metadata(asset_id)
+            return self.db.get_asset_metadata(asset_id, include_blobs)
             
         except Exception as e:
             print(f"Error in LibrarianService.get_asset_metadata: {e}")
@@ -160,6 +408,7 @@ def main():
     parser = argparse.ArgumentParser(description='Librarian Service - Search and manage assets')
     parser.add_argument('query', help='Search query')
     parser.add_argument('--limit', type=int, default=100, help='Maximum number of results')
+    parser.add_argument('--content', action='store_true', help='Search the text inside documents and code')
     parser.add_argument('--stats', action='store_true', help='Show database statistics')
     
     args = parser.parse_args()
@@ -170,6 +419,9 @@ def main():
         if args.stats:
             stats = librarian.get_database_stats()
             print(json.dumps(stats, indent=2))
+        elif args.content:
+            results = librarian.search_content(args.query, args.limit)
+            print(json.dumps(results, indent=2))
         else:
             results = librarian.search_assets(args.query, args.limit)
             print(json.dumps(results, indent=2))
@@ -0,0 +1,253 @@
+"""
+In-memory performance metrics for the asset analyst.
+Counters and log-bucketed latency histograms are cheap to update per task, merge
+across runs and serialize to JSON, so the analyst can persist them periodically.
+"""
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Histogram buckets grow by this factor (2 ** (1/8)): percentiles are within ~9%
+BUCKET_GROWTH = 2 ** 0.125
+
+# Latencies below this many milliseconds share the first bucket
+MIN_LATENCY_MS = 0.001
+
+PERCENTILES = (50, 95, 99)
+
+
+def run_timed(func: Callable, *args) -> Tuple[Any, float]:
+    """Call func(*args) and return (result, seconds); runs inside worker threads and processes."""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class LatencyHistogram:
+    """Sparse histogram of latencies in logarithmic buckets."""
+    
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+    
+    def record(self, seconds: float):
+        """Add one latency."""
+        ms = max(seconds * 1000, MIN_LATENCY_MS)
+        index = math.ceil(math.log(ms / MIN_LATENCY_MS, BUCKET_GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+    
+    def percentile(self, percent: float) -> Optional[float]:
+        """Get the latency in milliseconds below which `percent` of samples fall (bucket upper bound)."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return MIN_LATENCY_MS * BUCKET_GROWTH ** index
+        return MIN_LATENCY_MS * BUCKET_GROWTH ** max(self.buckets)
+    
+    def to_state(self) -> Dict[str, int]:
+        return {str(index): count for index, count in self.buckets.items()}
+    
+    def load_state(self, state: Dict[str, int]):
+        for index, count in state.items():
+            self.buckets[int(index)] = self.buckets.get(int(index), 0) + count
+            self.count += count
+
+
+class OperationStats:
+    """Count, errors, busy time, bytes and latency histogram of one kind of operation."""
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+    
+    def record(self, seconds: float, size: int = 0):
+        """Add one successful operation."""
+        self.count += 1
+        self.seconds += seconds
+        self.bytes += size or 0
+        self.latency.record(seconds)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Get counters, mean and percentile latencies and throughput."""
+        result = {
+            'count': self.count,
+            'errors': self.errors,
+            'busy_seconds': round(self.seconds, 3),
+            'mean_ms': round(self.seconds * 1000 / self.count, 3) if self.count else None
+        }
+        for percent in PERCENTILES:
+            value = self.latency.percentile(percent)
+            result[f'p{percent}_ms'] = round(value, 3) if value is not None else None
+        result['bytes'] = self.bytes
+        # Per worker: busy time, not wall time, is the denominator
+        result['mb_per_second'] = (round(self.bytes / self.seconds / (1024 * 1024), 2)
+                                   if self.seconds and self.bytes else None)
+        return result
+    
+    def to_state(self) -> Dict[str, Any]:
+        return {'count': self.count, 'errors': self.errors, 'seconds': self.seconds,
+                'bytes': self.bytes, 'latency': self.latency.to_state()}
+    
+    def load_state(self, state: Dict[str, Any]):
+        self.count += state.get('count', 0)
+        self.errors += state.get('errors', 0)
+        self.seconds += state.get('seconds', 0.0)
+        self.bytes += state.get('bytes', 0)
+        self.latency.load_state(state.get('latency', {}))
+
+
+class AnalysisMetrics:
+    """
+    Analyst metrics: analyzer runs by analyzer and by file extension, pipeline
+    stages (read pass, database writes), bytes read per indexed byte, backlog
+    depth and worker utilization.
+    
+    State accumulates across runs: load_state() adds a persisted snapshot to
+    the live counters, and to_state() returns everything for persisting.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.analyzers: Dict[str, OperationStats] = {}
+        self.extensions: Dict[str, OperationStats] = {}
+        self.stages: Dict[str, OperationStats] = {}
+        # resource class -> [busy seconds, capacity seconds]
+        self.workers: Dict[str, list] = {}
+        self.queue = {'current': 0, 'max': 0, 'total': 0, 'samples': 0}
+        # Read pass: bytes read against the size of the files read, and analyzer runs it served
+        self.reads = {'files': 0, 'bytes_read': 0, 'indexed_bytes': 0, 'analyses_served': 0}
+        self.cycles = 0
+        self.cycle_seconds = 0.0
+        self.since = time.time()
+    
+    @staticmethod
+    def _get(group: Dict[str, OperationStats], key: str) -> OperationStats:
+        stats = group.get(key)
+        if stats is None:
+            stats = group[key] = OperationStats()
+        return stats
+    
+    def record_analysis(self, analyzer: str, extension: str, resource_class: str,
+                        seconds: float, size: int):
+        """Record a completed analyzer run and the worker time it used."""
+        with self._lock:
+            self._get(self.analyzers, analyzer).record(seconds, size)
+            self._get(self.extensions, extension or '(none)').record(seconds, size)
+            self.workers.setdefault(resource_class, [0.0, 0.0])[0] += seconds
+    
+    def record_error(self, analyzer: str, extension: str):
+        """Record a failed analyzer run."""
+        with self._lock:
+            self._get(self.analyzers, analyzer).errors += 1
+            self._get(self.extensions, extension or '(none)').errors += 1
+    
+    def record_stage(self, stage: str, seconds: float, size: int = 0,
+                     resource_class: Optional[str] = None):
+        """Record one operation of a pipeline stage, optionally as worker time of a pool."""
+        with self._lock:
+            self._get(self.stages, stage).record(seconds, size)
+            if resource_class:
+                self.workers.setdefault(resource_class, [0.0, 0.0])[0] += seconds
+    
+    def record_read_pass(self, bytes_read: int, file_size: int, analyses_served: int):
+        """Record one file's read pass."""
+        with self._lock:
+            self.reads['files'] += 1
+            self.reads['bytes_read'] += bytes_read
+            self.reads['indexed_bytes'] += file_size
+            self.reads['analyses_served'] += analyses_served
+    
+    def record_queue_depth(self, depth: int):
+        """Record a sample of the pending backlog."""
+        with self._lock:
+            self.queue['current'] = depth
+            self.queue['max'] = max(self.queue['max'], depth)
+            self.queue['total'] += depth
+            self.queue['samples'] += 1
+    
+    def record_cycle(self, seconds: float, pool_sizes: Dict[str, int]):
+        """Record an analysis cycle; every pool had `size` workers available for its duration."""
+        with self._lock:
+            self.cycles += 1
+            self.cycle_seconds += seconds
+            for resource_class, size in pool_sizes.items():
+                self.workers.setdefault(resource_class, [0.0, 0.0])[1] += seconds * size
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-friendly summary with percentiles, throughput and utilization."""
+        with self._lock:
+            return {
+                'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.since)),
+                'cycles': self.cycles,
+                'cycle_seconds': round(self.cycle_seconds, 3),
+                'analyzers': {name: stats.summary() for name, stats in sorted(self.analyzers.items())},
+                'extensions': {name: stats.summary() for name, stats in sorted(self.extensions.items())},
+                'stages': {name: stats.summary() for name, stats in sorted(self.stages.items())},
+                'read_pass': {
+                    **self.reads,
+                    'bytes_read_per_indexed_byte': round(self.reads['bytes_read'] / self.reads['indexed_bytes'], 3)
+                    if self.reads['indexed_bytes'] else None
+                },
+                'queue_depth': {
+                    'current': self.queue['current'],
+                    'max': self.queue['max'],
+                    'mean': round(self.queue['total'] / self.queue['samples'], 1)
+                    if self.queue['samples'] else None
+                },
+                'worker_utilization': {
+                    resource_class: {
+                        'busy_seconds': round(busy, 3),
+                        'capacity_seconds': round(capacity, 3),
+                        'utilization': round(min(busy / capacity, 1.0), 3) if capacity else None
+                    }
+                    for resource_class, (busy, capacity) in sorted(self.workers.items())
+                }
+            }
+    
+    def to_state(self) -> Dict[str, Any]:
+        """Get the full state for persisting."""
+        with self._lock:
+            return {
+                'since': self.since,
+                'cycles': self.cycles,
+                'cycle_seconds': self.cycle_seconds,
+                'analyzers': {name: stats.to_state() for name, stats in self.analyzers.items()},
+                'extensions': {name: stats.to_state() for name, stats in self.extensions.items()},
+                'stages': {name: stats.to_state() for name, stats in self.stages.items()},
+                'workers': self.workers,
+                'queue': self.queue,
+                'reads': self.reads
+            }
+    
+    def load_state(self, state: Dict[str, Any]):
+        """Add a persisted state to the current counters."""
+        with self._lock:
+            self.since = min(self.since, state.get('since', self.since))
+            self.cycles += state.get('cycles', 0)
+            self.cycle_seconds += state.get('cycle_seconds', 0.0)
+            for attribute in ('analyzers', 'extensions', 'stages'):
+                group = getattr(self, attribute)
+                for name, stats in state.get(attribute, {}).items():
+                    self._get(group, name).load_state(stats)
+            for resource_class, (busy, capacity) in state.get('workers', {}).items():
+                entry = self.workers.setdefault(resource_class, [0.0, 0.0])
+                entry[0] += busy
+                entry[1] += capacity
+            for key, value in state.get('reads', {}).items():
+                self.reads[key] = self.reads.get(key, 0) + value
+            queue = state.get('queue', {})
+            self.queue['current'] = queue.get('current', self.queue['current'])
+            self.queue['max'] = max(self.queue['max'], queue.get('max', 0))
+            self.queue['total'] += queue.get('total', 0)
+            self.queue['samples'] += queue.get('samples', 0)
@@ -0,0 +1,227 @@
+"""
+Dominant colours of images and the colour search index.
+Each image is reduced to a small palette with vectorized k-means. Palette colours are
+indexed by coarse CIELAB bin, so "assets near #3a5f8c" looks up a handful of bins and
+compares a few stored colours instead of rescanning pixels.
+"""
+
+import math
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from services.thumbnails import load_preview_image
+
+
+# Colours per palette
+PALETTE_SIZE = 5
+
+# Longest edge the image is reduced to before clustering (at most 4096 pixels)
+SAMPLE_SIZE = 64
+
+# k-means stops after this many rounds, or once no centre moves by more than CONVERGENCE
+MAX_ITERATIONS = 12
+CONVERGENCE = 0.5
+
+# Palette colours closer than this (CIE76 Delta E) are merged into one
+MERGE_DISTANCE = 8.0
+
+# Colours covering less of the image than this are left out of the palette
+MIN_COLOR_WEIGHT = 0.02
+
+# Width of a colour index bin in CIELAB units, and the bins per axis
+LAB_BIN_SIZE = 10.0
+L_BINS = 11          # L in [0, 100]
+AB_BINS = 26         # a, b in [-128, 132)
+AB_OFFSET = 128.0
+
+
+def _kmeans(pixels, k: int):
+    """Cluster an (N, 3) float array; returns (centres, pixel counts) of the non-empty clusters."""
+    import numpy as np
+    
+    rng = np.random.default_rng(0)
+    # k-means++ seeding: each new centre is drawn far from the existing ones
+    centres = pixels[[rng.integers(len(pixels))]]
+    for _ in range(1, k):
+        distances = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = distances.sum()
+        if total == 0:
+            break
+        centres = np.vstack([centres, pixels[rng.choice(len(pixels), p=distances / total)]])
+    
+    for _ in range(MAX_ITERATIONS):
+        labels = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centres))
+        sums = np.stack([np.bincount(labels, weights=pixels[:, channel], minlength=len(centres))
+                         for channel in range(3)], axis=1)
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centres)
+        converged = np.abs(moved - centres).max() < CONVERGENCE
+        centres = moved
+        if converged:
+            break
+    
+    labels = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    counts = np.bincount(labels, minlength=len(centres))
+    keep = counts > 0
+    return centres[keep], counts[keep]
+
+
+def palette_of_image(img, k: int = PALETTE_SIZE) -> List[Tuple[str, float]]:
+    """Get the dominant colours of a PIL image as (hex colour, share of pixels), largest first."""
+    import numpy as np
+    
+    img.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        rgba = np.asarray(img.convert('RGBA'), dtype=np.float32).reshape(-1, 4)
+        # Transparent pixels are background, not colour
+        pixels = rgba[rgba[:, 3] >= 128, :3]
+    else:
+        pixels = np.asarray(img.convert('RGB'), dtype=np.float32).reshape(-1, 3)
+    if len(pixels) == 0:
+        return []
+    
+    centres, counts = _kmeans(pixels, k)
+    
+    # k-means splits a large flat area into near-identical centres; fold those together
+    merged: List[List] = []  # [rgb sum weighted by count, count, lab of the largest part]
+    for index in np.argsort(-counts):
+        centre, count = centres[index], int(counts[index])
+        lab = rgb_to_lab(*(int(round(channel)) for channel in centre))
+        for entry in merged:
+            if math.dist(lab, entry[2]) < MERGE_DISTANCE:
+                entry[0] = entry[0] + centre * count
+                entry[1] += count
+                break
+        else:
+            merged.append([centre * count, count, lab])
+    
+    palette = []
+    for total, count, _ in sorted(merged, key=lambda entry: -entry[1]):
+        weight = count / len(pixels)
+        if weight < MIN_COLOR_WEIGHT:
+            continue
+        r, g, b = (int(round(channel)) for channel in total / count)
+        palette.append((f'#{r:02x}{g:02x}{b:02x}', round(weight, 3)))
+    return palette
+
+
+def extract_palette(file_path: str) -> Optional[Dict]:
+    """Analyze an image into its palette, stored as '#rrggbb:weight' pairs."""
+    try:
+        img = load_preview_image(file_path, SAMPLE_SIZE * 2)
+        if img is None:
+            return None
+        
+        with img:
+            palette = palette_of_image(img)
+        if not palette:
+            return None
+        return {'palette': ','.join(f'{color}:{weight}' for color, weight in palette)}
+    
+    except ImportError:
+        return {'analysis_note': 'PIL/NumPy not available for colour analysis'}
+    except Exception as e:
+        print(f"Error extracting palette from {file_path}: {e}")
+        return None
+
+
+def parse_color(value: str) -> Tuple[int, int, int]:
+    """
+    Parse '#3a5f8c', '3a5f8c' or '#35c' into an (r, g, b) tuple.
+    
+    Raises:
+        ValueError: If the value is not a hex colour
+    """
+    digits = value.strip().lstrip('#')
+    if len(digits) == 3:
+        digits = ''.join(c * 2 for c in digits)
+    if len(digits) != 6:
+        raise ValueError(f'not a hex colour: {value!r}')
+    number = int(digits, 16)
+    return (number >> 16) & 0xFF, (number >> 8) & 0xFF, number & 0xFF
+
+
+def rgb_to_lab(r: int, g: int, b: int) -> Tuple[float, float, float]:
+    """Convert an sRGB colour to CIELAB (D65), where Euclidean distance follows perception."""
+    def linear(channel: int) -> float:
+        c = channel / 255.0
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+    
+    rl, gl, bl = linear(r), linear(g), linear(b)
+    x = (0.4124 * rl + 0.3576 * gl + 0.1805 * bl) / 0.95047
+    y = 0.2126 * rl + 0.7152 * gl + 0.0722 * bl
+    z = (0.0193 * rl + 0.1192 * gl + 0.9505 * bl) / 1.08883
+    
+    def f(t: float) -> float:
+        return t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116
+    
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def _axis_bin(value: float, offset: float, bins: int) -> int:
+    return min(bins - 1, max(0, int((value + offset) // LAB_BIN_SIZE)))
+
+
+def color_bin(lab: Tuple[float, float, float]) -> int:
+    """Get the index bin of a CIELAB colour."""
+    l, a, b = lab
+    return ((_axis_bin(l, 0.0, L_BINS) * AB_BINS + _axis_bin(a, AB_OFFSET, AB_BINS)) * AB_BINS
+            + _axis_bin(b, AB_OFFSET, AB_BINS))
+
+
+def bins_within(lab: Tuple[float, float, float], radius: float) -> List[int]:
+    """Get every index bin containing a colour within `radius` (Delta E) of `lab`."""
+    axes = []
+    for value, offset, bins in zip(lab, (0.0, AB_OFFSET, AB_OFFSET), (L_BINS, AB_BINS, AB_BINS)):
+        low = _axis_bin(value - radius, offset, bins)
+        high = _axis_bin(value + radius, offset, bins)
+        # Distance from the value to each bin's interval along this axis
+        axes.append([
+            (index, max(0.0, index * LAB_BIN_SIZE - offset - value,
+                        value - ((index + 1) * LAB_BIN_SIZE - offset)))
+            for index in range(low, high + 1)
+        ])
+    
+    return [
+        (l_index * AB_BINS + a_index) * AB_BINS + b_index
+        for (l_index, dl), (a_index, da), (b_index, db) in product(*axes)
+        if dl * dl + da * da + db * db <= radius * radius
+    ]
+
+
+def index_rows(file_hash: str, palette: str) -> List[Tuple[str, int, int, float, int]]:
+    """Build (file_hash, rank, rgb, weight, color_bin) index rows from a stored palette."""
+    rows = []
+    for rank, entry in enumerate(palette.split(',')):
+        color, weight = entry.split(':')
+        r, g, b = parse_color(color)
+        rows.append((file_hash, rank, (r << 16) | (g << 8) | b, float(weight),
+                     color_bin(rgb_to_lab(r, g, b))))
+    return rows
+
+
+def find_by_color(db, color: str, radius: float, min_weight: float, limit: int) -> List[Dict]:
+    """
+    Find assets whose palette has a colour within `radius` (CIE76 Delta E) of `color`.
+    
+    Returns:
+        Asset dictionaries with the matching 'color', its 'weight' in the image
+        and its 'distance', closest first (larger colour share breaking ties)
+    """
+    target = rgb_to_lab(*parse_color(color))
+    best: Dict[str, Tuple[float, float, int]] = {}
+    for file_hash, rgb, weight in db.get_color_candidates(bins_within(target, radius), min_weight):
+        lab = rgb_to_lab((rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF)
+        distance = math.dist(target, lab)
+        if distance <= radius and (file_hash not in best or (distance, -weight) < best[file_hash][:2]):
+            best[file_hash] = (distance, -weight, rgb)
+    
+    assets = db.get_assets_by_file_hashes(list(best))
+    for asset in assets:
+        distance, negative_weight, rgb = best[asset['file_hash']]
+        asset['color'] = f'#{rgb:06x}'
+        asset['weight'] = -negative_weight
+        asset['distance'] = round(distance, 2)
+    assets.sort(key=lambda asset: (asset['distance'], -asset['weight'], asset['name']))
+    return assets[:limit]
@@ -0,0 +1,546 @@
+"""
+Fast PDF page count and document info extraction.
+Reads the trailer and cross-reference data (classic tables or xref streams) and resolves only
+the objects needed for /Root -> /Pages /Count and /Info, instead of loading the page tree.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+# Bytes read from the end of the file to find startxref
+TAIL_BYTES = 4096
+
+# Furthest from the end startxref is searched for (some writers append junk)
+MAX_TAIL_BYTES = 1024 * 1024
+
+# Initial read size for an indirect object; doubled until the object parses
+OBJECT_READ_BYTES = 4096
+MAX_OBJECT_BYTES = 4 * 1024 * 1024
+
+# Longest /Prev chain followed (guards against loops in damaged files)
+MAX_XREF_SECTIONS = 64
+
+# Size of one classic cross-reference table entry
+XREF_ENTRY_BYTES = 20
+
+# Info dictionary keys returned, mapped to metadata keys
+INFO_KEYS = {'Title': 'title', 'Author': 'author', 'Subject': 'subject'}
+
+WHITESPACE = b'\x00\t\n\x0c\r '
+DELIMITERS = b'()<>[]{}/%'
+
+_HEADER_RE = re.compile(rb'%PDF-(\d\.\d)')
+_NUMBER_RE = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+
+
+class PdfError(Exception):
+    """The fast path cannot handle this file; the caller should fall back."""
+
+
+class Name(str):
+    """PDF name object (distinguished from strings, which are bytes)."""
+
+
+class Ref(NamedTuple):
+    """Indirect object reference."""
+    num: int
+    gen: int
+
+
+class Stream(NamedTuple):
+    """Stream object: its dictionary and absolute offset/length of the raw data."""
+    attrs: Dict[str, Any]
+    offset: int
+    length: int
+
+
+class _Lexer:
+    """Minimal PDF object parser over a byte buffer."""
+    
+    def __init__(self, data: bytes, pos: int = 0, complete: bool = False):
+        """
+        Args:
+            data: Buffer to parse
+            pos: Start offset
+            complete: The buffer holds all the data (the end of it is not a truncated read)
+        """
+        self.data = data
+        self.pos = pos
+        self.complete = complete
+    
+    def skip_whitespace(self):
+        data, n = self.data, len(self.data)
+        while self.pos < n:
+            c = data[self.pos]
+            if c in WHITESPACE:
+                self.pos += 1
+            elif c == 0x25:  # % comment runs to end of line
+                while self.pos < n and data[self.pos] not in b'\r\n':
+                    self.pos += 1
+            else:
+                return
+        raise IndexError('unexpected end of buffer')
+    
+    def token(self) -> bytes:
+        """Read a run of regular characters."""
+        self.skip_whitespace()
+        start = self.pos
+        data, n = self.data, len(self.data)
+        while self.pos < n and data[self.pos] not in WHITESPACE and data[self.pos] not in DELIMITERS:
+            self.pos += 1
+        if self.pos >= n:
+            raise IndexError('unexpected end of buffer')
+        return data[start:self.pos]
+    
+    def parse(self) -> Any:
+        """Parse one object: dict, array, name, string, number, bool, null or reference."""
+        self.skip_whitespace()
+        data = self.data
+        c = data[self.pos]
+        
+        if data.startswith(b'<<', self.pos):
+            self.pos += 2
+            result = {}
+            while True:
+                self.skip_whitespace()
+                if data.startswith(b'>>', self.pos):
+                    self.pos += 2
+                    return result
+                key = self.parse()
+                if not isinstance(key, Name):
+                    raise PdfError('dictionary key is not a name')
+                result[str(key)] = self.parse()
+        
+        if c == 0x5B:  # [
+            self.pos += 1
+            items = []
+            while True:
+                self.skip_whitespace()
+                if data[self.pos] == 0x5D:  # ]
+                    self.pos += 1
+                    return items
+                items.append(self.parse())
+        
+        if c == 0x2F:  # /
+            self.pos += 1
+            start = self.pos
+            n = len(data)
+            while self.pos < n and data[self.pos] not in WHITESPACE and data[self.pos] not in DELIMITERS:
+                self.pos += 1
+            raw = re.sub(rb'#([0-9A-Fa-f]{2})', lambda m: bytes([int(m.group(1), 16)]),
+                         data[start:self.pos])
+            return Name(raw.decode('latin-1'))
+        
+        if c == 0x28:  # (
+            return self._literal_string()
+        
+        if c == 0x3C:  # < hex string
+            end = data.find(b'>', self.pos)
+            if end < 0:
+                raise IndexError('unterminated hex string')
+            digits = re.sub(rb'[^0-9A-Fa-f]', b'', data[self.pos + 1:end])
+            self.pos = end + 1
+            if len(digits) % 2:
+                digits += b'0'
+            return bytes.fromhex(digits.decode('ascii'))
+        
+        word = self.token()
+        if word == b'true':
+            return True
+        if word == b'false':
+            return False
+        if word == b'null':
+            return None
+        if not _NUMBER_RE.fullmatch(word):
+            raise PdfError(f'unexpected token {word[:20]!r}')
+        if b'.' in word:
+            return float(word)
+        
+        number = int(word)
+        # "num gen R" is a reference
+        saved = self.pos
+        try:
+            gen = self.token()
+            if gen.isdigit() and self.token() == b'R':
+                return Ref(number, int(gen))
+        except IndexError:
+            # A truncated read may have cut a reference short
+            if not self.complete:
+                raise
+        self.pos = saved
+        return number
+    
+    def _literal_string(self) -> bytes:
+        data = self.data
+        self.pos += 1
+        depth = 1
+        out = bytearray()
+        escapes = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b',
+                   ord('f'): b'\f', ord('('): b'(', ord(')'): b')', ord('\\'): b'\\'}
+        while True:
+            c = data[self.pos]
+            self.pos += 1
+            if c == 0x5C:  # backslash
+                e = data[self.pos]
+                self.pos += 1
+                if e in escapes:
+                    out += escapes[e]
+                elif 0x30 <= e <= 0x37:
+                    digits = bytes([e])
+                    while len(digits) < 3 and 0x30 <= data[self.pos] <= 0x37:
+                        digits += bytes([data[self.pos]])
+                        self.pos += 1
+                    out.append(int(digits, 8) & 0xFF)
+                elif e == 0x0D:
+                    # Line continuation
+                    if data[self.pos] == 0x0A:
+                        self.pos += 1
+                elif e != 0x0A:
+                    out.append(e)
+            elif c == 0x28:
+                depth += 1
+                out.append(c)
+            elif c == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return bytes(out)
+                out.append(c)
+            else:
+                out.append(c)
+
+
+def _unpredict(data: bytes, columns: int, predictor: int) -> bytes:
+    """Undo PNG predictors (Predictor >= 10) on xref stream rows."""
+    if predictor < 10:
+        return data
+    row_size = columns + 1
+    previous = bytearray(columns)
+    out = bytearray()
+    for i in range(0, len(data) - columns, row_size):
+        kind = data[i]
+        row = bytearray(data[i + 1:i + row_size])
+        if kind == 2:
+            # Up, the predictor xref streams use in practice
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, previous))
+            out += row
+            previous = row
+            continue
+        for x in range(columns):
+            left = row[x - 1] if x else 0
+            up = previous[x]
+            if kind == 1:
+                row[x] = (row[x] + left) & 0xFF
+            elif kind == 3:
+                row[x] = (row[x] + ((left + up) >> 1)) & 0xFF
+            elif kind == 4:
+                upper_left = previous[x - 1] if x else 0
+                p = left + up - upper_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upper_left)
+                predicted = left if pa <= pb and pa <= pc else up if pb <= pc else upper_left
+                row[x] = (row[x] + predicted) & 0xFF
+        out += row
+        previous = row
+    return bytes(out)
+
+
+class PdfInfoReader:
+    """Resolves individual objects of a PDF through its cross-reference data."""
+    
+    def __init__(self, f):
+        """
+        Args:
+            f: PDF file opened in binary mode
+        """
+        self.f = f
+        self.bytes_read = 0
+        # Newest section first; each is ('table', subsections) or ('stream', entries)
+        self._sections: List[Tuple[str, Any]] = []
+        self._object_streams: Dict[int, Tuple[List[int], bytes, int]] = {}
+        self.trailer: Dict[str, Any] = {}
+        self._load_xref()
+    
+    def _read(self, offset: int, size: int) -> bytes:
+        self.f.seek(offset)
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        return data
+    
+    def _find_startxref(self) -> int:
+        self.f.seek(0, 2)
+        file_size = self.f.tell()
+        tail_size = TAIL_BYTES
+        while True:
+            start = max(0, file_size - tail_size)
+            tail = self._read(start, file_size - start)
+            index = tail.rfind(b'startxref')
+            if index >= 0:
+                return int(_Lexer(tail, index + len(b'startxref')).token())
+            if start == 0 or tail_size >= MAX_TAIL_BYTES:
+                raise PdfError('startxref not found')
+            tail_size *= 8
+    
+    def _load_xref(self):
+        offset: Optional[int] = self._find_startxref()
+        seen = set()
+        while offset is not None and len(self._sections) < MAX_XREF_SECTIONS:
+            if offset in seen:
+                break
+            seen.add(offset)
+            
+            head = self._read(offset, 16)
+            if head.lstrip(WHITESPACE).startswith(b'xref'):
+                trailer = self._load_xref_table(offset)
+            else:
+                trailer = self._load_xref_stream(offset)
+            
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            # Hybrid files keep the compressed-object entries in a separate stream
+            if isinstance(trailer.get('XRefStm'), int) and trailer['XRefStm'] not in seen:
+                seen.add(trailer['XRefStm'])
+                self._load_xref_stream(trailer['XRefStm'])
+            
+            prev = trailer.get('Prev')
+            offset = prev if isinstance(prev, int) else None
+    
+    def _load_xref_table(self, offset: int) -> Dict[str, Any]:
+        """Index a classic xref table (entries are read lazily) and parse its trailer."""
+        buffer = self._read(offset, OBJECT_READ_BYTES)
+        lexer = _Lexer(buffer)
+        lexer.token()  # 'xref'
+        subsections = []
+        while True:
+            word = lexer.token()
+            if word == b'trailer':
+                break
+            start, count = int(word), int(lexer.token())
+            # Entries begin after the EOL following the subsection header
+            while lexer.pos < len(buffer) and buffer[lexer.pos] in b' \r\n':
+                lexer.pos += 1
+            entries_offset = offset + lexer.pos
+            subsections.append((start, count, entries_offset))
+            
+            skip = count * XREF_ENTRY_BYTES
+            if lexer.pos + skip + 256 > len(buffer):
+                # Jump over the entries instead of reading them
+                offset = entries_offset + skip
+                buffer = self._read(offset, OBJECT_READ_BYTES)
+                lexer = _Lexer(buffer)
+            else:
+                lexer.pos += skip
+        
+        self._sections.append(('table', subsections))
+        trailer = self._parse_at(offset + lexer.pos)
+        if not isinstance(trailer, dict):
+            raise PdfError('bad trailer')
+        return trailer
+    
+    def _load_xref_stream(self, offset: int) -> Dict[str, Any]:
+        """Decode a cross-reference stream (PDF 1.5+) and return its dictionary."""
+        stream = self._parse_indirect(offset)
+        if not isinstance(stream, Stream) or stream.attrs.get('Type') != 'XRef':
+            raise PdfError('startxref does not point to a cross-reference section')
+        
+        attrs = stream.attrs
+        widths = attrs['W']
+        data = self._stream_data(stream)
+        row_size = sum(widths)
+        index = attrs.get('Index') or [0, attrs['Size']]
+        
+        entries: Dict[int, Tuple[int, int, int]] = {}
+        position = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            for num in range(first, first + count):
+                row = data[position:position + row_size]
+                position += row_size
+                if len(row) < row_size:
+                    break
+                fields = []
+                column = 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[column:column + width], 'big') if width else None)
+                    column += width
+                # A zero-width type field defaults to type 1
+                kind = 1 if fields[0] is None else fields[0]
+                entries[num] = (kind, fields[1] or 0, fields[2] or 0)
+        
+        self._sections.append(('stream', entries))
+        return attrs
+    
+    def _locate(self, num: int) -> Optional[Tuple[int, int, int]]:
+        """Find (type, field2, field3) of an object in the newest section listing it."""
+        for kind, section in self._sections:
+            if kind == 'stream':
+                if num in section:
+                    return section[num]
+                continue
+            for start, count, entries_offset in section:
+                if start <= num < start + count:
+                    entry = self._read(entries_offset + (num - start) * XREF_ENTRY_BYTES, XREF_ENTRY_BYTES)
+                    fields = entry.split()
+                    if len(fields) < 3:
+                        raise PdfError('malformed xref entry')
+                    if fields[2] == b'f':
+                        return (0, 0, 0)
+                    return (1, int(fields[0]), int(fields[1]))
+        return None
+    
+    def resolve(self, value: Any) -> Any:
+        """Dereference a Ref (objects that are missing or free resolve to None)."""
+        depth = 0
+        while isinstance(value, Ref):
+            depth += 1
+            if depth > 16:
+                raise PdfError('reference loop')
+            entry = self._locate(value.num)
+            if entry is None or entry[0] == 0:
+                return None
+            if entry[0] == 1:
+                value = self._parse_indirect(entry[1])
+            else:
+                value = self._from_object_stream(entry[1], entry[2])
+        return value
+    
+    def _parse_indirect(self, offset: int) -> Any:
+        """Parse 'num gen obj <object>' (and its stream, if any) at an offset."""
+        size = OBJECT_READ_BYTES
+        while True:
+            buffer = self._read(offset, size)
+            try:
+                lexer = _Lexer(buffer)
+                lexer.token()
+                lexer.token()
+                if lexer.token() != b'obj':
+                    raise PdfError('expected an indirect object')
+                value = lexer.parse()
+                if isinstance(value, dict):
+                    lexer.skip_whitespace()
+                    if buffer.startswith(b'stream', lexer.pos):
+                        position = lexer.pos + len(b'stream')
+                        if buffer[position:position + 2] == b'\r\n':
+                            position += 2
+                        elif buffer[position:position + 1] in (b'\n', b'\r'):
+                            position += 1
+                        length = self.resolve(value.get('Length'))
+                        if not isinstance(length, int):
+                            raise PdfError('stream without a usable /Length')
+                        return Stream(value, offset + position, length)
+                return value
+            except IndexError:
+                if size >= MAX_OBJECT_BYTES or len(buffer) < size:
+                    raise PdfError('object runs past the end of the file')
+                size *= 4
+    
+    def _parse_at(self, offset: int) -> Any:
+        """Parse a direct object at an offset."""
+        size = OBJECT_READ_BYTES
+        while True:
+            buffer = self._read(offset, size)
+            try:
+                return _Lexer(buffer).parse()
+            except IndexError:
+                if size >= MAX_OBJECT_BYTES or len(buffer) < size:
+                    raise PdfError('object runs past the end of the file')
+                size *= 4
+    
+    def _stream_data(self, stream: Stream) -> bytes:
+        """Read and decode a stream (FlateDecode only)."""
+        data = self._read(stream.offset, stream.length)
+        filters = stream.attrs.get('Filter')
+        if isinstance(filters, list):
+            if len(filters) > 1:
+                raise PdfError('chained stream filters')
+            filters = filters[0] if filters else None
+        if filters is None:
+            return data
+        if filters != 'FlateDecode':
+            raise PdfError(f'unsupported stream filter {filters}')
+        
+        data = zlib.decompress(data)
+        params = stream.attrs.get('DecodeParms') or {}
+        if isinstance(params, list):
+            params = params[0] or {}
+        return _unpredict(data, params.get('Columns', 1), params.get('Predictor', 1))
+    
+    def _from_object_stream(self, stream_num: int, index: int) -> Any:
+        """Get an object stored in a compressed object stream."""
+        if stream_num not in self._object_streams:
+            stream = self.resolve(Ref(stream_num, 0))
+            if not isinstance(stream, Stream):
+                raise PdfError('object stream missing')
+            data = self._stream_data(stream)
+            first = stream.attrs['First']
+            header = _Lexer(data[:first] + b' ', complete=True)
+            numbers = []
+            for _ in range(stream.attrs['N'] * 2):
+                numbers.append(int(header.token()))
+            self._object_streams[stream_num] = (numbers[1::2], data, first)
+        
+        offsets, data, first = self._object_streams[stream_num]
+        return _Lexer(data + b' ', first + offsets[index], complete=True).parse()
+
+
+def decode_text(value: Any) -> Optional[str]:
+    """Decode a PDF text string (UTF-16BE with BOM, UTF-8 with BOM, else PDFDocEncoding)."""
+    if not isinstance(value, bytes):
+        return None
+    if value.startswith(b'\xfe\xff'):
+        text = value[2:].decode('utf-16-be', errors='replace')
+    elif value.startswith(b'\xef\xbb\xbf'):
+        text = value[3:].decode('utf-8', errors='replace')
+    else:
+        # PDFDocEncoding matches Latin-1 for printable characters
+        text = value.decode('latin-1')
+    return text.strip('\x00').strip() or None
+
+
+def read_pdf_info(file_path: str) -> Dict[str, Any]:
+    """
+    Get the page count and document info of a PDF from its cross-reference data.
+    
+    Returns:
+        Dict with 'page_count', 'pdf_version', any of 'title'/'author'/'subject',
+        and 'bytes_read'
+    
+    Raises:
+        PdfError: If the fast path cannot handle the file (damaged xref,
+            encryption, unsupported filters); fall back to a full parser
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(1024)
+        match = _HEADER_RE.search(header)
+        if not match:
+            raise PdfError('missing %PDF header')
+        
+        try:
+            reader = PdfInfoReader(f)
+            if 'Encrypt' in reader.trailer:
+                raise PdfError('encrypted document')
+            
+            root = reader.resolve(reader.trailer.get('Root'))
+            pages = reader.resolve(root.get('Pages')) if isinstance(root, dict) else None
+            count = reader.resolve(pages.get('Count')) if isinstance(pages, dict) else None
+            if not isinstance(count, int) or count < 0:
+                raise PdfError('page count not found')
+            
+            info = {'page_count': count, 'pdf_version': match.group(1).decode('ascii')}
+            # The catalog /Version overrides the header for incrementally updated files
+            if isinstance(root.get('Version'), str):
+                info['pdf_version'] = root['Version']
+            
+            document_info = reader.resolve(reader.trailer.get('Info'))
+            if isinstance(document_info, dict):
+                for key, metadata_key in INFO_KEYS.items():
+                    text = decode_text(reader.resolve(document_info.get(key)))
+                    if text:
+                        info[metadata_key] = text
+            
+            info['bytes_read'] = len(header) + reader.bytes_read
+            return info
+        
+        except PdfError:
+            raise
+        except (IndexError, KeyError, ValueError, TypeError, AttributeError, zlib.error) as e:
+            raise PdfError(f'{type(e).__name__}: {e}')
@@ -0,0 +1,459 @@
+"""
+Header-only probes for image and video files.
+Reads dimensions and essential metadata from the first few KB of a file, without decoding it.
+"""
+
+import io
+import struct
+from typing import Dict, Optional, Callable, BinaryIO
+
+from services.exif import GPS_TAGS
+from services.file_reader import Consumer
+
+
+# Bytes read up front; enough for every image header except JPEG and TIFF, which are walked
+HEADER_BYTES = 32
+
+# Stop walking JPEG segments after this many bytes (corrupt or unusual files)
+MAX_JPEG_SCAN = 4 * 1024 * 1024
+
+# Head of the file an image probe gets within a read pass; enough for the frame
+# header of nearly every JPEG and the IFDs of most TIFFs
+PROBE_PASS_BYTES = 256 * 1024
+
+# TIFF/EXIF tags kept from IFD0 and the EXIF sub-IFD (the whitelist of services.exif)
+TIFF_TAGS = {
+    256: 'ImageWidth',
+    257: 'ImageLength',
+    270: 'ImageDescription',
+    271: 'Make',
+    272: 'Model',
+    274: 'Orientation',
+    305: 'Software',
+    306: 'DateTime',
+    315: 'Artist',
+    33432: 'Copyright',
+    33434: 'ExposureTime',
+    33437: 'FNumber',
+    34665: 'ExifOffset',
+    34853: 'GPSInfo',
+    34855: 'ISOSpeedRatings',
+    36867: 'DateTimeOriginal',
+    37385: 'Flash',
+    37386: 'FocalLength',
+    40962: 'PixelXDimension',
+    40963: 'PixelYDimension',
+    41989: 'FocalLengthIn35mmFilm',
+    42036: 'LensModel'
+}
+
+# TIFF field type -> (struct code, size)
+TIFF_TYPES = {
+    1: ('B', 1),   # BYTE
+    2: ('s', 1),   # ASCII
+    3: ('H', 2),   # SHORT
+    4: ('I', 4),   # LONG
+    5: ('II', 8),  # RATIONAL
+    9: ('i', 4),   # SLONG
+    10: ('ii', 8)  # SRATIONAL
+}
+
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Image modes as PIL reports them, so probed and decoded images store the same 'mode'
+PNG_MODES = {2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# ISO base media atoms that only contain other atoms
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+
+def parse_tiff(read: Callable[[int, int], bytes]) -> Optional[Dict]:
+    """
+    Parse the essential tags of a TIFF structure (TIFF files and JPEG EXIF).
+    
+    Args:
+        read: Callable returning `size` bytes at `offset` from the TIFF header
+    
+    Returns:
+        Dictionary of tag name -> value, or None if the header is invalid
+    """
+    header = read(0, 8)
+    if len(header) < 8:
+        return None
+    
+    if header[:2] == b'II':
+        order = '<'
+    elif header[:2] == b'MM':
+        order = '>'
+    else:
+        return None
+    
+    magic, ifd_offset = struct.unpack(order + 'HI', header[2:8])
+    if magic != 42:
+        return None
+    
+    tags = _parse_ifd(read, order, ifd_offset)
+    exif_offset = tags.pop('ExifOffset', None)
+    if isinstance(exif_offset, int):
+        for key, value in _parse_ifd(read, order, exif_offset).items():
+            tags.setdefault(key, value)
+    gps_offset = tags.pop('GPSInfo', None)
+    if isinstance(gps_offset, int):
+        tags['GPSInfo'] = _parse_ifd(read, order, gps_offset, GPS_TAGS)
+    return tags
+
+
+def _parse_ifd(read: Callable[[int, int], bytes], order: str, offset: int,
+               names: Dict[int, str] = TIFF_TAGS) -> Dict:
+    """Read the wanted tags (`names`) of one image file directory."""
+    tags = {}
+    count_bytes = read(offset, 2)
+    if len(count_bytes) < 2:
+        return tags
+    
+    (count,) = struct.unpack(order + 'H', count_bytes)
+    entries = read(offset + 2, count * 12)
+    
+    for i in range(len(entries) // 12):
+        tag, field_type, value_count = struct.unpack(order + 'HHI', entries[i * 12:i * 12 + 8])
+        name = names.get(tag)
+        if name is None or field_type not in TIFF_TYPES:
+            continue
+        
+        code, size = TIFF_TYPES[field_type]
+        total = size * value_count
+        raw = entries[i * 12 + 8:i * 12 + 12]
+        if total > 4:
+            (value_offset,) = struct.unpack(order + 'I', raw)
+            raw = read(value_offset, min(total, 1024))
+        
+        try:
+            if field_type == 2:
+                tags[name] = raw[:total].split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+            elif field_type in (5, 10):
+                # Several rationals for GPS coordinates (degrees, minutes, seconds)
+                values = tuple(numerator / denominator if denominator else 0 for numerator, denominator
+                               in struct.iter_unpack(order + code, raw[:size * value_count]))
+                tags[name] = values[0] if value_count == 1 else values
+            else:
+                tags[name] = struct.unpack(order + code, raw[:size])[0]
+        except (struct.error, IndexError):
+            continue
+    
+    return tags
+
+
+def _probe_png(header: bytes) -> Optional[Dict]:
+    if header[12:16] != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', header[16:26])
+    if color_type == 0:
+        mode = {1: '1', 16: 'I;16'}.get(bit_depth, 'L')
+    else:
+        mode = PNG_MODES.get(color_type)
+    return {'format': 'PNG', 'width': width, 'height': height, 'mode': mode,
+            'bit_depth': bit_depth, 'color_type': color_type}
+
+
+def _probe_gif(header: bytes) -> Optional[Dict]:
+    width, height = struct.unpack('<HH', header[6:10])
+    # PIL opens every GIF frame as a palette image
+    return {'format': 'GIF', 'width': width, 'height': height, 'mode': 'P'}
+
+
+def _probe_bmp(header: bytes, f: BinaryIO) -> Optional[Dict]:
+    (dib_size,) = struct.unpack('<I', header[14:18])
+    if dib_size == 12:
+        width, height, _, bits = struct.unpack('<HHHH', header[18:26])
+        colors, entry_size = 0, 3
+    else:
+        width, height, _, bits = struct.unpack('<iiHH', header[18:30])
+        f.seek(30)
+        compression, _, _, _, colors = struct.unpack('<IIiiI', f.read(20))
+        entry_size = 4
+    
+    if bits <= 8:
+        # Like PIL: a grey ramp palette is '1' or 'L', any other palette 'P'
+        colors = colors or 1 << bits
+        f.seek(14 + dib_size)
+        palette = f.read(colors * entry_size)
+        step = 255 // (colors - 1) if colors > 1 else 0
+        grey = len(palette) == colors * entry_size and all(
+            palette[i * entry_size:i * entry_size + 3] == bytes([i * step] * 3) for i in range(colors))
+        mode = ('1' if colors == 2 else 'L') if grey else 'P'
+    else:
+        mode = 'RGB'
+        if dib_size >= 56 and compression == 3:
+            # Bit fields with an alpha mask
+            f.seek(14 + 52)
+            if struct.unpack('<I', f.read(4))[0]:
+                mode = 'RGBA'
+    return {'format': 'BMP', 'width': width, 'height': abs(height), 'mode': mode}
+
+
+def _probe_webp(header: bytes) -> Optional[Dict]:
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        width, height = width & 0x3FFF, height & 0x3FFF
+        alpha = False
+    elif chunk == b'VP8L':
+        b0, b1, b2, b3 = header[21:25]
+        width = 1 + (b0 | (b1 & 0x3F) << 8)
+        height = 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+        alpha = bool(b3 & 0x10)
+    elif chunk == b'VP8X':
+        width = 1 + int.from_bytes(header[24:27], 'little')
+        height = 1 + int.from_bytes(header[27:30], 'little')
+        alpha = bool(header[20] & 0x10)
+    else:
+        return None
+    return {'format': 'WEBP', 'width': width, 'height': height, 'mode': 'RGBA' if alpha else 'RGB'}
+
+
+def _probe_tiff(f: BinaryIO) -> Optional[Dict]:
+    def read(offset: int, size: int) -> bytes:
+        f.seek(offset)
+        return f.read(size)
+    
+    tags = parse_tiff(read)
+    if not tags or 'ImageWidth' not in tags or 'ImageLength' not in tags:
+        return None
+    
+    result = {'format': 'TIFF', 'width': tags.pop('ImageWidth'), 'height': tags.pop('ImageLength')}
+    result['exif'] = tags
+    return result
+
+
+def _probe_jpeg(f: BinaryIO) -> Optional[Dict]:
+    """Walk JPEG segments up to the start-of-frame, reading EXIF from APP1 on the way."""
+    result = {'format': 'JPEG'}
+    f.seek(2)
+    
+    while f.tell() < MAX_JPEG_SCAN:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        
+        # Markers may be preceded by any number of 0xFF fill bytes
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # Standalone markers without a length
+        if marker in (0xD9, 0xDA):
+            return None  # End of image or scan data before any frame header
+        
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack('>H', length_bytes)
+        
+        if marker in JPEG_SOF_MARKERS:
+            precision, height, width, components = struct.unpack('>BHHB', f.read(6))
+            result.update({'width': width, 'height': height, 'components': components,
+                           'mode': JPEG_MODES.get(components)})
+            return result
+        
+        if marker == 0xE1 and 'exif' not in result:
+            segment = f.read(length - 2)
+            if segment[:6] == b'Exif\x00\x00':
+                tiff = segment[6:]
+                tags = parse_tiff(lambda offset, size: tiff[offset:offset + size])
+                if tags:
+                    result['exif'] = tags
+        else:
+            f.seek(length - 2, 1)
+    
+    return None
+
+
+def probe_image(file_path: str) -> Optional[Dict]:
+    """
+    Read image format, dimensions and EXIF essentials from the file header.
+    
+    Supports PNG, JPEG, GIF, BMP, WebP and TIFF.
+    
+    Returns:
+        Dictionary with 'format', 'width', 'height', the PIL 'mode' (not for
+        TIFF, whose mode takes more tags than are read) and, when present,
+        'exif'; None if the format is unsupported or the header is malformed
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return probe_image_stream(f)
+    
+    except OSError:
+        return None
+
+
+def probe_image_stream(f: BinaryIO) -> Optional[Dict]:
+    """Probe an image from a seekable binary stream positioned at its start (see probe_image)."""
+    try:
+        header = f.read(HEADER_BYTES)
+        
+        if header[:8] == b'\x89PNG\r\n\x1a\n':
+            return _probe_png(header)
+        if header[:3] == b'\xff\xd8\xff':
+            return _probe_jpeg(f)
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return _probe_gif(header)
+        if header[:2] == b'BM':
+            return _probe_bmp(header, f)
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return _probe_webp(header)
+        if header[:4] in (b'II*\x00', b'MM\x00*'):
+            return _probe_tiff(f)
+        return None
+    
+    except (OSError, struct.error, ValueError):
+        return None
+
+
+class ImageProbeConsumer(Consumer):
+    """
+    probe_image() as a consumer of a read pass, over the head of the file.
+    
+    The result is None when the header does not fit in that head (or the
+    format is unsupported); the caller then probes the file itself.
+    """
+    
+    name = 'image_probe'
+    limit = PROBE_PASS_BYTES
+    
+    def __init__(self):
+        super().__init__()
+        self._head = bytearray()
+    
+    def feed(self, block: memoryview):
+        self._head += block
+    
+    def finish(self, file_size: int) -> Optional[Dict]:
+        return probe_image_stream(io.BytesIO(bytes(self._head)))
+
+
+def _iter_atoms(f: BinaryIO, start: int, end: int):
+    """Yield (type, payload_offset, payload_size) for the atoms between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        
+        size, atom_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack('>Q', f.read(8))
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        
+        yield atom_type, offset + header_size, size - header_size
+        offset += size
+
+
+def _read_full_box(f: BinaryIO, offset: int, size: int, limit: int = 256) -> tuple[int, bytes]:
+    """Read the version byte and the body (after version/flags) of a full box."""
+    f.seek(offset)
+    data = f.read(min(size, limit))
+    return data[0], data[4:]
+
+
+def probe_mp4(file_path: str) -> Optional[Dict]:
+    """
+    Read video dimensions, duration, frame rate and frame count from MP4/MOV atoms.
+    
+    Only atom headers and the small moov/mvhd/tkhd/mdhd/stts boxes are read,
+    wherever the moov atom sits in the file.
+    
+    Returns:
+        Metadata dictionary, or None if no moov atom with a video track is found
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(0, 2)
+            file_size = f.tell()
+            
+            result: Dict = {}
+            tracks = []
+            
+            def walk(start: int, end: int, track: Optional[Dict]):
+                for atom_type, offset, size in _iter_atoms(f, start, end):
+                    if atom_type in MP4_CONTAINERS:
+                        if atom_type == b'trak':
+                            track = {}
+                            tracks.append(track)
+                        walk(offset, offset + size, track)
+                    elif atom_type == b'mvhd':
+                        version, body = _read_full_box(f, offset, size)
+                        if version == 1:
+                            timescale, duration = struct.unpack('>IQ', body[16:28])
+                        else:
+                            timescale, duration = struct.unpack('>II', body[8:16])
+                        if timescale:
+                            result['duration_seconds'] = duration / timescale
+                    elif track is None:
+                        continue
+                    elif atom_type == b'tkhd':
+                        version, body = _read_full_box(f, offset, size)
+                        dims = body[84:92] if version == 1 else body[72:80]
+                        width, height = struct.unpack('>II', dims)
+                        track['width'], track['height'] = width >> 16, height >> 16
+                    elif atom_type == b'hdlr':
+                        _, body = _read_full_box(f, offset, size)
+                        track['handler'] = body[4:8]
+                    elif atom_type == b'mdhd':
+                        version, body = _read_full_box(f, offset, size)
+                        if version == 1:
+                            timescale, duration = struct.unpack('>IQ', body[16:28])
+                        else:
+                            timescale, duration = struct.unpack('>II', body[8:16])
+                        track['timescale'], track['duration'] = timescale, duration
+                    elif atom_type == b'stsd':
+                        _, body = _read_full_box(f, offset, size)
+                        track['codec'] = body[8:12].decode('ascii', 'replace').strip()
+                    elif atom_type == b'stts':
+                        # Sum sample counts in bounded reads; usually a single entry
+                        _, body = _read_full_box(f, offset, 8)
+                        (entries,) = struct.unpack('>I', body[:4])
+                        frames = 0
+                        f.seek(offset + 8)
+                        remaining = entries
+                        while remaining:
+                            chunk = min(remaining, 4096)
+                            data = f.read(chunk * 8)
+                            frames += sum(struct.unpack('>' + 'II' * (len(data) // 8), data)[0::2])
+                            remaining -= chunk
+                        track['frame_count'] = frames
+            
+            walk(0, file_size, None)
+            
+            video = next((t for t in tracks if t.get('handler') == b'vide'), None)
+            if video is None:
+                return None
+            
+            result['width'] = video.get('width')
+            result['height'] = video.get('height')
+            if video.get('codec'):
+                result['codec'] = video['codec']
+            frame_count = video.get('frame_count', 0)
+            result['frame_count'] = frame_count
+            if video.get('timescale') and video.get('duration'):
+                track_seconds = video['duration'] / video['timescale']
+                result['fps'] = frame_count / track_seconds if track_seconds else 0
+                result.setdefault('duration_seconds', track_seconds)
+            return result
+    
+    except (OSError, struct.error, ValueError, IndexError):
+        return None
@@ -0,0 +1,269 @@
+"""
+Integrity scrub service for re-verifying stored content hashes.
+Walks hashed assets in id order under a bytes-per-hour budget, re-hashes each file whose
+mtime and size are unchanged, and flags any whose content no longer matches its hash.
+"""
+
+import sys
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+# Add the parent directory to the path so we can import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.database import db_manager
+from shared.config import config
+from services.file_reader import HashConsumer, read_once
+from services.governor import TokenBucket, governor
+
+
+# Seconds the scrub sleeps when no asset is due for verification
+IDLE_INTERVAL = 600.0
+
+# Scrub state (cursor and counters) is kept under this name in service_metrics
+SCRUB_STATE = 'scrub'
+
+
+class IntegrityScrubber:
+    """Service class for rolling re-verification of asset content hashes."""
+    
+    def __init__(self, batch_size: int = 100):
+        """
+        Initialize the integrity scrubber.
+        
+        Args:
+            batch_size: Assets fetched per keyset page (default: 100)
+        """
+        self.db = db_manager
+        self.config = config
+        self.batch_size = batch_size
+        self.is_running = False
+        self._stop = threading.Event()
+        self.budget = TokenBucket(self.config.integrity_scrub_bytes_per_hour / 3600)
+        
+        # Resume from the last asset id checked, across restarts
+        state = self.db.get_metrics_state(SCRUB_STATE) or {}
+        self.cursor = state.get('cursor', 0)
+        self.pass_started = state.get('pass_started')
+        self.stats = {'verified': 0, 'bytes': 0, 'mismatches': 0, 'unreadable': 0,
+                      'changed': 0, 'missing': 0, 'passes': 0}
+        for key, value in state.get('stats', {}).items():
+            self.stats[key] = value
+    
+    def start_scrub(self, continuous: bool = True) -> bool:
+        """
+        Start the integrity scrub.
+        
+        Args:
+            continuous: Keep scrubbing on a rolling schedule, or stop at the
+                end of the current pass
+        
+        Returns:
+            True if the scrub ran successfully
+        """
+        try:
+            self.is_running = True
+            self._stop.clear()
+            governor.lower_priority()
+            
+            if continuous:
+                print("Integrity scrub started.")
+            else:
+                print("Running one integrity scrub pass...")
+            
+            while self.is_running:
+                if self._run_batch():
+                    continue
+                if not continuous:
+                    break
+                self._stop.wait(IDLE_INTERVAL)
+            
+            self._save_state()
+            return True
+        
+        except KeyboardInterrupt:
+            print("\nIntegrity scrub interrupted by user.")
+            self._save_state()
+            return True
+        except Exception as e:
+            print(f"Error in integrity scrub: {e}")
+            self.is_running = False
+            return False
+    
+    def stop_scrub(self):
+        """Stop the integrity scrub; it resumes from the same asset next time."""
+        self.is_running = False
+        self._stop.set()
+        print("Integrity scrub stopped.")
+    
+    def _run_batch(self) -> int:
+        """
+        Verify the next page of due assets.
+        
+        Reaching the end of the table completes a pass and wraps the cursor
+        around; the next pass picks up whatever has fallen due since, so the
+        library is verified on a rolling schedule.
+        
+        Returns:
+            Number of assets checked (0 when the pass is over or nothing was due)
+        """
+        now = datetime.now().timestamp()
+        verified_before = now - self.config.integrity_scrub_interval_days * 86400
+        assets = self.db.get_assets_to_verify(self.cursor, verified_before, self.batch_size)
+        
+        if not assets:
+            if self.cursor:
+                self.stats['passes'] += 1
+                print(f"Integrity scrub pass completed ({self.stats['verified']} assets verified so far).")
+                self.cursor = 0
+                self.pass_started = None
+                self._save_state()
+            return 0
+        
+        if self.pass_started is None:
+            self.pass_started = now
+        
+        verifications: List[Tuple[int, str, float]] = []
+        changed = []
+        for asset in assets:
+            if not self.is_running:
+                break
+            outcome = self._verify(asset)
+            if outcome is None:
+                break
+            if outcome == 'changed':
+                changed.append(asset['id'])
+            elif outcome in ('ok', 'mismatch', 'unreadable'):
+                verifications.append((asset['id'], outcome, datetime.now().timestamp()))
+            self.cursor = asset['id']
+        
+        if verifications:
+            self.db.record_verifications(verifications)
+        if changed:
+            # Edited in place without the watcher noticing; the analyst re-hashes them
+            self.db.mark_assets_pending_by_id(changed)
+        self._save_state()
+        return len(assets)
+    
+    def _verify(self, asset: Dict) -> Optional[str]:
+        """
+        Re-hash one asset and compare with its stored hash.
+        
+        Returns:
+            'ok', 'mismatch', 'unreadable', 'changed' (the file was modified
+            since it was hashed, so a different hash is expected), 'missing',
+            or None if the scrub was stopped while waiting for budget
+        """
+        path = asset['path']
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Deleted files are the reconciler's business
+            self.stats['missing'] += 1
+            return 'missing'
+        except OSError as e:
+            print(f"Integrity scrub cannot stat {path}: {e}")
+            self.stats['unreadable'] += 1
+            return 'unreadable'
+        
+        if stat.st_mtime_ns != asset['hash_mtime_ns'] or stat.st_size != asset['file_size']:
+            self.stats['changed'] += 1
+            return 'changed'
+        
+        # The bytes-per-hour budget; a large file is paid for before it is read
+        if self._stop.wait(self.budget.reserve(stat.st_size)):
+            return None
+        
+        outcome = read_once(path, [HashConsumer('sha256')], throttle=governor.throttle)
+        self.stats['bytes'] += outcome['bytes_read']
+        if 'error' in outcome or 'sha256' not in outcome['results']:
+            print(f"Integrity scrub cannot read {path}: {outcome.get('error') or outcome['errors']}")
+            self.stats['unreadable'] += 1
+            return 'unreadable'
+        
+        try:
+            after = os.stat(path)
+        except OSError:
+            after = None
+        if after is None or (after.st_mtime_ns, after.st_size) != (stat.st_mtime_ns, stat.st_size):
+            # Written to while being read
+            self.stats['changed'] += 1
+            return 'changed'
+        
+        self.stats['verified'] += 1
+        if outcome['results']['sha256'] != asset['file_hash']:
+            print(f"Integrity mismatch: {path} (stored {asset['file_hash'][:16]}, "
+                  f"read {outcome['results']['sha256'][:16]}, mtime and size unchanged)")
+            self.stats['mismatches'] += 1
+            return 'mismatch'
+        return 'ok'
+    
+    def _save_state(self):
+        """Persist the cursor and counters so a restart resumes where this run stopped."""
+        self.db.save_metrics_state(SCRUB_STATE, {
+            'cursor': self.cursor,
+            'pass_started': self.pass_started,
+            'stats': self.stats
+        })
+    
+    def get_scrub_stats(self) -> Dict[str, Any]:
+        """Get scrub progress, budget and integrity counts."""
+        try:
+            interval = self.config.integrity_scrub_interval_days * 86400
+            integrity = self.db.get_integrity_stats(datetime.now().timestamp() - interval)
+            hashed = integrity.get('hashed') or 0
+            return {
+                'cursor': self.cursor,
+                'pass_started': self.pass_started,
+                'bytes_per_hour': self.config.integrity_scrub_bytes_per_hour,
+                'interval_days': self.config.integrity_scrub_interval_days,
+                'verified_within_interval': round(integrity.get('verified', 0) / hashed, 3) if hashed else None,
+                **integrity,
+                'counters': self.stats
+            }
+        
+        except Exception as e:
+            print(f"Error getting scrub stats: {e}")
+            return {}
+
+
+def main():
+    """Main function for command-line usage."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Integrity Scrub - Re-verify stored content hashes')
+    parser.add_argument('--once', action='store_true', help='Finish the current pass and exit')
+    parser.add_argument('--continuous', action='store_true', help='Scrub continuously on a rolling schedule')
+    parser.add_argument('--stats', action='store_true', help='Show scrub progress and integrity counts')
+    parser.add_argument('--failures', action='store_true', help='List assets with a hash mismatch or unreadable file')
+    
+    args = parser.parse_args()
+    
+    try:
+        scrubber = IntegrityScrubber()
+        
+        if args.stats:
+            print(json.dumps(scrubber.get_scrub_stats(), indent=2))
+        
+        elif args.failures:
+            print(json.dumps(scrubber.db.get_integrity_failures(), indent=2, default=str))
+        
+        elif args.once:
+            scrubber.start_scrub(continuous=False)
+        
+        elif args.continuous:
+            scrubber.start_scrub(continuous=True)
+        
+        else:
+            print("Please specify --once, --continuous, --stats or --failures")
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Perceptual hashing for near-duplicate images.
+A 64-bit difference hash (dHash) survives resizing and re-compression. Hashes are
+indexed as four 16-bit bands (multi-index hashing): two hashes within Hamming
+distance r share at least one band within r // 4 bits, so a query only looks at
+the rows matching a few band values instead of comparing every pair.
+"""
+
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from services.thumbnails import load_preview_image
+
+
+# The image is reduced to (DHASH_SIZE + 1) x DHASH_SIZE grey pixels: a 64-bit hash
+DHASH_SIZE = 8
+
+# Index bands per hash, and bits per band
+HASH_BANDS = 4
+BAND_BITS = 16
+
+# Bits a band may differ by during a query; radius is capped at HASH_BANDS * (this + 1) - 1
+MAX_BAND_RADIUS = 2
+MAX_RADIUS = HASH_BANDS * (MAX_BAND_RADIUS + 1) - 1
+
+# Longest edge the image is decoded at before hashing (JPEG draft mode scales while decoding)
+DECODE_SIZE = 64
+
+
+def dhash_image(img) -> int:
+    """Compute the difference hash of a PIL image: one bit per horizontally adjacent pixel pair."""
+    import numpy as np
+    from PIL import Image
+    
+    grey = img.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(grey, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def compute_perceptual_hash(file_path: str) -> Optional[Dict]:
+    """Analyze an image into its perceptual hash, stored as 16 hex digits."""
+    try:
+        img = load_preview_image(file_path, DECODE_SIZE)
+        if img is None:
+            return None
+        
+        with img:
+            return {'dhash': f'{dhash_image(img):016x}'}
+    
+    except ImportError:
+        return {'analysis_note': 'PIL/NumPy not available for perceptual hashing'}
+    except Exception as e:
+        print(f"Error hashing image {file_path}: {e}")
+        return None
+
+
+def hash_bands(value: int) -> List[int]:
+    """Split a 64-bit hash into its index bands, most significant first."""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * (HASH_BANDS - 1 - i))) & mask for i in range(HASH_BANDS)]
+
+
+def band_neighbours(band: int, radius: int) -> List[int]:
+    """Get every band value within `radius` bits of `band`, itself included."""
+    values = [band]
+    for distance in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), distance):
+            flipped = band
+            for position in positions:
+                flipped ^= 1 << position
+            values.append(flipped)
+    return values
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count the bits in which two hashes differ."""
+    return (a ^ b).bit_count()
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit hash into SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    """Inverse of to_signed64."""
+    return value + (1 << 64) if value < 0 else value
+
+
+def index_row(file_hash: str, dhash_hex: str) -> Tuple[str, int, int, int, int, int]:
+    """Build the (file_hash, dhash, band0..band3) row stored in the similarity index."""
+    value = int(dhash_hex, 16)
+    return (file_hash, to_signed64(value), *hash_bands(value))
+
+
+def find_similar(db, asset_id: int, radius: int) -> List[Dict]:
+    """
+    Find assets whose perceptual hash is within `radius` bits of an asset's.
+    
+    Returns:
+        Asset dictionaries with a 'distance', nearest first (exact copies at 0);
+        empty if the asset has no perceptual hash
+    """
+    radius = max(0, min(radius, MAX_RADIUS))
+    stored = db.get_image_hash(asset_id)
+    if stored is None:
+        return []
+    
+    target = from_signed64(stored)
+    band_radius = radius // HASH_BANDS
+    candidates = db.get_image_hash_candidates(
+        [band_neighbours(band, band_radius) for band in hash_bands(target)])
+    
+    matches = {}
+    for file_hash, value in candidates:
+        distance = hamming_distance(target, from_signed64(value))
+        if distance <= radius:
+            matches[file_hash] = distance
+    
+    assets = [asset for asset in db.get_assets_by_file_hashes(list(matches)) if asset['id'] != asset_id]
+    for asset in assets:
+        asset['distance'] = matches[asset['file_hash']]
+    assets.sort(key=lambda asset: (asset['distance'], asset['name']))
+    return assets
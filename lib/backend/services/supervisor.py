@@ -0,0 +1,298 @@
+"""
+Supervised worker processes for the asset analyst.
+Each task runs under a wall-clock deadline and a memory limit; a worker that hangs or
+crashes is killed and replaced without taking the rest of the pool down with it.
+"""
+
+import multiprocessing
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Longest the supervisor sleeps before re-checking deadlines
+SUPERVISOR_TICK = 0.5
+
+# Grace period for a terminated worker before it is killed outright
+KILL_GRACE_PERIOD = 2.0
+
+
+class WorkerError(Exception):
+    """A task did not complete because its worker process failed."""
+
+
+class AnalysisTimeout(WorkerError):
+    """A task exceeded its wall-clock limit and its worker was killed."""
+
+
+class WorkerCrashed(WorkerError):
+    """A worker process died (segfault, out of memory) while running a task."""
+
+
+class RemoteError(Exception):
+    """An exception raised by the task function inside a worker."""
+
+
+def _worker_main(conn: Connection, memory_limit_bytes: Optional[int]):
+    """Worker process loop: run (task_id, func, args) requests until told to stop."""
+    if memory_limit_bytes:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+        except (ImportError, ValueError, OSError):
+            # No address-space limit on this platform; the deadline still applies
+            pass
+    
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        
+        task_id, func, args = request
+        try:
+            reply = (task_id, True, func(*args))
+        except MemoryError:
+            reply = (task_id, False, 'MemoryError: memory limit exceeded')
+        except Exception as e:
+            reply = (task_id, False, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}")
+        
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Unpicklable result
+            conn.send((task_id, False, f"Could not return result: {e}"))
+
+
+class _Worker:
+    """One worker process and the task it is running."""
+    
+    def __init__(self, memory_limit_bytes: Optional[int], context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_bytes),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task: Optional[Tuple[int, Future]] = None
+        self.deadline = 0.0
+    
+    def stop(self, force: bool = False):
+        if force:
+            self.process.terminate()
+            self.process.join(KILL_GRACE_PERIOD)
+            if self.process.is_alive():
+                self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(KILL_GRACE_PERIOD)
+        self.conn.close()
+
+
+class SupervisedProcessPool:
+    """
+    Process pool in which every task has a deadline and every worker is expendable.
+    
+    Drop-in for ProcessPoolExecutor as far as the analyst is concerned: submit()
+    returns a concurrent.futures.Future. A task that overruns task_timeout fails
+    with AnalysisTimeout, one whose worker dies fails with WorkerCrashed; either
+    way the worker is replaced and the other tasks carry on.
+    """
+    
+    def __init__(self, max_workers: int, task_timeout: float,
+                 memory_limit_bytes: Optional[int] = None):
+        """
+        Args:
+            max_workers: Number of worker processes
+            task_timeout: Wall-clock seconds a single task may run
+            memory_limit_bytes: Address-space limit per worker (POSIX only; None for no limit)
+        """
+        self.max_workers = max(1, max_workers)
+        self.task_timeout = task_timeout
+        self.memory_limit_bytes = memory_limit_bytes
+        self.timeouts = 0
+        self.crashes = 0
+        self.replacements = 0
+        
+        self._context = multiprocessing.get_context()
+        self._queue: Deque[Tuple[int, Future, Callable, Tuple]] = deque()
+        self._lock = threading.Lock()
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._next_task_id = 0
+        self._shutdown = False
+        self._workers: List[_Worker] = []
+        self._supervisor: Optional[threading.Thread] = None
+    
+    def submit(self, func: Callable, *args) -> Future:
+        """Queue func(*args) for a worker process."""
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot submit after shutdown')
+            self._next_task_id += 1
+            self._queue.append((self._next_task_id, future, func, args))
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, daemon=True,
+                                                    name='analyst-supervisor')
+                self._supervisor.start()
+        self._wake()
+        return future
+    
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """Stop the pool, optionally cancelling queued tasks."""
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    future = self._queue.popleft()[1]
+                    # A task requeued after a failed send is already running
+                    if not future.cancel():
+                        future.set_exception(WorkerError('worker pool stopped'))
+        self._wake()
+        if wait and self._supervisor is not None:
+            self._supervisor.join()
+    
+    def get_stats(self) -> Dict:
+        """Get pool size and failure counters."""
+        return {
+            'workers': self.max_workers,
+            'task_timeout': self.task_timeout,
+            'memory_limit_bytes': self.memory_limit_bytes,
+            'timeouts': self.timeouts,
+            'crashes': self.crashes,
+            'replacements': self.replacements
+        }
+    
+    def _wake(self):
+        try:
+            self._wake_writer.send_bytes(b'')
+        except OSError:
+            pass
+    
+    def _supervise(self):
+        """Dispatch queued tasks, collect results and replace failed workers."""
+        try:
+            while True:
+                with self._lock:
+                    if self._shutdown and not self._queue and not any(w.task for w in self._workers):
+                        break
+                
+                self._dispatch()
+                busy = [w for w in self._workers if w.task]
+                timeout = SUPERVISOR_TICK
+                if busy:
+                    timeout = max(0.0, min(timeout, min(w.deadline for w in busy) - time.monotonic()))
+                
+                # Idle workers' sentinels too, so one killed between tasks is replaced
+                handles = [self._wake_reader] + [w.conn for w in busy] + [w.process.sentinel for w in self._workers]
+                ready = wait(handles, timeout)
+                
+                if self._wake_reader in ready:
+                    while self._wake_reader.poll():
+                        self._wake_reader.recv_bytes()
+                
+                for worker in [w for w in self._workers if not w.task and w.process.sentinel in ready]:
+                    self.crashes += 1
+                    self._discard(worker)
+                
+                now = time.monotonic()
+                for worker in busy:
+                    if worker.conn in ready:
+                        self._collect(worker)
+                    elif worker.process.sentinel in ready:
+                        worker.process.join(KILL_GRACE_PERIOD)
+                        self.crashes += 1
+                        self._fail(worker, WorkerCrashed(
+                            f'worker exited with code {worker.process.exitcode}'))
+                    elif now >= worker.deadline:
+                        self.timeouts += 1
+                        self._fail(worker, AnalysisTimeout(
+                            f'task exceeded {self.task_timeout:g}s'))
+        except Exception as e:
+            print(f"Analyst supervisor failed: {e}")
+        finally:
+            for worker in self._workers:
+                # Never leave a caller waiting on a task the supervisor gave up on
+                if worker.task and not worker.task[1].done():
+                    worker.task[1].set_exception(WorkerError('worker pool stopped'))
+                worker.stop(force=bool(worker.task))
+            self._workers = []
+            with self._lock:
+                self._shutdown = True
+                while self._queue:
+                    future = self._queue.popleft()[1]
+                    if future.running() or future.set_running_or_notify_cancel():
+                        future.set_exception(WorkerError('worker pool stopped'))
+    
+    def _dispatch(self):
+        """Hand queued tasks to idle workers, starting workers up to max_workers."""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                worker = next((w for w in self._workers if not w.task), None)
+                if worker is None:
+                    if len(self._workers) >= self.max_workers:
+                        return
+                    worker = _Worker(self.memory_limit_bytes, self._context)
+                    self._workers.append(worker)
+                task = self._queue.popleft()
+            
+            task_id, future, func, args = task
+            # A requeued task is already running
+            if not future.running() and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.conn.send((task_id, func, args))
+            except OSError:
+                # The worker died while idle: replace it and give the task to another
+                self.crashes += 1
+                self._discard(worker)
+                with self._lock:
+                    self._queue.appendleft(task)
+                continue
+            except Exception as e:
+                # Unpicklable task; the worker is fine
+                future.set_exception(e)
+                continue
+            worker.task = (task_id, future)
+            worker.deadline = time.monotonic() + self.task_timeout
+    
+    def _collect(self, worker: _Worker):
+        """Resolve the task of a worker that sent its reply."""
+        task_id, future = worker.task
+        try:
+            reply_id, ok, payload = worker.conn.recv()
+        except (EOFError, OSError):
+            self.crashes += 1
+            self._fail(worker, WorkerCrashed(f'worker exited with code {worker.process.exitcode}'))
+            return
+        
+        worker.task = None
+        if reply_id != task_id:
+            future.set_exception(WorkerError('worker replied to the wrong task'))
+        elif ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RemoteError(payload))
+    
+    def _fail(self, worker: _Worker, error: WorkerError):
+        """Fail a worker's task, then kill and replace the worker."""
+        _, future = worker.task
+        worker.task = None
+        future.set_exception(error)
+        self._discard(worker)
+    
+    def _discard(self, worker: _Worker):
+        """Kill a failed worker and drop it from the pool; _dispatch starts a replacement when needed."""
+        self._workers.remove(worker)
+        self.replacements += 1
+        worker.stop(force=True)
@@ -0,0 +1,269 @@
+"""
+Streaming text statistics for the asset analyst.
+Counts lines, words and characters chunk by chunk so memory stays bounded regardless of file size.
+"""
+
+import codecs
+from typing import Dict, Iterator, Optional, Tuple
+
+from services.file_reader import Consumer
+
+
+# Bytes decoded per chunk
+CHUNK_SIZE = 256 * 1024
+
+# Bytes inspected to guess the encoding
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Byte-order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+
+def detect_encoding(sample: bytes) -> Optional[str]:
+    """
+    Guess the text encoding of a file from a sample of its first bytes.
+    
+    Returns:
+        Codec name, or None if the sample looks like binary data
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    
+    if b'\x00' in sample:
+        return None
+    
+    try:
+        # Incremental decode so a multi-byte character cut off by the sample end is fine
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _normalize_newlines(text: str) -> str:
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class TextDecoder:
+    """Incremental decoder from raw blocks to text with universal newlines."""
+    
+    def __init__(self, encoding: str):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._carry_cr = False
+    
+    def decode(self, block: bytes) -> str:
+        """Decode the next block; may return an empty string."""
+        text = self._decoder.decode(block)
+        if self._carry_cr:
+            text = '\r' + text
+        # Hold back a trailing CR in case the next block starts with LF
+        self._carry_cr = text.endswith('\r')
+        if self._carry_cr:
+            text = text[:-1]
+        return _normalize_newlines(text)
+    
+    def flush(self, final: bool = True) -> str:
+        """
+        Get the text still held back at the end of the input.
+        
+        Args:
+            final: The input really ended; False when it was cut short, so an
+                incomplete trailing character is dropped instead of replaced
+        """
+        tail = self._decoder.decode(b'', final=True) if final else ''
+        if self._carry_cr:
+            tail = '\r' + tail
+            self._carry_cr = False
+        return _normalize_newlines(tail)
+
+
+def read_text_chunks(file_path: str, max_bytes: int, info: Dict,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream a text file as decoded chunks with universal newlines.
+    
+    Reading stops after max_bytes. `info` is filled with 'encoding',
+    'bytes_read' and 'partial' (True if the cap cut the file short).
+    
+    Raises:
+        ValueError: If the file looks like binary data
+    """
+    with open(file_path, 'rb') as f:
+        encoding = detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+        if encoding is None:
+            raise ValueError('file appears to be binary')
+        f.seek(0)
+        
+        info.update({'encoding': encoding, 'bytes_read': 0, 'partial': False})
+        decoder = TextDecoder(encoding)
+        
+        while info['bytes_read'] < max_bytes:
+            block = f.read(min(chunk_size, max_bytes - info['bytes_read']))
+            if not block:
+                break
+            info['bytes_read'] += len(block)
+            
+            text = decoder.decode(block)
+            if text:
+                yield text
+        
+        info['partial'] = info['bytes_read'] >= max_bytes and bool(f.read(1))
+        
+        tail = decoder.flush(final=not info['partial'])
+        if tail:
+            yield tail
+
+
+class TextStats:
+    """Line, word, character, blank-line and comment-line counters fed one chunk at a time."""
+    
+    def __init__(self, comment_prefixes: Tuple[str, ...] = ()):
+        """
+        Args:
+            comment_prefixes: Line prefixes (after indentation) counted as comments
+        """
+        self.comment_prefixes = comment_prefixes
+        self._prefix_length = max((len(p) for p in comment_prefixes), default=1)
+        self.char_count = 0
+        self.word_count = 0
+        self.line_count = 0
+        self.blank_line_count = 0
+        self.comment_line_count = 0
+        self._in_word = False
+        self._line_open = False
+        self._line_prefix = ''
+    
+    def feed(self, text: str):
+        """Add a decoded chunk of text (newlines already normalized to LF)."""
+        if not text:
+            return
+        
+        self.char_count += len(text)
+        
+        # A word split across chunks is counted once
+        self.word_count += len(text.split())
+        if self._in_word and not text[0].isspace():
+            self.word_count -= 1
+        self._in_word = not text[-1].isspace()
+        
+        segments = text.split('\n')
+        last = len(segments) - 1
+        for i, segment in enumerate(segments):
+            # Only the first few non-blank characters of a line are kept
+            if len(self._line_prefix) < self._prefix_length:
+                if not self._line_prefix:
+                    segment = segment.lstrip()
+                self._line_prefix += segment[:self._prefix_length - len(self._line_prefix)]
+            if i < last:
+                self._end_line()
+        
+        self._line_open = segments[-1] != '' or (last == 0 and self._line_open)
+    
+    def _end_line(self):
+        self.line_count += 1
+        if not self._line_prefix:
+            self.blank_line_count += 1
+        elif self.comment_prefixes and self._line_prefix.startswith(self.comment_prefixes):
+            self.comment_line_count += 1
+        self._line_prefix = ''
+        self._line_open = False
+    
+    def finish(self) -> Dict[str, int]:
+        """Close the last line and return the counts."""
+        if self._line_open:
+            self._end_line()
+        
+        result = {
+            'line_count': self.line_count,
+            'char_count': self.char_count,
+            'word_count': self.word_count,
+            'empty_line_count': self.blank_line_count
+        }
+        if self.comment_prefixes:
+            result['comment_line_count'] = self.comment_line_count
+        return result
+
+
+def analyze_text_stream(file_path: str, max_bytes: int,
+                        comment_prefixes: Tuple[str, ...] = ()) -> Dict:
+    """
+    Compute text statistics for a file in bounded memory.
+    
+    Returns:
+        Counts plus 'encoding', 'bytes_analyzed' and, when the byte cap was
+        hit, 'partial': True
+    """
+    info: Dict = {}
+    stats = TextStats(comment_prefixes)
+    for chunk in read_text_chunks(file_path, max_bytes, info):
+        stats.feed(chunk)
+    
+    result = stats.finish()
+    result['encoding'] = info['encoding']
+    result['bytes_analyzed'] = info['bytes_read']
+    if info['partial']:
+        result['partial'] = True
+    return result
+
+
+class TextStatsConsumer(Consumer):
+    """
+    Text statistics as a consumer of a read pass.
+    
+    The result matches analyze_text_stream(); finish() raises ValueError if
+    the file looks like binary data.
+    """
+    
+    name = 'text_stats'
+    
+    def __init__(self, max_bytes: int, comment_prefixes: Tuple[str, ...] = ()):
+        super().__init__()
+        self.limit = max_bytes
+        self._stats = TextStats(comment_prefixes)
+        self._decoder: Optional[TextDecoder] = None
+        self._encoding: Optional[str] = None
+        # Blocks held until there is enough to guess the encoding
+        self._sample = bytearray()
+        self._binary = False
+        self._bytes_read = 0
+    
+    def _start(self, sample: bytes):
+        self._encoding = detect_encoding(sample[:ENCODING_SAMPLE_SIZE])
+        if self._encoding is None:
+            self._binary = True
+            self.done = True
+            return
+        self._decoder = TextDecoder(self._encoding)
+        self._stats.feed(self._decoder.decode(sample))
+    
+    def feed(self, block: memoryview):
+        self._bytes_read += len(block)
+        if self._decoder is None:
+            self._sample += block
+            if len(self._sample) >= ENCODING_SAMPLE_SIZE:
+                self._start(bytes(self._sample))
+                self._sample = bytearray()
+            return
+        self._stats.feed(self._decoder.decode(block))
+    
+    def finish(self, file_size: int) -> Dict:
+        if self._decoder is None and not self._binary:
+            self._start(bytes(self._sample))
+        if self._binary:
+            raise ValueError('file appears to be binary')
+        
+        partial = self._bytes_read < file_size
+        self._stats.feed(self._decoder.flush(final=not partial))
+        result = self._stats.finish()
+        result['encoding'] = self._encoding
+        result['bytes_analyzed'] = self._bytes_read
+        if partial:
+            result['partial'] = True
+        return result
@@ -0,0 +1,282 @@
+"""
+Thumbnail generation and the content-addressed thumbnail cache.
+Previews are keyed by file hash, so duplicate files share one set of thumbnails.
+"""
+
+import io
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from shared.config import config
+from services.cad import extract_dwg_preview
+from services.disk_cache import EVICTION_TARGET_RATIO, remove_files
+
+
+# Image extensions PIL can thumbnail directly
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'}
+
+# Video extensions thumbnailed from a frame grabbed with OpenCV
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm'}
+
+# CAD extensions thumbnailed from the preview image embedded in the file
+CAD_PREVIEW_EXTENSIONS = {'.dwg'}
+
+
+def thumbnail_path(file_hash: str, size: int, extension: str = '.jpg') -> str:
+    """
+    Get the sharded cache path of a thumbnail.
+    
+    Thumbnails live under <thumbnail_directory>/<h[0:2]>/<h[2:4]>/<hash>_<size><ext>,
+    which keeps every directory small even with millions of previews.
+    """
+    return os.path.join(config.thumbnail_directory, file_hash[:2], file_hash[2:4],
+                        f"{file_hash}_{size}{extension}")
+
+
+def find_thumbnail(file_hash: str, size: int) -> Optional[str]:
+    """Get the path of an existing thumbnail in either output format."""
+    for extension in ('.jpg', '.png', '.bmp'):
+        path = thumbnail_path(file_hash, size, extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_preview_image(file_path: str, max_size: int):
+    """Open an image or a representative video frame as a PIL image, or None."""
+    from PIL import Image
+    
+    extension = Path(file_path).suffix.lower()
+    if extension in IMAGE_EXTENSIONS:
+        img = Image.open(file_path)
+        # Let the JPEG decoder downscale while decoding (DCT scaling)
+        img.draft('RGB', (max_size, max_size))
+        img.load()
+        return img
+    
+    if extension in VIDEO_EXTENSIONS:
+        import cv2
+        
+        cap = cv2.VideoCapture(file_path)
+        try:
+            if not cap.isOpened():
+                return None
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            # A frame a tenth of the way in is more representative than the first
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 10)
+            ok, frame = cap.read()
+            if not ok:
+                return None
+            return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        finally:
+            cap.release()
+    
+    if extension in CAD_PREVIEW_EXTENSIONS:
+        preview = extract_dwg_preview(file_path)
+        if preview is None:
+            return None
+        return Image.open(io.BytesIO(preview[1]))
+    
+    return None
+
+
+def _save_atomically(img, path: str) -> int:
+    """Save a PIL image via a temporary file and return its size in bytes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith('.png'):
+        img.save(tmp_path, 'PNG', optimize=True)
+    else:
+        img.save(tmp_path, 'JPEG', quality=85, optimize=True)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def _store_embedded_preview(file_path: str, file_hash: str,
+                            sizes: List[int]) -> List[Tuple[int, str, int]]:
+    """
+    Store a DWG's embedded preview as-is for each size, for when PIL is missing.
+    
+    Embedded previews are already thumbnail-sized, so they are used without scaling.
+    """
+    preview = extract_dwg_preview(file_path)
+    if preview is None:
+        return []
+    
+    kind, data = preview
+    files = []
+    for size in sizes:
+        path = thumbnail_path(file_hash, size, f'.{kind}')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        files.append((size, path, len(data)))
+    return files
+
+
+def generate_thumbnails(file_path: str, file_hash: Optional[str]) -> Optional[Dict]:
+    """
+    Generate every configured thumbnail size for a file.
+    
+    Existing thumbnails for the same hash are reused, so a duplicate costs no
+    decoding. Sizes are produced largest first, each downscaled from the last.
+    
+    Returns:
+        Metadata with 'thumbnail_sizes' and a 'files' list of (size, path, bytes)
+        for the cache index, or None if no thumbnail could be produced
+    """
+    if not file_hash:
+        return None
+    
+    try:
+        sizes = sorted(config.thumbnail_sizes, reverse=True)
+        files: List[Tuple[int, str, int]] = []
+        missing = []
+        for size in sizes:
+            existing = find_thumbnail(file_hash, size)
+            if existing:
+                files.append((size, existing, os.path.getsize(existing)))
+            else:
+                missing.append(size)
+        
+        if missing:
+            try:
+                img = load_preview_image(file_path, missing[0])
+            except ImportError:
+                if Path(file_path).suffix.lower() not in CAD_PREVIEW_EXTENSIONS:
+                    return {'analysis_note': 'PIL/OpenCV not available for thumbnails'}
+                # Embedded CAD previews can be stored without decoding
+                files.extend(_store_embedded_preview(file_path, file_hash, missing))
+            else:
+                if img is None:
+                    return None
+                
+                with img:
+                    has_alpha = img.mode in ('RGBA', 'LA') or 'transparency' in img.info
+                    img = img.convert('RGBA' if has_alpha else 'RGB')
+                    extension = '.png' if has_alpha else '.jpg'
+                    
+                    for size in missing:
+                        img.thumbnail((size, size))
+                        path = thumbnail_path(file_hash, size, extension)
+                        files.append((size, path, _save_atomically(img, path)))
+        
+        if not files:
+            return None
+        
+        return {
+            'thumbnail_sizes': ','.join(str(size) for size, _, _ in sorted(files)),
+            'files': files
+        }
+    
+    except Exception as e:
+        print(f"Error generating thumbnails for {file_path}: {e}")
+        return None
+
+
+class ThumbnailCache:
+    """On-disk thumbnail cache with a size budget and least-recently-used eviction."""
+    
+    def __init__(self, db, max_bytes: Optional[int] = None):
+        """
+        Args:
+            db: DatabaseManager holding the cache index
+            max_bytes: Disk budget for all thumbnails (default: config.thumbnail_cache_max_bytes)
+        """
+        self.db = db
+        self.max_bytes = max_bytes or config.thumbnail_cache_max_bytes
+    
+    def record(self, file_hash: str, files: List[Tuple[int, str, int]]):
+        """Add generated thumbnails to the cache index."""
+        now = time.time()
+        self.db.record_thumbnails([(file_hash, size, path, size_bytes, now)
+                                   for size, path, size_bytes in files])
+    
+    def get_paths(self, asset_ids: List[int], size: Optional[int] = None,
+                  generate_missing: bool = True) -> Dict[int, Optional[str]]:
+        """
+        Get thumbnail paths for a batch of assets in one lookup.
+        
+        Hits refresh their last-access time. Misses (never generated or
+        evicted) are regenerated on demand when generate_missing is set.
+        
+        Args:
+            asset_ids: Asset ids to look up
+            size: Thumbnail size; the smallest configured size that fits is used
+            generate_missing: Regenerate thumbnails that are not cached
+        
+        Returns:
+            Mapping of asset_id -> thumbnail path (None if unavailable)
+        """
+        size = self._resolve_size(size)
+        cached = self.db.get_thumbnails_for_assets(asset_ids, size)
+        
+        paths: Dict[int, Optional[str]] = {}
+        hits = set()
+        for asset_id in asset_ids:
+            entry = cached.get(asset_id)
+            if entry and entry['thumbnail_path'] and os.path.exists(entry['thumbnail_path']):
+                paths[asset_id] = entry['thumbnail_path']
+                hits.add((entry['file_hash'], size))
+                continue
+            
+            paths[asset_id] = None
+            if generate_missing and entry and entry['file_hash']:
+                result = generate_thumbnails(entry['path'], entry['file_hash'])
+                if result and result.get('files'):
+                    self.record(entry['file_hash'], result['files'])
+                    paths[asset_id] = next((path for s, path, _ in result['files'] if s == size), None)
+        
+        if hits:
+            self.db.touch_thumbnails(list(hits), time.time())
+        return paths
+    
+    def _resolve_size(self, size: Optional[int]) -> int:
+        sizes = sorted(config.thumbnail_sizes)
+        if size is None:
+            return sizes[0]
+        return next((s for s in sizes if s >= size), sizes[-1])
+    
+    def enforce_budget(self) -> int:
+        """
+        Evict least-recently-used thumbnails until the cache fits its budget.
+        
+        Returns:
+            Number of thumbnails evicted
+        """
+        total = self.db.get_thumbnail_cache_bytes()
+        if total <= self.max_bytes:
+            return 0
+        
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        evicted = 0
+        while total > target:
+            victims = self.db.get_least_recently_used_thumbnails(limit=500)
+            if not victims:
+                break
+            
+            removed, total = remove_files(
+                [(victim['path'], victim['bytes'], (victim['file_hash'], victim['size'])) for victim in victims],
+                total, target)
+            if not removed:
+                # Files that cannot be deleted; retrying would find the same ones
+                break
+            
+            self.db.delete_thumbnails(removed)
+            evicted += len(removed)
+        
+        print(f"Thumbnail cache over budget; evicted {evicted} thumbnails.")
+        return evicted
+    
+    def get_stats(self) -> Dict:
+        """Get cache size and budget."""
+        return {
+            'directory': config.thumbnail_directory,
+            'bytes': self.db.get_thumbnail_cache_bytes(),
+            'max_bytes': self.max_bytes,
+            'sizes': list(config.thumbnail_sizes)
+        }
@@ -38,6 +38,67 @@ class Config:
             Path.home() / "Pictures",
             Path.home() / "Downloads"
         ]
+        
+        # Concurrent library scans allowed on a single device
+        self._scan_workers_per_device = 1
+        
+        # Bytes of a text/code file analyzed before the result is marked partial
+        self._text_analysis_max_bytes = 64 * 1024 * 1024
+        
+        # Text of a document (bytes read, or characters extracted from a PDF) put in the content index
+        self._content_index_max_bytes = 4 * 1024 * 1024
+        
+        # Seconds between saves of the analyst's performance metrics
+        self._analysis_metrics_persist_interval = 60.0
+        
+        # Hamming radius (bits of 64) within which images count as near-duplicates
+        self._image_similarity_radius = 8
+        
+        # Colour search: CIE76 Delta E radius, and the least share of an image a colour must cover
+        self._color_search_radius = 15.0
+        self._color_search_min_weight = 0.05
+        
+        # Archive members: most listed per archive, and where members are extracted on demand
+        # (least recently used extractions are removed beyond the budget)
+        self._archive_max_members = 100_000
+        self._archive_extract_dir = self._base_dir / "archive_members"
+        self._archive_extract_max_bytes = 2 * 1024 * 1024 * 1024
+        
+        # Thumbnail cache
+        self._thumbnail_dir = self._base_dir / "thumbnails"
+        self._thumbnail_sizes = (128, 512)
+        self._thumbnail_cache_max_bytes = 1024 * 1024 * 1024
+        
+        # Background work governor: bytes and operations per second at full speed (0 for
+        # unlimited), nice level and ionice best-effort level (None leaves I/O priority alone),
+        # and the load average per CPU and interactive query latency above which it slows down
+        self._background_bytes_per_second = 64 * 1024 * 1024
+        self._background_ops_per_second = 500
+        self._background_nice = 10
+        self._background_io_priority = 7
+        self._background_load_threshold = 0.8
+        self._background_latency_threshold_ms = 250.0
+        
+        # Integrity scrub: bytes re-hashed per hour, and days before an asset is verified again
+        self._integrity_scrub_bytes_per_hour = 10 * 1024 * 1024 * 1024
+        self._integrity_scrub_interval_days = 30.0
+        
+        # Analysis results cached by content hash
+        self._analysis_cache_max_entries = 500_000
+        
+        # Analyzer supervision: per-task limits and retry policy
+        self._analysis_task_timeout = 300.0
+        self._analysis_memory_limit_mb = 2048
+        self._analysis_max_attempts = 3
+        self._analysis_retry_base_delay = 60.0
+        self._analysis_retry_max_delay = 24 * 60 * 60.0
+        
+        # Analysis queue priorities; waiting one hour is worth analysis_priority_aging_per_hour
+        self._analysis_priority_aging_per_hour = 1.0
+        self._analysis_priority_search_boost = 100.0
+        self._analysis_priority_focus_boost = 50.0
+        self._analysis_priority_small_file_boost = 10.0
+        self._analysis_small_file_bytes = 1024 * 1024
     
     @property
     def database_path(self) -> str:
@@ -49,6 +110,166 @@ class Config:
         """Get list of default library paths."""
         return [str(path) for path in self._default_libraries]
     
+    @property
+    def scan_workers_per_device(self) -> int:
+        """Get the number of concurrent library scans allowed per device."""
+        return self._scan_workers_per_device
+    
+    @property
+    def text_analysis_max_bytes(self) -> int:
+        """Get the byte cap for streaming text and code analysis."""
+        return self._text_analysis_max_bytes
+    
+    @property
+    def content_index_max_bytes(self) -> int:
+        """Get the per-file cap on text put in the full-text content index."""
+        return self._content_index_max_bytes
+    
+    @property
+    def analysis_metrics_persist_interval(self) -> float:
+        """Get the seconds between saves of the analyst's performance metrics."""
+        return self._analysis_metrics_persist_interval
+    
+    @property
+    def image_similarity_radius(self) -> int:
+        """Get the default perceptual-hash distance for near-duplicate image queries."""
+        return self._image_similarity_radius
+    
+    @property
+    def color_search_radius(self) -> float:
+        """Get the default colour distance (CIE76 Delta E) for colour search."""
+        return self._color_search_radius
+    
+    @property
+    def color_search_min_weight(self) -> float:
+        """Get the least share of an image a colour must cover to match a colour search."""
+        return self._color_search_min_weight
+    
+    @property
+    def archive_max_members(self) -> int:
+        """Get the most members listed and indexed per archive."""
+        return self._archive_max_members
+    
+    @property
+    def archive_extract_directory(self) -> str:
+        """Get the root directory archive members are extracted into when needed."""
+        return str(self._archive_extract_dir)
+    
+    @property
+    def archive_extract_max_bytes(self) -> int:
+        """Get the disk budget for extracted archive members."""
+        return self._archive_extract_max_bytes
+    
+    @property
+    def thumbnail_directory(self) -> str:
+        """Get the root directory of the thumbnail cache."""
+        return str(self._thumbnail_dir)
+    
+    @property
+    def thumbnail_sizes(self) -> tuple[int, ...]:
+        """Get the thumbnail sizes (longest edge, in pixels) generated per asset."""
+        return self._thumbnail_sizes
+    
+    @property
+    def thumbnail_cache_max_bytes(self) -> int:
+        """Get the disk budget of the thumbnail cache."""
+        return self._thumbnail_cache_max_bytes
+    
+    @property
+    def background_bytes_per_second(self) -> int:
+        """Get the bytes per second background work may read at full speed (0 for unlimited)."""
+        return self._background_bytes_per_second
+    
+    @property
+    def background_ops_per_second(self) -> int:
+        """Get the operations per second background work may do at full speed (0 for unlimited)."""
+        return self._background_ops_per_second
+    
+    @property
+    def background_nice(self) -> int:
+        """Get the nice level of background processes."""
+        return self._background_nice
+    
+    @property
+    def background_io_priority(self) -> Optional[int]:
+        """Get the ionice best-effort level (0-7) of background processes, or None to leave it."""
+        return self._background_io_priority
+    
+    @property
+    def background_load_threshold(self) -> Optional[float]:
+        """Get the 1-minute load average per CPU above which background work slows down."""
+        return self._background_load_threshold
+    
+    @property
+    def background_latency_threshold_ms(self) -> Optional[float]:
+        """Get the interactive query latency above which background work slows down."""
+        return self._background_latency_threshold_ms
+    
+    @property
+    def integrity_scrub_bytes_per_hour(self) -> int:
+        """Get the bytes the integrity scrub may re-hash per hour."""
+        return self._integrity_scrub_bytes_per_hour
+    
+    @property
+    def integrity_scrub_interval_days(self) -> float:
+        """Get the days after which a verified asset is due for verification again."""
+        return self._integrity_scrub_interval_days
+    
+    @property
+    def analysis_cache_max_entries(self) -> int:
+        """Get the number of cached analysis results kept before eviction."""
+        return self._analysis_cache_max_entries
+    
+    @property
+    def analysis_task_timeout(self) -> float:
+        """Get the wall-clock seconds one analyzer may spend on one asset."""
+        return self._analysis_task_timeout
+    
+    @property
+    def analysis_memory_limit_mb(self) -> int:
+        """Get the memory limit of each analyzer worker process (0 for none)."""
+        return self._analysis_memory_limit_mb
+    
+    @property
+    def analysis_max_attempts(self) -> int:
+        """Get the failed attempts after which an asset is quarantined as poison."""
+        return self._analysis_max_attempts
+    
+    @property
+    def analysis_retry_base_delay(self) -> float:
+        """Get the seconds before the first retry; each further retry doubles it."""
+        return self._analysis_retry_base_delay
+    
+    @property
+    def analysis_retry_max_delay(self) -> float:
+        """Get the longest delay between retries."""
+        return self._analysis_retry_max_delay
+    
+    @property
+    def analysis_priority_aging_per_hour(self) -> float:
+        """Get the priority a pending asset gains per hour of waiting, so nothing starves."""
+        return self._analysis_priority_aging_per_hour
+    
+    @property
+    def analysis_priority_search_boost(self) -> float:
+        """Get the priority of pending assets returned by a search."""
+        return self._analysis_priority_search_boost
+    
+    @property
+    def analysis_priority_focus_boost(self) -> float:
+        """Get the priority of pending assets in the library the user has open."""
+        return self._analysis_priority_focus_boost
+    
+    @property
+    def analysis_priority_small_file_boost(self) -> float:
+        """Get the starting priority of small files, which finish quickly."""
+        return self._analysis_priority_small_file_boost
+    
+    @property
+    def analysis_small_file_bytes(self) -> int:
+        """Get the size up to which a file counts as small for scheduling."""
+        return self._analysis_small_file_bytes
+    
     @property
     def platform(self) -> str:
         """Get the current platform."""
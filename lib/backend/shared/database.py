@@ -5,8 +5,10 @@ Provides centralized database operations with singleton pattern and comprehensiv
 
 import sqlite3
 import json
-import hashlib
 import os
+import threading
+import time
+import zlib
 from datetime import datetime
 from typing import List, Dict, Optional, Any, Tuple
 from contextlib import contextmanager
@@ -15,6 +17,15 @@ from pathlib import Path
 from .config import config
 
 
+# Row ids of content index chunks are document id * CONTENT_CHUNK_STRIDE + chunk number
+CONTENT_CHUNK_STRIDE = 1 << 16
+
+# The library the user has open is kept under this name in service_metrics, so every
+# process sees it; processes re-read it after FOCUS_CACHE_SECONDS
+FOCUS_STATE = 'focus'
+FOCUS_CACHE_SECONDS = 10.0
+
+
 class DatabaseManager:
     """Singleton database manager for centralized database operations."""
     
@@ -29,6 +40,12 @@ class DatabaseManager:
     def __init__(self):
         if not self._initialized:
             self._db_path = config.database_path
+            self._pending_work = threading.Event()
+            self._version_conn = None
+            self._version_lock = threading.Lock()
+            self._focus_library: Optional[str] = None
+            self._focus_checked_at = float('-inf')
+            self._content_index_available = False
             self._ensure_database_exists()
             self._initialized = True
     
@@ -50,7 +67,8 @@ class DatabaseManager:
         """Context manager for database connections with error handling."""
         conn = None
         try:
-            conn = sqlite3.connect(self._db_path)
+            # Generous timeout so concurrent scanners wait for the write lock
+            conn = sqlite3.connect(self._db_path, timeout=30)
             conn.row_factory = sqlite3.Row  # Enable column access by name
             yield conn
         except sqlite3.Error as e:
@@ -68,6 +86,9 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
+                # WAL lets readers proceed while concurrent scans write
+                cursor.execute('PRAGMA journal_mode=WAL')
+                
                 # Assets table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS assets (
@@ -111,6 +132,148 @@ class DatabaseManager:
                     )
                 ''')
                 
+                # Analyzer runs per asset, so only outdated analyzers are re-run
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS asset_analyses (
+                        asset_id INTEGER NOT NULL,
+                        analyzer TEXT NOT NULL,
+                        version INTEGER NOT NULL,
+                        file_mtime_ns INTEGER,
+                        file_size INTEGER,
+                        analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (asset_id, analyzer),
+                        FOREIGN KEY (asset_id) REFERENCES assets (id) ON DELETE CASCADE
+                    )
+                ''')
+                
+                # Columns added after the initial schema
+                self._ensure_column(cursor, 'asset_metadata', 'analyzer', 'TEXT')
+                # Nested values (EXIF and tag remainders) as zlib-compressed JSON, value NULL
+                self._ensure_column(cursor, 'asset_metadata', 'blob', 'BLOB')
+                # mtime of the file when file_hash was computed, to detect a stale hash
+                self._ensure_column(cursor, 'assets', 'hash_mtime_ns', 'INTEGER')
+                # Analysis retry state; assets failing too often get status 'poison'
+                self._ensure_column(cursor, 'assets', 'failure_count', 'INTEGER DEFAULT 0')
+                self._ensure_column(cursor, 'assets', 'retry_after', 'REAL')
+                self._ensure_column(cursor, 'assets', 'last_error', 'TEXT')
+                # Analysis priority (boosts); the claim order adds aging on top
+                self._ensure_column(cursor, 'assets', 'priority', 'REAL DEFAULT 0')
+                # Integrity scrub: when file_hash was last confirmed against the file, and
+                # 'ok', 'mismatch' (content changed without its mtime or size) or 'unreadable'
+                self._ensure_column(cursor, 'assets', 'last_verified_at', 'REAL')
+                self._ensure_column(cursor, 'assets', 'integrity_status', 'TEXT')
+                
+                # Content-addressed thumbnail cache index (LRU by last_access)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS thumbnails (
+                        file_hash TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        path TEXT NOT NULL,
+                        bytes INTEGER NOT NULL,
+                        last_access REAL NOT NULL,
+                        PRIMARY KEY (file_hash, size)
+                    )
+                ''')
+                
+                # Analysis results shared by identical files (LRU by last_used)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        file_hash TEXT NOT NULL,
+                        analyzer TEXT NOT NULL,
+                        version INTEGER NOT NULL,
+                        metadata TEXT NOT NULL,
+                        hit_count INTEGER NOT NULL DEFAULT 0,
+                        last_used REAL NOT NULL,
+                        PRIMARY KEY (file_hash, analyzer, version)
+                    )
+                ''')
+                
+                # Full-text content index: one document per file hash (duplicates share
+                # it), one FTS5 row per chunk of its text
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS content_documents (
+                        id INTEGER PRIMARY KEY,
+                        file_hash TEXT NOT NULL UNIQUE,
+                        chunk_count INTEGER NOT NULL,
+                        char_count INTEGER NOT NULL,
+                        bytes_read INTEGER NOT NULL,
+                        partial INTEGER NOT NULL DEFAULT 0,
+                        indexed_at REAL NOT NULL
+                    )
+                ''')
+                self._ensure_content_index(cursor)
+                
+                # Perceptual image hashes keyed by file hash, split into indexed bands
+                # for Hamming-radius queries (multi-index hashing)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS image_hashes (
+                        file_hash TEXT PRIMARY KEY,
+                        dhash INTEGER NOT NULL,
+                        band0 INTEGER NOT NULL,
+                        band1 INTEGER NOT NULL,
+                        band2 INTEGER NOT NULL,
+                        band3 INTEGER NOT NULL
+                    )
+                ''')
+                
+                # Image palettes: one row per dominant colour (packed RGB), with its
+                # share of the image and a coarse CIELAB bin for colour search
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS image_colors (
+                        file_hash TEXT NOT NULL,
+                        rank INTEGER NOT NULL,
+                        rgb INTEGER NOT NULL,
+                        weight REAL NOT NULL,
+                        color_bin INTEGER NOT NULL,
+                        PRIMARY KEY (file_hash, rank)
+                    )
+                ''')
+                
+                # Audio waveform summaries: one packed min/max peak blob per file hash
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS waveforms (
+                        file_hash TEXT PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                ''')
+                
+                # Archive members listed from the central directory / headers, keyed by the
+                # archive's file hash; searchable without extracting anything
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS archive_members (
+                        file_hash TEXT NOT NULL,
+                        member_index INTEGER NOT NULL,
+                        path TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        size INTEGER,
+                        compressed_size INTEGER,
+                        crc32 INTEGER,
+                        modified_at TEXT,
+                        PRIMARY KEY (file_hash, member_index)
+                    )
+                ''')
+                
+                # Persisted performance metrics (JSON state per component)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS service_metrics (
+                        name TEXT PRIMARY KEY,
+                        state TEXT NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                ''')
+                
+                # Directory mtime index for fast startup reconciliation
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS directory_index (
+                        path TEXT PRIMARY KEY,
+                        library_path TEXT NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        entry_count INTEGER NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
                 # Create indexes for better performance
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_path ON assets(path)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_category ON assets(category)')
@@ -118,6 +281,23 @@ class DatabaseManager:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_status ON assets(status)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_libraries_path ON libraries(path)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_asset_metadata_asset_id ON asset_metadata(asset_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_asset_metadata_key ON asset_metadata(key)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_directory_index_library ON directory_index(library_path)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_assets_file_hash ON assets(file_hash)')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_assets_integrity_failed
+                    ON assets(id) WHERE integrity_status IN ('mismatch', 'unreadable')
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_thumbnails_last_access ON thumbnails(last_access)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache(last_used)')
+                # Covering, so a colour search never touches the table itself
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_image_colors_bin
+                    ON image_colors(color_bin, weight, rgb, file_hash)
+                ''')
+                for band in range(4):
+                    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_image_hashes_band{band} ON image_hashes(band{band})')
+                self._ensure_claim_index(cursor)
                 
                 conn.commit()
                 print(f"Database initialized successfully at: {self._db_path}")
@@ -126,6 +306,47 @@ class DatabaseManager:
             print(f"Error initializing database: {e}")
             raise
     
+    def _claim_order(self) -> str:
+        """
+        SQL expression ordering pending assets for analysis (highest first).
+        
+        Effective priority is priority + aging * hours waited. The current time
+        adds the same amount to every row, so ordering by priority minus aging
+        times the queue time gives the same order and can be indexed.
+        """
+        aging_per_day = 24.0 * config.analysis_priority_aging_per_hour
+        return f'priority - {aging_per_day!r} * julianday(updated_at)'
+    
+    def _ensure_claim_index(self, cursor: sqlite3.Cursor):
+        """Create the pending-queue index, rebuilding it if the aging rate changed."""
+        sql = (f"CREATE INDEX idx_assets_claim ON assets(({self._claim_order()}) DESC) "
+               f"WHERE status = 'pending'")
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_assets_claim'")
+        row = cursor.fetchone()
+        if row and row[0] == sql:
+            return
+        if row:
+            cursor.execute('DROP INDEX idx_assets_claim')
+        cursor.execute(sql)
+    
+    @staticmethod
+    def _pack_metadata_value(value: Any) -> Tuple[Optional[str], Optional[bytes]]:
+        """Get the (value, blob) columns for a metadata value; dicts and lists are compressed."""
+        if isinstance(value, (dict, list)):
+            return None, zlib.compress(json.dumps(value, default=str).encode('utf-8'), 9)
+        return str(value), None
+    
+    @staticmethod
+    def _unpack_metadata_blob(blob: bytes) -> Any:
+        """Decode a compressed metadata value."""
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+    
+    def _ensure_column(self, cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+        """Add a column to an existing table if it is missing (schema migration)."""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    
     def add_asset(self, file_path: str, name: str, category: str = "Uncategorized", 
                   tags: List[str] = None, file_size: int = None) -> Optional[int]:
         """Add a new asset to the database."""
@@ -133,19 +354,21 @@ class DatabaseManager:
             tags = []
         
         try:
-            # Calculate file hash
-            file_hash = self._calculate_file_hash(file_path)
+            # Before opening the connection: the focus may be re-read from the database
+            priority = self._initial_priority(file_path, file_size)
             
+            # No hash yet: the analyst hashes new files in the same read pass as their analysis
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    INSERT INTO assets (name, path, category, tags, file_hash, file_size, status)
+                    INSERT INTO assets (name, path, category, tags, file_size, status, priority)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (name, file_path, category, json.dumps(tags), file_hash, file_size, 'pending'))
+                ''', (name, file_path, category, json.dumps(tags), file_size, 'pending', priority))
                 
                 asset_id = cursor.lastrowid
                 conn.commit()
+                self.notify_pending_work()
                 
                 print(f"Asset added: {name} (ID: {asset_id})")
                 return asset_id
@@ -190,15 +413,21 @@ class DatabaseManager:
                     SELECT id, name, path, category, tags, file_size, created_at
                     FROM assets 
                     WHERE search_term LIKE ?
+                       OR id IN (
+                           -- Keywords extracted by analyzers (e.g. CAD block and layer names)
+                           SELECT asset_id FROM asset_metadata
+                           WHERE key = 'search_keywords' AND value LIKE ?
+                       )
                     ORDER BY 
                         CASE 
                             WHEN name LIKE ? THEN 1
                             WHEN category LIKE ? THEN 2
-                            ELSE 3
+                            WHEN search_term LIKE ? THEN 3
+                            ELSE 4
                         END,
                         name
                     LIMIT ?
-                ''', (search_query, search_query, search_query, limit))
+                ''', (search_query, search_query, search_query, search_query, search_query, limit))
                 
                 results = []
                 for row in cursor.fetchall():
@@ -228,6 +457,8 @@ class DatabaseManager:
                     WHERE id = ?
                 ''', (status, asset_id))
                 conn.commit()
+                if status == 'pending':
+                    self.notify_pending_work()
                 return cursor.rowcount > 0
                 
         except Exception as e:
@@ -277,18 +508,19 @@ class DatabaseManager:
             return []
     
     def get_pending_assets(self, limit: int = 50) -> List[Dict]:
-        """Get assets with pending status for processing."""
+        """Get pending assets for processing, highest effective priority first."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT id, name, path, category, tags
-                    FROM assets 
+                cursor.execute(f'''
+                    SELECT id, name, path, category, tags, file_hash, file_size, hash_mtime_ns
+                    FROM assets INDEXED BY idx_assets_claim
                     WHERE status = 'pending'
-                    ORDER BY created_at
+                      AND (retry_after IS NULL OR retry_after <= ?)
+                    ORDER BY {self._claim_order()} DESC
                     LIMIT ?
-                ''', (limit,))
+                ''', (datetime.now().timestamp(), limit))
                 
                 results = []
                 for row in cursor.fetchall():
@@ -307,6 +539,55 @@ class DatabaseManager:
             print(f"Error getting pending assets: {e}")
             return []
     
+    def count_pending_assets(self) -> int:
+        """Count assets waiting for analysis."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) as count FROM assets WHERE status = 'pending'")
+                return cursor.fetchone()['count']
+                
+        except Exception as e:
+            print(f"Error counting pending assets: {e}")
+            return 0
+    
+    def notify_pending_work(self):
+        """Signal in-process waiters that new pending assets are available."""
+        self._pending_work.set()
+    
+    def clear_pending_work(self):
+        """Reset the pending-work signal before checking for work."""
+        self._pending_work.clear()
+    
+    def wait_for_pending_work(self, timeout: float) -> bool:
+        """
+        Block until pending work is signalled in this process.
+        
+        Returns:
+            True if signalled, False on timeout
+        """
+        return self._pending_work.wait(timeout)
+    
+    def get_data_version(self) -> Optional[int]:
+        """
+        Get SQLite's PRAGMA data_version for change detection.
+        
+        The value changes whenever another connection (including other
+        processes) commits, so polling it is a cheap way to notice writes
+        without querying any table. It is only comparable on the same
+        connection, hence the dedicated long-lived connection.
+        """
+        try:
+            with self._version_lock:
+                if self._version_conn is None:
+                    self._version_conn = sqlite3.connect(self._db_path, timeout=30,
+                                                         check_same_thread=False)
+                return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+                
+        except sqlite3.Error as e:
+            print(f"Error reading data version: {e}")
+            return None
+    
     def add_asset_metadata(self, asset_id: int, key: str, value: str) -> bool:
         """Add metadata to an asset."""
         try:
@@ -325,38 +606,1434 @@ class DatabaseManager:
             print(f"Error adding asset metadata: {e}")
             return False
     
-    def get_asset_metadata(self, asset_id: int) -> Dict[str, str]:
-        """Get all metadata for an asset."""
+    def save_analysis_results(self, results: List[Dict[str, Any]],
+                              cache_entries: Optional[List[Tuple[str, str, int, Dict]]] = None) -> bool:
+        """
+        Store a batch of analysis results in a single transaction.
+        
+        Args:
+            results: List of dicts with 'asset_id', 'status' and 'analyses'; each
+                analysis is a dict with 'analyzer', 'version', 'file_mtime_ns',
+                'file_size' and 'metadata' (which may be None)
+            cache_entries: (file_hash, analyzer, version, metadata) results to
+                add to the analysis cache
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                analyses = [(result['asset_id'], analysis)
+                            for result in results for analysis in result.get('analyses', [])]
+                
+                # Re-running an analyzer replaces its previous output
+                cursor.executemany('''
+                    DELETE FROM asset_metadata WHERE asset_id = ? AND analyzer = ?
+                ''', [(asset_id, analysis['analyzer']) for asset_id, analysis in analyses])
+                # Rows from before outputs were attributed to analyzers have no
+                # analyses recorded, so every analyzer re-runs and supersedes them
+                cursor.executemany('''
+                    DELETE FROM asset_metadata WHERE asset_id = ? AND analyzer IS NULL
+                ''', [(asset_id,) for asset_id in {asset_id for asset_id, _ in analyses}])
+                
+                cursor.executemany('''
+                    INSERT INTO asset_metadata (asset_id, key, value, blob, analyzer)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    (asset_id, key, *self._pack_metadata_value(value), analysis['analyzer'])
+                    for asset_id, analysis in analyses if analysis.get('metadata')
+                    for key, value in analysis['metadata'].items()
+                ])
+                
+                cursor.executemany('''
+                    INSERT INTO asset_analyses (asset_id, analyzer, version, file_mtime_ns, file_size, analyzed_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(asset_id, analyzer) DO UPDATE SET
+                        version = excluded.version,
+                        file_mtime_ns = excluded.file_mtime_ns,
+                        file_size = excluded.file_size,
+                        analyzed_at = CURRENT_TIMESTAMP
+                ''', [
+                    (asset_id, analysis['analyzer'], analysis['version'],
+                     analysis['file_mtime_ns'], analysis['file_size'])
+                    for asset_id, analysis in analyses
+                ])
+                
+                cursor.executemany('''
+                    UPDATE assets
+                    SET status = ?, failure_count = 0, retry_after = NULL, last_error = NULL,
+                        priority = 0, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', [(result['status'], result['asset_id'])
+                      for result in results if result['status'] != 'failed'])
+                
+                # Failed analyses retry with exponential backoff until quarantined
+                now = datetime.now().timestamp()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET failure_count = failure_count + 1,
+                        status = CASE WHEN failure_count + 1 >= ? THEN 'poison' ELSE 'pending' END,
+                        retry_after = ? + min(?, ? * (1 << failure_count)),
+                        last_error = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', [(config.analysis_max_attempts, now, config.analysis_retry_max_delay,
+                       config.analysis_retry_base_delay, result.get('error'), result['asset_id'])
+                      for result in results if result['status'] == 'failed'])
+                
+                if cache_entries:
+                    cursor.executemany('''
+                        INSERT INTO analysis_cache (file_hash, analyzer, version, metadata, last_used)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(file_hash, analyzer, version) DO UPDATE SET
+                            metadata = excluded.metadata,
+                            last_used = excluded.last_used
+                    ''', [(file_hash, analyzer, version, json.dumps(metadata, default=str), now)
+                          for file_hash, analyzer, version, metadata in cache_entries])
+                
+                conn.commit()
+                return True
+        
+        except Exception as e:
+            print(f"Error saving analysis results: {e}")
+            return False
+    
+    def get_asset_analyses(self, asset_ids: List[int]) -> Dict[int, Dict[str, Tuple[int, int, int]]]:
+        """
+        Get completed analyzer runs for a set of assets.
+        
+        Returns:
+            Mapping of asset_id -> analyzer -> (version, file_mtime_ns, file_size)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                analyses: Dict[int, Dict[str, Tuple[int, int, int]]] = {}
+                # Chunk to stay under SQLite's bound-parameter limit
+                for i in range(0, len(asset_ids), 500):
+                    chunk = asset_ids[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT asset_id, analyzer, version, file_mtime_ns, file_size
+                        FROM asset_analyses
+                        WHERE asset_id IN ({placeholders})
+                    ''', chunk)
+                    for row in cursor.fetchall():
+                        analyses.setdefault(row['asset_id'], {})[row['analyzer']] = (
+                            row['version'], row['file_mtime_ns'], row['file_size'])
+                
+                return analyses
+        
+        except Exception as e:
+            print(f"Error getting asset analyses: {e}")
+            return {}
+    
+    def get_poisoned_assets(self, limit: int = 100) -> List[Dict]:
+        """Get quarantined assets with their failure count and last error."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, name, path, failure_count, last_error, updated_at
+                    FROM assets
+                    WHERE status = 'poison'
+                    ORDER BY updated_at DESC
+                    LIMIT ?
+                ''', (limit,))
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Error getting poisoned assets: {e}")
+            return []
+    
+    def release_poisoned_assets(self) -> int:
+        """Give every quarantined asset a fresh set of analysis attempts."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE assets
+                    SET status = 'pending', failure_count = 0, retry_after = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'poison'
+                ''')
+                conn.commit()
+                self.notify_pending_work()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error releasing poisoned assets: {e}")
+            return 0
+    
+    def update_asset_hashes(self, rows: List[Tuple[int, Optional[str], int, int]]) -> bool:
+        """
+        Store re-computed content hashes.
+        
+        A fresh hash counts as verified now and clears any integrity flag,
+        since the file it flagged has since been changed.
+        
+        Args:
+            rows: (asset_id, file_hash, file_size, hash_mtime_ns) tuples
+        """
+        try:
+            verified_at = datetime.now().timestamp()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET file_hash = ?, file_size = ?, hash_mtime_ns = ?,
+                        last_verified_at = ?, integrity_status = ?
+                    WHERE id = ?
+                ''', [(file_hash, file_size, mtime_ns,
+                       verified_at if file_hash else None, 'ok' if file_hash else None, asset_id)
+                      for asset_id, file_hash, file_size, mtime_ns in rows])
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error updating asset hashes: {e}")
+            return False
+    
+    def get_assets_to_verify(self, after_id: int, verified_before: float, limit: int) -> List[Dict]:
+        """
+        Get hashed assets due for an integrity check, in id order after `after_id`.
+        
+        Keyset pagination on the primary key: each batch starts where the
+        last one ended, so a scrub resumes from a stored id without rescanning.
+        
+        Args:
+            after_id: Last asset id already visited
+            verified_before: Assets verified at or after this time are not due
+            limit: Maximum assets returned
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, name, path, file_hash, file_size, hash_mtime_ns, last_verified_at
+                    FROM assets
+                    WHERE id > ? AND file_hash IS NOT NULL
+                      AND (last_verified_at IS NULL OR last_verified_at < ?)
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, verified_before, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        
+        except Exception as e:
+            print(f"Error getting assets to verify: {e}")
+            return []
+    
+    def record_verifications(self, rows: List[Tuple[int, str, float]]) -> bool:
+        """
+        Store integrity check results.
+        
+        Args:
+            rows: (asset_id, integrity_status, verified_at) tuples
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET integrity_status = ?, last_verified_at = ?
+                    WHERE id = ?
+                ''', [(status, verified_at, asset_id) for asset_id, status, verified_at in rows])
+                conn.commit()
+                return True
+        
+        except Exception as e:
+            print(f"Error recording verifications: {e}")
+            return False
+    
+    def get_integrity_failures(self, limit: int = 100) -> List[Dict]:
+        """Get assets whose last integrity check found a hash mismatch or an unreadable file."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, name, path, file_hash, file_size, integrity_status, last_verified_at
+                    FROM assets
+                    WHERE integrity_status IN ('mismatch', 'unreadable')
+                    ORDER BY id
+                    LIMIT ?
+                ''', (limit,))
+                return [dict(row) for row in cursor.fetchall()]
+        
+        except Exception as e:
+            print(f"Error getting integrity failures: {e}")
+            return []
+    
+    def get_integrity_stats(self, verified_since: float) -> Dict[str, Any]:
+        """Get counts of hashed assets, those verified since a time, and integrity failures."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*) AS hashed,
+                           COALESCE(SUM(last_verified_at >= ?), 0) AS verified,
+                           COALESCE(SUM(integrity_status = 'mismatch'), 0) AS mismatches,
+                           COALESCE(SUM(integrity_status = 'unreadable'), 0) AS unreadable,
+                           MIN(last_verified_at) AS oldest_verification
+                    FROM assets
+                    WHERE file_hash IS NOT NULL
+                ''', (verified_since,))
+                return dict(cursor.fetchone())
+        
+        except Exception as e:
+            print(f"Error getting integrity stats: {e}")
+            return {}
+    
+    def get_cached_analyses(self, keys: List[Tuple[str, str, int]]) -> Dict[Tuple[str, str, int], Optional[Dict]]:
+        """
+        Look up cached analysis results.
+        
+        Args:
+            keys: (file_hash, analyzer, version) tuples
+            
+        Returns:
+            Mapping of key -> metadata for the keys found in the cache
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cached: Dict[Tuple[str, str, int], Optional[Dict]] = {}
+                # Three parameters per key; chunk to stay under the bound-parameter limit
+                for i in range(0, len(keys), 300):
+                    chunk = keys[i:i + 300]
+                    values = ','.join('(?, ?, ?)' for _ in chunk)
+                    cursor.execute(f'''
+                        SELECT file_hash, analyzer, version, metadata
+                        FROM analysis_cache
+                        WHERE (file_hash, analyzer, version) IN (VALUES {values})
+                    ''', [value for key in chunk for value in key])
+                    for row in cursor.fetchall():
+                        cached[(row['file_hash'], row['analyzer'], row['version'])] = json.loads(row['metadata'])
+                
+                return cached
+                
+        except Exception as e:
+            print(f"Error reading analysis cache: {e}")
+            return {}
+    
+    def touch_cached_analyses(self, keys: List[Tuple[str, str, int]], last_used: float):
+        """Refresh the last-use time and hit count of cached analysis results."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE analysis_cache
+                    SET last_used = ?, hit_count = hit_count + 1
+                    WHERE file_hash = ? AND analyzer = ? AND version = ?
+                ''', [(last_used,) + tuple(key) for key in keys])
+                conn.commit()
+                
+        except Exception as e:
+            print(f"Error touching analysis cache: {e}")
+    
+    def evict_analysis_cache(self, max_entries: int) -> int:
+        """
+        Delete least-recently-used analysis cache entries beyond max_entries.
+        
+        Returns:
+            Number of entries evicted
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*) AS count FROM analysis_cache')
+                excess = cursor.fetchone()['count'] - max_entries
+                if excess <= 0:
+                    return 0
+                
+                cursor.execute('''
+                    DELETE FROM analysis_cache
+                    WHERE rowid IN (
+                        SELECT rowid FROM analysis_cache ORDER BY last_used LIMIT ?
+                    )
+                ''', (excess,))
+                conn.commit()
+                return cursor.rowcount
                 
+        except Exception as e:
+            print(f"Error evicting analysis cache: {e}")
+            return 0
+    
+    def get_analysis_cache_stats(self) -> Dict[str, int]:
+        """Get the entry count and lifetime hit count (stored per entry) of the analysis cache."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT key, value 
+                    SELECT COUNT(*) AS entries, COALESCE(SUM(hit_count), 0) AS lifetime_hits
+                    FROM analysis_cache
+                ''')
+                return dict(cursor.fetchone())
+                
+        except Exception as e:
+            print(f"Error getting analysis cache stats: {e}")
+            return {'entries': 0, 'lifetime_hits': 0}
+    
+    def get_analyzed_assets(self) -> List[Dict]:
+        """Get id and path of every analyzed asset."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, path FROM assets WHERE status = 'analyzed'")
+                return [dict(row) for row in cursor.fetchall()]
+        
+        except Exception as e:
+            print(f"Error getting analyzed assets: {e}")
+            return []
+    
+    def get_analyzer_versions(self) -> Dict[int, Dict[str, int]]:
+        """Get the stored analyzer versions of every asset (asset_id -> analyzer -> version)."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT asset_id, analyzer, version FROM asset_analyses')
+                
+                versions: Dict[int, Dict[str, int]] = {}
+                for row in cursor.fetchall():
+                    versions.setdefault(row['asset_id'], {})[row['analyzer']] = row['version']
+                return versions
+        
+        except Exception as e:
+            print(f"Error getting analyzer versions: {e}")
+            return {}
+    
+    def mark_assets_pending_by_id(self, asset_ids: List[int]) -> int:
+        """Set assets back to pending status by id, in one batch."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', [(asset_id,) for asset_id in asset_ids])
+                conn.commit()
+                self.notify_pending_work()
+                return cursor.rowcount
+        
+        except Exception as e:
+            print(f"Error marking assets pending: {e}")
+            return 0
+    
+    def get_asset_metadata(self, asset_id: int, include_blobs: bool = False) -> Dict[str, Any]:
+        """
+        Get all metadata for an asset.
+        
+        Compressed values (the full EXIF and tag remainders) are left out
+        unless include_blobs is set, in which case they are decoded.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT key, value, blob
                     FROM asset_metadata 
-                    WHERE asset_id = ?
+                    WHERE asset_id = ?{'' if include_blobs else ' AND blob IS NULL'}
                 ''', (asset_id,))
                 
-                return {row['key']: row['value'] for row in cursor.fetchall()}
+                return {row['key']: self._unpack_metadata_blob(row['blob']) if row['blob'] is not None
+                        else row['value'] for row in cursor.fetchall()}
                 
         except Exception as e:
             print(f"Error getting asset metadata: {e}")
             return {}
     
-    def _calculate_file_hash(self, file_path: str) -> Optional[str]:
-        """Calculate SHA256 hash of a file."""
+    def get_uncompacted_metadata(self, keys: List[str], after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """
+        Get metadata rows of the given keys still stored as JSON text, in id order.
+        
+        Args:
+            keys: Metadata keys written as JSON text by older analyzers ('exif', 'tags')
+            after_id: Keyset cursor; rows with a larger id are returned
+            limit: Maximum rows returned
+        """
         try:
-            import hashlib
-            
-            hash_sha256 = hashlib.sha256()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            
-            return hash_sha256.hexdigest()
-            
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT id, asset_id, key, value, analyzer
+                    FROM asset_metadata
+                    WHERE id > ? AND blob IS NULL AND value IS NOT NULL
+                      AND key IN ({','.join('?' for _ in keys)})
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, *keys, limit))
+                
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Error getting uncompacted metadata: {e}")
+            return []
+    
+    def compact_metadata(self, rows: List[Tuple[int, int, Optional[str], Dict[str, Any], Any]]) -> bool:
+        """
+        Rewrite JSON-text metadata rows in a single transaction.
+        
+        Args:
+            rows: (row id, asset_id, analyzer, typed fields, remainder); typed
+                fields the asset does not have yet are added, the row keeps the
+                remainder compressed, or is deleted when there is none
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                    INSERT INTO asset_metadata (asset_id, key, value, analyzer)
+                    SELECT ?, ?, ?, ?
+                    WHERE NOT EXISTS (SELECT 1 FROM asset_metadata WHERE asset_id = ? AND key = ?)
+                ''', [(asset_id, key, str(value), analyzer, asset_id, key)
+                      for _, asset_id, analyzer, typed, _ in rows for key, value in typed.items()])
+                
+                cursor.executemany('''
+                    UPDATE asset_metadata SET value = NULL, blob = ? WHERE id = ?
+                ''', [(self._pack_metadata_value(remainder)[1], row_id)
+                      for row_id, _, _, _, remainder in rows if remainder])
+                cursor.executemany('''
+                    DELETE FROM asset_metadata WHERE id = ?
+                ''', [(row_id,) for row_id, _, _, _, remainder in rows if not remainder])
+                
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error compacting metadata: {e}")
+            return False
+    
+    def prune_analysis_cache(self, versions: Dict[str, int]) -> int:
+        """
+        Delete analysis cache entries of analyzers older than the given versions.
+        
+        Returns:
+            Number of entries deleted
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    DELETE FROM analysis_cache WHERE analyzer = ? AND version < ?
+                ''', list(versions.items()))
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error pruning analysis cache: {e}")
+            return 0
+    
+    def vacuum(self) -> bool:
+        """Rebuild the database file so space freed by deletions is returned to the filesystem."""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('VACUUM')
+                return True
+                
+        except Exception as e:
+            print(f"Error vacuuming database: {e}")
+            return False
+    
+    def get_database_size(self) -> int:
+        """Get the size of the database file in bytes."""
+        try:
+            return os.path.getsize(self._db_path)
+        except OSError:
+            return 0
+    
+    def get_directory_states(self, library_path: str) -> Dict[str, Tuple[int, int]]:
+        """Get stored (mtime_ns, entry_count) for every directory of a library."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT path, mtime_ns, entry_count
+                    FROM directory_index
+                    WHERE library_path = ?
+                ''', (library_path,))
+                
+                return {row['path']: (row['mtime_ns'], row['entry_count']) for row in cursor.fetchall()}
+                
+        except Exception as e:
+            print(f"Error getting directory states: {e}")
+            return {}
+    
+    def upsert_directory_states(self, library_path: str, states: List[Tuple[str, int, int]]) -> bool:
+        """Store (path, mtime_ns, entry_count) rows for directories of a library."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                    INSERT INTO directory_index (path, library_path, mtime_ns, entry_count, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(path) DO UPDATE SET
+                        library_path = excluded.library_path,
+                        mtime_ns = excluded.mtime_ns,
+                        entry_count = excluded.entry_count,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', [(path, library_path, mtime_ns, count) for path, mtime_ns, count in states])
+                
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error storing directory states: {e}")
+            return False
+    
+    def delete_directory_states(self, paths: List[str]) -> bool:
+        """Remove directories from the directory index."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM directory_index WHERE path = ?', [(p,) for p in paths])
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error deleting directory states: {e}")
+            return False
+    
+    def set_focus_library(self, library_path: Optional[str]):
+        """
+        Record the library the user has open and boost its pending assets.
+        
+        The focus is persisted, so assets the watcher and indexer processes add
+        under it later also start at the focus priority.
+        """
+        self._focus_library = library_path.rstrip(os.sep) + os.sep if library_path else None
+        self._focus_checked_at = time.monotonic()
+        self.save_metrics_state(FOCUS_STATE, {'library': self._focus_library})
+        if library_path:
+            self.boost_pending_assets_in_directory(library_path, config.analysis_priority_focus_boost)
+    
+    def _get_focus_library(self) -> Optional[str]:
+        """Get the focused library prefix, re-read from the database at most every FOCUS_CACHE_SECONDS."""
+        now = time.monotonic()
+        if now - self._focus_checked_at >= FOCUS_CACHE_SECONDS:
+            state = self.get_metrics_state(FOCUS_STATE) or {}
+            self._focus_library = state.get('library')
+            self._focus_checked_at = now
+        return self._focus_library
+    
+    def _initial_priority(self, file_path: str, file_size: Optional[int]) -> float:
+        """Get the starting analysis priority of a new asset."""
+        priority = 0.0
+        if file_size is not None and file_size <= config.analysis_small_file_bytes:
+            priority = config.analysis_priority_small_file_boost
+        focus_library = self._get_focus_library()
+        if focus_library and file_path.startswith(focus_library):
+            priority = max(priority, config.analysis_priority_focus_boost)
+        return priority
+    
+    def boost_pending_assets(self, asset_ids: List[int], priority: float) -> int:
+        """Raise pending assets to at least the given analysis priority."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET priority = ?
+                    WHERE id = ? AND status = 'pending' AND priority < ?
+                ''', [(priority, asset_id, priority) for asset_id in asset_ids])
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error boosting asset priority: {e}")
+            return 0
+    
+    def boost_pending_assets_in_directory(self, directory: str, priority: float) -> int:
+        """Raise pending assets anywhere below a directory to at least the given priority."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Range scan on the path index instead of LIKE
+                prefix = directory.rstrip(os.sep) + os.sep
+                cursor.execute('''
+                    UPDATE assets
+                    SET priority = ?
+                    WHERE path >= ? AND path < ? AND status = 'pending' AND priority < ?
+                ''', (priority, prefix, prefix + '\uffff', priority))
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error boosting asset priority: {e}")
+            return 0
+    
+    def get_asset_paths_in_directory(self, directory: str, recursive: bool = False) -> List[str]:
+        """Get paths of assets stored inside a directory (directly, or at any depth)."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Range scan on the path index instead of LIKE; direct children
+                # are those with no separator after the prefix
+                prefix = directory.rstrip(os.sep) + os.sep
+                cursor.execute('''
+                    SELECT path FROM assets
+                    WHERE path >= ? AND path < ?
+                      AND (? OR instr(substr(path, ?), ?) = 0)
+                ''', (prefix, prefix + '\uffff', recursive, len(prefix) + 1, os.sep))
+                
+                return [row['path'] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Error getting assets in directory: {e}")
+            return []
+    
+    def mark_assets_pending(self, paths: List[str]) -> int:
+        """Set assets back to pending status by file path, in one batch."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE assets
+                    SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+                    WHERE path = ?
+                ''', [(p,) for p in paths])
+                conn.commit()
+                self.notify_pending_work()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error marking assets pending: {e}")
+            return 0
+    
+    def delete_assets_by_paths(self, paths: List[str]) -> int:
+        """
+        Delete assets (and their metadata) by file path.
+        
+        Returns:
+            Number of assets deleted; paths that were never indexed do not count
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                    DELETE FROM asset_metadata
+                    WHERE asset_id IN (SELECT id FROM assets WHERE path = ?)
+                ''', [(p,) for p in paths])
+                cursor.executemany('''
+                    DELETE FROM asset_analyses
+                    WHERE asset_id IN (SELECT id FROM assets WHERE path = ?)
+                ''', [(p,) for p in paths])
+                cursor.executemany('DELETE FROM assets WHERE path = ?', [(p,) for p in paths])
+                deleted = cursor.rowcount
+                
+                conn.commit()
+                return deleted
+                
+        except Exception as e:
+            print(f"Error deleting assets: {e}")
+            return 0
+    
+    def record_thumbnails(self, rows: List[Tuple[str, int, str, int, float]]) -> bool:
+        """Store (file_hash, size, path, bytes, last_access) rows in the thumbnail index."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO thumbnails (file_hash, size, path, bytes, last_access)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(file_hash, size) DO UPDATE SET
+                        path = excluded.path,
+                        bytes = excluded.bytes,
+                        last_access = excluded.last_access
+                ''', rows)
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error recording thumbnails: {e}")
+            return False
+    
+    def get_thumbnails_for_assets(self, asset_ids: List[int], size: int) -> Dict[int, Dict]:
+        """Get path, file_hash and cached thumbnail path of assets, keyed by asset id."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                entries: Dict[int, Dict] = {}
+                # Chunk to stay under SQLite's bound-parameter limit
+                for i in range(0, len(asset_ids), 500):
+                    chunk = asset_ids[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT a.id, a.path, a.file_hash, t.path AS thumbnail_path
+                        FROM assets a
+                        LEFT JOIN thumbnails t ON t.file_hash = a.file_hash AND t.size = ?
+                        WHERE a.id IN ({placeholders})
+                    ''', [size] + chunk)
+                    for row in cursor.fetchall():
+                        entries[row['id']] = dict(row)
+                
+                return entries
+                
+        except Exception as e:
+            print(f"Error getting thumbnails: {e}")
+            return {}
+    
+    def touch_thumbnails(self, keys: List[Tuple[str, int]], last_access: float) -> bool:
+        """Refresh the last-access time of (file_hash, size) thumbnails."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE thumbnails SET last_access = ?
+                    WHERE file_hash = ? AND size = ?
+                ''', [(last_access, file_hash, size) for file_hash, size in keys])
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error touching thumbnails: {e}")
+            return False
+    
+    def get_thumbnail_cache_bytes(self) -> int:
+        """Get the total size of all cached thumbnails."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COALESCE(SUM(bytes), 0) as total FROM thumbnails')
+                return cursor.fetchone()['total']
+                
+        except Exception as e:
+            print(f"Error getting thumbnail cache size: {e}")
+            return 0
+    
+    def get_least_recently_used_thumbnails(self, limit: int = 500) -> List[Dict]:
+        """Get the least recently accessed thumbnails, oldest first."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT file_hash, size, path, bytes
+                    FROM thumbnails
+                    ORDER BY last_access
+                    LIMIT ?
+                ''', (limit,))
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Error getting least recently used thumbnails: {e}")
+            return []
+    
+    def delete_thumbnails(self, keys: List[Tuple[str, int]]) -> bool:
+        """Remove (file_hash, size) thumbnails from the index."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM thumbnails WHERE file_hash = ? AND size = ?', keys)
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error deleting thumbnails: {e}")
+            return False
+    
+    def _ensure_content_index(self, cursor: sqlite3.Cursor):
+        """Create the FTS5 chunk table, or disable content search if SQLite lacks FTS5."""
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS content_chunks
+                USING fts5(body, tokenize = 'unicode61 remove_diacritics 2')
+            ''')
+            self._content_index_available = True
+        except sqlite3.OperationalError as e:
+            print(f"Content index disabled (SQLite built without FTS5): {e}")
+            self._content_index_available = False
+    
+    @staticmethod
+    def _content_match_query(query: str) -> str:
+        """
+        Turn free text into an FTS5 query: every word must appear.
+        
+        Words are quoted so punctuation in them is not read as query syntax;
+        a trailing * keeps its prefix-match meaning.
+        """
+        terms = []
+        for word in query.split():
+            prefix = word.endswith('*') and len(word) > 1
+            word = word.rstrip('*') if prefix else word
+            terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+        return ' '.join(terms)
+    
+    def save_content_documents(self, documents: List[Tuple[str, Dict]]) -> bool:
+        """
+        Replace the indexed text of (file_hash, content) documents.
+        
+        Args:
+            documents: file_hash and the content extracted for it, a dict with
+                'chunks', 'chars', 'bytes_read' and 'partial'
+        """
+        if not documents or not self._content_index_available:
+            return True
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                now = datetime.now().timestamp()
+                
+                for file_hash, content in documents:
+                    chunks = content['chunks'][:CONTENT_CHUNK_STRIDE]
+                    cursor.execute('SELECT id FROM content_documents WHERE file_hash = ?', (file_hash,))
+                    row = cursor.fetchone()
+                    if row:
+                        document_id = row['id']
+                        cursor.execute('DELETE FROM content_chunks WHERE rowid >= ? AND rowid < ?',
+                                       (document_id * CONTENT_CHUNK_STRIDE,
+                                        (document_id + 1) * CONTENT_CHUNK_STRIDE))
+                        cursor.execute('''
+                            UPDATE content_documents
+                            SET chunk_count = ?, char_count = ?, bytes_read = ?, partial = ?, indexed_at = ?
+                            WHERE id = ?
+                        ''', (len(chunks), content['chars'], content['bytes_read'],
+                              int(content['partial']), now, document_id))
+                    else:
+                        cursor.execute('''
+                            INSERT INTO content_documents
+                                (file_hash, chunk_count, char_count, bytes_read, partial, indexed_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        ''', (file_hash, len(chunks), content['chars'], content['bytes_read'],
+                              int(content['partial']), now))
+                        document_id = cursor.lastrowid
+                    
+                    # Chunk rowids are contiguous per document, so replacing or pruning
+                    # a document is a rowid range delete
+                    base = document_id * CONTENT_CHUNK_STRIDE
+                    cursor.executemany('INSERT INTO content_chunks (rowid, body) VALUES (?, ?)',
+                                       [(base + i, chunk) for i, chunk in enumerate(chunks)])
+                
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving content index documents: {e}")
+            return False
+    
+    def prune_content_index(self) -> int:
+        """Drop indexed documents whose file hash no longer belongs to any asset."""
+        if not self._content_index_available:
+            return 0
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id FROM content_documents d
+                    WHERE NOT EXISTS (SELECT 1 FROM assets a WHERE a.file_hash = d.file_hash)
+                ''')
+                orphans = [row['id'] for row in cursor.fetchall()]
+                
+                cursor.executemany('DELETE FROM content_chunks WHERE rowid >= ? AND rowid < ?',
+                                   [(document_id * CONTENT_CHUNK_STRIDE,
+                                     (document_id + 1) * CONTENT_CHUNK_STRIDE)
+                                    for document_id in orphans])
+                cursor.executemany('DELETE FROM content_documents WHERE id = ?',
+                                   [(document_id,) for document_id in orphans])
+                conn.commit()
+                return len(orphans)
+                
+        except Exception as e:
+            print(f"Error pruning content index: {e}")
+            return 0
+    
+    def search_content(self, query: str, limit: int = 50, snippet_tokens: int = 16,
+                       highlight: Tuple[str, str] = ('[', ']')) -> List[Dict]:
+        """
+        Search the text of documents, best match first.
+        
+        Each asset appears once, with a snippet of its best-matching chunk
+        (matched words wrapped in `highlight`) and the chunk number.
+        """
+        if not self._content_index_available:
+            return []
+        match = self._content_match_query(query)
+        if not match:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Several chunks of one document may match; over-fetch, then keep
+                # the best chunk per asset
+                cursor.execute(f'''
+                    WITH hits AS (
+                        SELECT rowid AS chunk_id, rank,
+                               snippet(content_chunks, 0, ?, ?, '...', ?) AS snippet
+                        FROM content_chunks
+                        WHERE content_chunks MATCH ?
+                        ORDER BY rank
+                        LIMIT ?
+                    )
+                    SELECT a.id, a.name, a.path, a.category, a.tags, a.file_size, a.created_at,
+                           h.snippet, h.rank, h.chunk_id % {CONTENT_CHUNK_STRIDE} AS chunk
+                    FROM hits h
+                    JOIN content_documents d ON d.id = h.chunk_id / {CONTENT_CHUNK_STRIDE}
+                    JOIN assets a ON a.file_hash = d.file_hash
+                    ORDER BY h.rank
+                ''', (highlight[0], highlight[1], snippet_tokens, match, limit * 5))
+                
+                results = []
+                seen = set()
+                for row in cursor.fetchall():
+                    if row['id'] in seen:
+                        continue
+                    seen.add(row['id'])
+                    asset = dict(row)
+                    try:
+                        asset['tags'] = json.loads(asset['tags'])
+                    except (json.JSONDecodeError, TypeError):
+                        asset['tags'] = []
+                    results.append(asset)
+                    if len(results) >= limit:
+                        break
+                
+                return results
+                
+        except Exception as e:
+            print(f"Error searching content: {e}")
+            return []
+    
+    def get_content_index_stats(self) -> Dict[str, Any]:
+        """Get the size of the content index: documents, chunks, text and bytes on disk."""
+        if not self._content_index_available:
+            return {'available': False}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*) AS documents,
+                           COALESCE(SUM(chunk_count), 0) AS chunks,
+                           COALESCE(SUM(char_count), 0) AS chars,
+                           COALESCE(SUM(bytes_read), 0) AS bytes_read,
+                           COALESCE(SUM(partial), 0) AS partial_documents
+                    FROM content_documents
+                ''')
+                stats = dict(cursor.fetchone())
+                stats['available'] = True
+                
+                # Pages used by the FTS5 shadow tables (needs the dbstat virtual table)
+                try:
+                    cursor.execute('''
+                        SELECT COALESCE(SUM(pgsize), 0) AS bytes FROM dbstat
+                        WHERE name LIKE 'content_chunks%' OR name = 'content_documents'
+                    ''')
+                    stats['index_bytes'] = cursor.fetchone()['bytes']
+                except sqlite3.OperationalError:
+                    stats['index_bytes'] = None
+                
+                return stats
+                
+        except Exception as e:
+            print(f"Error getting content index stats: {e}")
+            return {}
+    
+    def save_image_hashes(self, rows: List[Tuple[str, int, int, int, int, int]]) -> bool:
+        """Store (file_hash, dhash, band0, band1, band2, band3) rows in the similarity index."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO image_hashes (file_hash, dhash, band0, band1, band2, band3)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving image hashes: {e}")
+            return False
+    
+    def prune_image_hashes(self) -> int:
+        """Drop perceptual hashes whose file hash no longer belongs to any asset."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM image_hashes
+                    WHERE NOT EXISTS (SELECT 1 FROM assets a WHERE a.file_hash = image_hashes.file_hash)
+                ''')
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error pruning image hashes: {e}")
+            return 0
+    
+    def save_image_colors(self, file_hashes: List[str],
+                          rows: List[Tuple[str, int, int, float, int]]) -> bool:
+        """
+        Replace the palettes of the given file hashes.
+        
+        Args:
+            file_hashes: Files whose previous palette rows are removed
+            rows: (file_hash, rank, rgb, weight, color_bin) rows to insert
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM image_colors WHERE file_hash = ?',
+                                   [(file_hash,) for file_hash in file_hashes])
+                cursor.executemany('''
+                    INSERT INTO image_colors (file_hash, rank, rgb, weight, color_bin)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving image colors: {e}")
+            return False
+    
+    def prune_image_colors(self) -> int:
+        """Drop palettes whose file hash no longer belongs to any asset."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM image_colors
+                    WHERE NOT EXISTS (SELECT 1 FROM assets a WHERE a.file_hash = image_colors.file_hash)
+                ''')
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error pruning image colors: {e}")
+            return 0
+    
+    def save_waveforms(self, rows: List[Tuple[str, bytes]]) -> bool:
+        """Store (file_hash, waveform blob) rows."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                now = datetime.now().timestamp()
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO waveforms (file_hash, data, created_at)
+                    VALUES (?, ?, ?)
+                ''', [(file_hash, data, now) for file_hash, data in rows])
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving waveforms: {e}")
+            return False
+    
+    def prune_waveforms(self) -> int:
+        """Drop waveforms whose file hash no longer belongs to any asset."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM waveforms
+                    WHERE NOT EXISTS (SELECT 1 FROM assets a WHERE a.file_hash = waveforms.file_hash)
+                ''')
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error pruning waveforms: {e}")
+            return 0
+    
+    def get_waveform(self, asset_id: int) -> Optional[bytes]:
+        """Get the waveform blob of an asset's current content."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT w.data FROM assets a
+                    JOIN waveforms w ON w.file_hash = a.file_hash
+                    WHERE a.id = ?
+                ''', (asset_id,))
+                row = cursor.fetchone()
+                return bytes(row['data']) if row else None
+                
+        except Exception as e:
+            print(f"Error getting waveform: {e}")
+            return None
+    
+    def save_archive_members(self, file_hashes: List[str],
+                             rows: List[Tuple[str, int, str, str, Optional[int], Optional[int],
+                                              Optional[int], Optional[str]]]) -> bool:
+        """
+        Replace the member listings of the given archives.
+        
+        Args:
+            file_hashes: Archives whose previous member rows are removed
+            rows: (file_hash, member_index, path, name, size, compressed_size, crc32, modified_at) rows
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM archive_members WHERE file_hash = ?',
+                                   [(file_hash,) for file_hash in file_hashes])
+                cursor.executemany('''
+                    INSERT INTO archive_members
+                        (file_hash, member_index, path, name, size, compressed_size, crc32, modified_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving archive members: {e}")
+            return False
+    
+    def prune_archive_members(self) -> int:
+        """Drop member listings whose file hash no longer belongs to any asset."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM archive_members
+                    WHERE NOT EXISTS (SELECT 1 FROM assets a WHERE a.file_hash = archive_members.file_hash)
+                ''')
+                conn.commit()
+                return cursor.rowcount
+                
+        except Exception as e:
+            print(f"Error pruning archive members: {e}")
+            return 0
+    
+    def search_archive_members(self, query: str, limit: int = 100) -> List[Dict]:
+        """
+        Search archive members by path.
+        
+        Returns:
+            Member dictionaries ('member', 'member_index', 'name', 'size',
+            'compressed_size', 'crc32', 'modified_at') with their archive's 'archive_id', 'archive_path',
+            'category', 'tags' and 'created_at'; members whose file name
+            matches come first
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                search_query = f"%{query.lower()}%"
+                cursor.execute('''
+                    SELECT a.id AS archive_id, a.path AS archive_path, a.category, a.tags, a.created_at,
+                           m.path AS member, m.member_index, m.name, m.size, m.compressed_size,
+                           m.crc32, m.modified_at
+                    FROM archive_members m
+                    JOIN assets a ON a.file_hash = m.file_hash
+                    WHERE lower(m.path) LIKE ?
+                    ORDER BY
+                        CASE
+                            WHEN lower(m.name) LIKE ? THEN 1
+                            ELSE 2
+                        END,
+                        m.name
+                    LIMIT ?
+                ''', (search_query, search_query, limit))
+                
+                results = []
+                for row in cursor.fetchall():
+                    member = dict(row)
+                    try:
+                        member['tags'] = json.loads(member['tags'])
+                    except (json.JSONDecodeError, TypeError):
+                        member['tags'] = []
+                    results.append(member)
+                
+                return results
+                
+        except Exception as e:
+            print(f"Error searching archive members: {e}")
+            return []
+    
+    def get_archive_members(self, asset_id: int, limit: int = 1000, offset: int = 0) -> List[Dict]:
+        """Get the members of an archive asset in archive order, with the archive's path, category and tags."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT a.path AS archive_path, a.category, a.tags, a.created_at,
+                           m.path AS member, m.member_index, m.name, m.size, m.compressed_size,
+                           m.crc32, m.modified_at
+                    FROM assets a
+                    JOIN archive_members m ON m.file_hash = a.file_hash
+                    WHERE a.id = ?
+                    ORDER BY m.member_index
+                    LIMIT ? OFFSET ?
+                ''', (asset_id, limit, offset))
+                
+                members = []
+                for row in cursor.fetchall():
+                    member = dict(row)
+                    try:
+                        member['tags'] = json.loads(member['tags'])
+                    except (json.JSONDecodeError, TypeError):
+                        member['tags'] = []
+                    members.append(member)
+                
+                return members
+                
+        except Exception as e:
+            print(f"Error getting archive members: {e}")
+            return []
+    
+    def get_archive_member(self, archive_path: str, member: str) -> Optional[Dict]:
+        """Get one member of the archive at a path, with the archive's 'file_hash'."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT a.id AS archive_id, a.file_hash, m.path AS member, m.name, m.size,
+                           m.compressed_size, m.crc32, m.modified_at
+                    FROM assets a
+                    JOIN archive_members m ON m.file_hash = a.file_hash
+                    WHERE a.path = ? AND m.path = ?
+                    LIMIT 1
+                ''', (archive_path, member))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+                
+        except Exception as e:
+            print(f"Error getting archive member: {e}")
+            return None
+    
+    def get_color_candidates(self, color_bins: List[int], min_weight: float) -> List[Tuple[str, int, float]]:
+        """Get (file_hash, rgb, weight) palette colours in the given bins covering at least min_weight."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                candidates = []
+                # Chunk to stay under SQLite's bound-parameter limit
+                for i in range(0, len(color_bins), 500):
+                    chunk = color_bins[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT file_hash, rgb, weight FROM image_colors
+                        WHERE color_bin IN ({placeholders}) AND weight >= ?
+                    ''', chunk + [min_weight])
+                    candidates.extend((row['file_hash'], row['rgb'], row['weight'])
+                                      for row in cursor.fetchall())
+                
+                return candidates
+                
+        except Exception as e:
+            print(f"Error getting color candidates: {e}")
+            return []
+    
+    def get_image_hash(self, asset_id: int) -> Optional[int]:
+        """Get the stored perceptual hash of an asset's current content."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT h.dhash FROM assets a
+                    JOIN image_hashes h ON h.file_hash = a.file_hash
+                    WHERE a.id = ?
+                ''', (asset_id,))
+                row = cursor.fetchone()
+                return row['dhash'] if row else None
+                
+        except Exception as e:
+            print(f"Error getting image hash: {e}")
+            return None
+    
+    def get_image_hash_candidates(self, band_values: List[List[int]]) -> List[Tuple[str, int]]:
+        """
+        Get (file_hash, dhash) rows matching any of the given values in the same band.
+        
+        Args:
+            band_values: For each band in order, the band values to look up
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                candidates: Dict[str, int] = {}
+                # One indexed lookup per band; a row may match in several
+                for band, values in enumerate(band_values):
+                    for i in range(0, len(values), 500):
+                        chunk = values[i:i + 500]
+                        placeholders = ','.join('?' * len(chunk))
+                        cursor.execute(f'''
+                            SELECT file_hash, dhash FROM image_hashes
+                            WHERE band{band} IN ({placeholders})
+                        ''', chunk)
+                        for row in cursor.fetchall():
+                            candidates[row['file_hash']] = row['dhash']
+                
+                return list(candidates.items())
+                
+        except Exception as e:
+            print(f"Error getting image hash candidates: {e}")
+            return []
+    
+    def get_assets_by_file_hashes(self, file_hashes: List[str]) -> List[Dict]:
+        """Get the assets whose content has one of the given file hashes."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                assets = []
+                # Chunk to stay under SQLite's bound-parameter limit
+                for i in range(0, len(file_hashes), 500):
+                    chunk = file_hashes[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT id, name, path, category, tags, file_size, file_hash, created_at
+                        FROM assets
+                        WHERE file_hash IN ({placeholders})
+                    ''', chunk)
+                    for row in cursor.fetchall():
+                        asset = dict(row)
+                        try:
+                            asset['tags'] = json.loads(asset['tags'])
+                        except (json.JSONDecodeError, TypeError):
+                            asset['tags'] = []
+                        assets.append(asset)
+                
+                return assets
+                
+        except Exception as e:
+            print(f"Error getting assets by file hash: {e}")
+            return []
+    
+    def save_metrics_state(self, name: str, state: Dict[str, Any]) -> bool:
+        """Persist the metrics state of a component, replacing the previous one."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO service_metrics (name, state, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        state = excluded.state,
+                        updated_at = excluded.updated_at
+                ''', (name, json.dumps(state), datetime.now().timestamp()))
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            print(f"Error saving metrics: {e}")
+            return False
+    
+    def get_metrics_state(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get the persisted metrics state of a component, with its 'updated_at' time."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT state, updated_at FROM service_metrics WHERE name = ?', (name,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                state = json.loads(row['state'])
+                state['updated_at'] = row['updated_at']
+                return state
+                
         except Exception as e:
-            print(f"Error calculating file hash: {e}")
+            print(f"Error getting metrics: {e}")
             return None
     
     def get_stats(self) -> Dict[str, Any]:
@@ -385,6 +2062,7 @@ class DatabaseManager:
                     'total_assets': total_assets,
                     'status_counts': status_counts,
                     'total_libraries': total_libraries,
+                    'content_index': self.get_content_index_stats(),
                     'database_path': self._db_path
                 }
                 